@@ -0,0 +1,8 @@
+from django.urls import path
+from .async_views import login, signup
+
+# Listed ahead of authentication.urls by main.async_urls, so these paths take over
+urlpatterns = [
+    path('register/', signup, name='CreateUser'),
+    path('login/', login, name='LoginUser'),
+]
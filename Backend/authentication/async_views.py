@@ -0,0 +1,94 @@
+"""
+Async counterparts of UserSignupView and LoginUserView on the async ORM, routed instead of
+them when ASYNC_VIEWS is on (see main/async_urls.py). Same request and response bodies.
+"""
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import Throttled
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from .hashing import HashingBusy
+from .passwords import aauthenticate_credentials
+from .serializers import LoginUserSerializer, userSerializer
+from .tokens import TokenClaimsObtainPairSerializer
+from .views import LoginUserView
+
+
+def read_json(request):
+    """The JSON object in the request body, or None"""
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def throttled_response(request, throttle_classes):
+    """DRF's 429 when one of ``throttle_classes`` refuses the request, else None"""
+    drf_request = Request(request, parsers=[JSONParser()])
+    waits = []
+    for throttle_class in throttle_classes:
+        throttle = throttle_class()
+        # Throttle history lives in the cache
+        if not await sync_to_async(throttle.allow_request)(drf_request, None):
+            waits.append(throttle.wait())
+    if not waits:
+        return None
+    wait = max((wait for wait in waits if wait is not None), default=None)
+    exc = Throttled(wait)
+    response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+    if exc.wait is not None:
+        response['Retry-After'] = '%d' % exc.wait
+    return response
+
+
+@csrf_exempt
+async def signup(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    data = read_json(request) or {}
+    serializer = userSerializer(data={
+        "username": data.get("username"),
+        "email": data.get("email"),
+        "password": data.get("password"),
+    })
+    # The unique checks on username and email query the database
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse({"message": "Validation failed", "errors": serializer.errors}, status=400)
+    try:
+        user = await serializer.acreate(serializer.validated_data)
+    except HashingBusy:
+        return JsonResponse({"error": "Too many signups in progress, please retry"}, status=503)
+    return JsonResponse(
+        {"message": "User Created Successfully", "user": LoginUserSerializer(user).data}, status=201
+    )
+
+
+@csrf_exempt
+async def login(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    # Read the body first: request.body stays readable after that, for the throttles' parser too
+    data = read_json(request)
+    throttled = await throttled_response(request, LoginUserView.throttle_classes)
+    if throttled is not None:
+        return throttled
+    if data is None:
+        return JsonResponse({"error": "Expected a JSON object"}, status=400)
+    try:
+        user = await aauthenticate_credentials(data.get("email"), data.get("password"))
+    except HashingBusy:
+        return JsonResponse({"error": "Too many logins in progress, please retry"}, status=503)
+    if user is None:
+        return JsonResponse({"error": "Invalid credentials"}, status=401)
+    if data.get("isAdmin", False) and not user.is_staff:
+        return JsonResponse({"error": "You are not authorized as an admin."}, status=401)
+    refresh = TokenClaimsObtainPairSerializer.get_token(user)
+    return JsonResponse({
+        "message": "Login successful",
+        "user": LoginUserSerializer(user).data,
+        "access_token": str(refresh.access_token),
+        "refresh_token": str(refresh),
+    })
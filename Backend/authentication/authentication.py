@@ -0,0 +1,80 @@
+from asgiref.sync import sync_to_async
+from django.utils.functional import cached_property
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .models import User
+from .tokens import ais_token_revoked, is_jti_revoked, is_token_revoked
+
+
+class ClaimsTokenUser(TokenUser):
+    """TokenUser whose id has the type of User.pk; simplejwt 5.5 signs user_id as a string"""
+
+    @cached_property
+    def id(self):
+        return User._meta.pk.to_python(self.token[jwt_settings.USER_ID_CLAIM])
+
+
+class RevocableJWTAuthentication(JWTAuthentication):
+    """
+    simplejwt's JWTAuthentication, refusing tokens revoked by a logout (cache) or a token
+    version bump (compared against the User row it loads anyway)
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        if validated_token.get('token_version') != user.token_version or is_jti_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+        return user
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Builds a TokenUser from the signed username/is_staff claims instead of loading the User row.
+    Revocation (token version and revoked jti) is checked against the cache.
+    """
+
+    def get_user(self, validated_token):
+        if is_token_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+        return self.token_user(validated_token)
+
+    async def aget_user(self, validated_token):
+        if await ais_token_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+        return self.token_user(validated_token)
+
+    def token_user(self, validated_token):
+        # Runs simplejwt's claim checks, then rebuilds the user with a typed id
+        return ClaimsTokenUser(super().get_user(validated_token).token)
+
+
+async def aauthenticate(request):
+    """
+    The configured JWT authentication for async views: the user for the request's Bearer token,
+    or None without one. Raises AuthenticationFailed for a bad token, like authenticate().
+    """
+    authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+    header = authenticator.get_header(request)
+    if header is None:
+        return None
+    raw_token = authenticator.get_raw_token(header)
+    if raw_token is None:
+        return None
+    # Checking the signature is CPU only; loading the user may need the cache or the database
+    validated_token = authenticator.get_validated_token(raw_token)
+    if hasattr(authenticator, 'aget_user'):
+        return await authenticator.aget_user(validated_token)
+    return await sync_to_async(authenticator.get_user)(validated_token)
+
+
+def as_user_instance(user):
+    """
+    Model instance for request.user, so it can be assigned to foreign keys.
+    Token users become an unsaved User shell carrying the signed claims, which avoids a query.
+    """
+    if isinstance(user, User):
+        return user
+    return User(pk=user.id, username=user.username, is_staff=user.is_staff)
@@ -0,0 +1,100 @@
+import multiprocessing
+import threading
+from asgiref.sync import sync_to_async
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from main.metrics import timed_call
+
+_executor = None
+_executor_workers = None
+_executor_slots = None
+_executor_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """No slot or no result within LOGIN_HASH_TIMEOUT seconds, or a hashing worker died"""
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _verify(password, encoded):
+    rehash = []
+    is_correct = check_password(password, encoded, setter=lambda raw_password: rehash.append(True))
+    return is_correct, bool(rehash)
+
+
+def get_executor():
+    """Return the shared hashing process pool, or None when LOGIN_HASH_WORKERS is 0 (hash inline)"""
+    global _executor, _executor_workers, _executor_slots
+    workers = getattr(settings, 'LOGIN_HASH_WORKERS', 0)
+    if not workers:
+        return None
+    with _executor_lock:
+        if _executor_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # spawn, not fork: forking a threaded server process is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+            _executor_workers = workers
+            # Bound the backlog so a login storm gets 503s instead of an ever growing queue
+            _executor_slots = threading.BoundedSemaphore(workers * 2)
+    return _executor
+
+
+def discard_executor(executor):
+    """Drop a broken pool so the next call to get_executor() starts a new one"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is executor:
+            _executor.shutdown(wait=False)
+            _executor = None
+            _executor_workers = None
+
+
+def run_hashing(fn, *args):
+    with timed_call('password_hash'):
+        executor = get_executor()
+        if executor is None:
+            return fn(*args)
+        timeout = getattr(settings, 'LOGIN_HASH_TIMEOUT', 10)
+        slots = _executor_slots
+        if not slots.acquire(timeout=timeout):
+            raise HashingBusy()
+        try:
+            return executor.submit(fn, *args).result(timeout=timeout)
+        except FutureTimeoutError:
+            raise HashingBusy()
+        except BrokenProcessPool:
+            # A worker died (OOM killer, segfault); the pool refuses all further work
+            discard_executor(executor)
+            raise HashingBusy()
+        finally:
+            slots.release()
+
+
+def hash_password(password):
+    return run_hashing(make_password, password)
+
+
+def verify_password(password, encoded):
+    """Return (is_correct, needs_rehash) for a password against a stored hash"""
+    return run_hashing(_verify, password, encoded)
+
+
+# For async views: hashing needs no database connection, so it runs on any worker thread
+# instead of queueing behind the request's thread-sensitive ORM calls
+async def ahash_password(password):
+    return await sync_to_async(hash_password, thread_sensitive=False)(password)
+
+
+async def averify_password(password, encoded):
+    return await sync_to_async(verify_password, thread_sensitive=False)(password, encoded)
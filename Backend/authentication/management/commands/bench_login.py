@@ -0,0 +1,64 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from authentication.models import User
+from authentication.hashing import hash_password
+from authentication.views import LoginUserView
+
+BENCH_EMAIL_DOMAIN = "bench-login.invalid"
+
+
+class Command(BaseCommand):
+    help = "Measure login throughput (logins/sec) with inline hashing and with the hashing process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--workers', type=int, nargs='*', default=[0, os.cpu_count() or 1],
+            help="LOGIN_HASH_WORKERS values to compare, 0 hashes on the request thread",
+        )
+
+    def login(self, view, factory, email):
+        try:
+            request = factory.post('/authenticate/login/', {"email": email, "password": "bench-password"}, format='json')
+            return view(request).status_code
+        finally:
+            connection.close()
+
+    def run_round(self, emails, logins, concurrency):
+        factory = APIRequestFactory()
+        # Throttling would reject most of the benchmark traffic
+        view = LoginUserView.as_view(throttle_classes=[])
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            statuses = list(executor.map(
+                lambda i: self.login(view, factory, emails[i % len(emails)]), range(logins)
+            ))
+        elapsed = time.perf_counter() - started
+        return elapsed, sum(1 for code in statuses if code != 200)
+
+    def handle(self, *args, **options):
+        encoded = hash_password("bench-password")
+        emails = [f"user{i}@{BENCH_EMAIL_DOMAIN}" for i in range(options['users'])]
+        User.objects.bulk_create(
+            [User(email=email, username=f"bench-login-{i}", password=encoded) for i, email in enumerate(emails)]
+        )
+        try:
+            for workers in options['workers']:
+                with override_settings(LOGIN_HASH_WORKERS=workers):
+                    # Warm the pool so process start-up isn't measured
+                    self.run_round(emails, workers or 1, options['concurrency'])
+                    elapsed, failures = self.run_round(emails, options['logins'], options['concurrency'])
+                mode = f"{workers} hashing processes" if workers else "inline hashing"
+                self.stdout.write(
+                    f"{mode:>22}: {options['logins'] / elapsed:8.1f} logins/sec "
+                    f"({options['logins']} logins, concurrency {options['concurrency']}, {failures} failed)"
+                )
+        finally:
+            User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").delete()
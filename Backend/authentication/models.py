@@ -27,6 +27,8 @@ class User(AbstractBaseUser):
     is_active=models.BooleanField(default=True)
     is_admin=models.BooleanField(default=False)
     is_staff=models.BooleanField(default=False)
+    # Bumped to revoke every token issued before; checked by StatelessJWTAuthentication
+    token_version=models.PositiveIntegerField(default=0)
     objects= usermanager()
     USERNAME_FIELD='email'
     REQUIRED_FIELDS=['password']
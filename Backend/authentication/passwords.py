@@ -0,0 +1,40 @@
+from .hashing import ahash_password, averify_password, hash_password, verify_password
+from .models import User
+
+
+def authenticate_credentials(email, password):
+    """
+    Equivalent of authenticate() for the email backend with hashing moved off the request thread.
+    Hashes made by an outdated hasher profile are replaced after a successful check.
+    """
+    if not email or not password:
+        return None
+    user = User.objects.filter(email=email).first()
+    if user is None:
+        # Hash anyway so unknown emails take as long as wrong passwords
+        hash_password(password)
+        return None
+    is_correct, needs_rehash = verify_password(password, user.password)
+    if not is_correct or not user.is_active:
+        return None
+    if needs_rehash:
+        user.password = hash_password(password)
+        user.save(update_fields=['password'])
+    return user
+
+
+async def aauthenticate_credentials(email, password):
+    """authenticate_credentials for async views, on the async ORM"""
+    if not email or not password:
+        return None
+    user = await User.objects.filter(email=email).afirst()
+    if user is None:
+        await ahash_password(password)
+        return None
+    is_correct, needs_rehash = await averify_password(password, user.password)
+    if not is_correct or not user.is_active:
+        return None
+    if needs_rehash:
+        user.password = await ahash_password(password)
+        await user.asave(update_fields=['password'])
+    return user
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import User
+from .hashing import ahash_password, hash_password
 
 
 class userSerializer(serializers.ModelSerializer):
@@ -11,9 +12,28 @@ class userSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            email=validated_data["email"],
+        # Same as User.objects.create_user, with the hash computed in the hashing pool
+        user = User(
+            email=User.objects.normalize_email(validated_data["email"]),
             username=validated_data["username"],
-            password=validated_data["password"],
         )
-        return user
\ No newline at end of file
+        user.password = hash_password(validated_data["password"])
+        user.save()
+        return user
+
+    async def acreate(self, validated_data):
+        """create() for the async signup view"""
+        user = User(
+            email=User.objects.normalize_email(validated_data["email"]),
+            username=validated_data["username"],
+        )
+        user.password = await ahash_password(validated_data["password"])
+        await user.asave()
+        return user
+
+
+class LoginUserSerializer(serializers.ModelSerializer):
+    """Only what the frontend keeps after login"""
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_admin', 'is_staff']
@@ -0,0 +1,27 @@
+from django.db.models.signals import pre_save, post_save
+from django.dispatch import receiver
+from .models import User
+from .tokens import revoke_user_tokens
+
+# Claims signed into tokens that must not outlive a change of these fields
+TOKEN_FIELDS = ('username', 'is_staff', 'is_active')
+
+
+@receiver(pre_save, sender=User)
+def detect_token_claim_change(sender, instance, raw, update_fields=None, **kwargs):
+    instance._revoke_tokens = False
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_FIELDS):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS).first()
+    if previous is not None:
+        instance._revoke_tokens = any(previous[field] != getattr(instance, field) for field in TOKEN_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_claim_change(sender, instance, created, raw, **kwargs):
+    if getattr(instance, '_revoke_tokens', False):
+        instance._revoke_tokens = False
+        revoke_user_tokens(instance.pk)
+        instance.token_version += 1
@@ -1,3 +1,223 @@
-from django.test import TestCase
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import InvalidToken
+from . import hashing
+from .authentication import StatelessJWTAuthentication, aauthenticate, as_user_instance
+from .models import User
+from .tokens import TokenClaimsObtainPairSerializer, revoke_user_tokens
 
-# Create your tests here.
+
+class LoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="employee", password="secret-pass", email="employee@example.com")
+
+    def login(self, password="secret-pass", **extra):
+        return self.client.post(
+            '/authenticate/login/', {"email": "employee@example.com", "password": password, **extra}, format='json'
+        )
+
+    def test_login_returns_slim_user(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.data['user']),
+            {'id', 'username', 'email', 'first_name', 'last_name', 'is_admin', 'is_staff'},
+        )
+
+    def test_invalid_credentials(self):
+        self.assertEqual(self.login(password="wrong").status_code, 401)
+        response = self.client.post('/authenticate/login/', {"email": "nobody@example.com", "password": "x"}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_rehash_on_login_after_profile_change(self):
+        old_hash = self.user.password
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertNotEqual(self.user.password, old_hash)
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+    def test_attempts_per_email_are_throttled(self):
+        statuses = [self.login(password="wrong").status_code for _ in range(11)]
+        self.assertEqual(statuses[:10], [401] * 10)
+        self.assertEqual(statuses[10], 429)
+
+    def test_non_object_body_is_rejected(self):
+        response = self.client.post('/authenticate/login/', ["employee@example.com"], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_signup_hashes_password(self):
+        response = self.client.post(
+            '/authenticate/register/',
+            {"username": "new", "email": "new@example.com", "password": "another-pass"},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('password', response.data['user'])
+        self.assertTrue(User.objects.get(email="new@example.com").check_password("another-pass"))
+
+
+@override_settings(LOGIN_HASH_WORKERS=1, LOGIN_HASH_TIMEOUT=0.1)
+class HashingPoolFailureTests(TestCase):
+    """A hung or dead hashing pool answers HashingBusy (a 503) rather than a 500"""
+
+    def run_with_result(self, exception):
+        future = Future()
+        if exception is not None:
+            future.set_exception(exception)
+        executor = mock.Mock(**{'submit.return_value': future})
+        with mock.patch.multiple(
+            hashing, _executor=executor, _executor_workers=1, _executor_slots=hashing.threading.BoundedSemaphore(2),
+        ):
+            with self.assertRaises(hashing.HashingBusy):
+                hashing.run_hashing(len, "password")
+            return hashing._executor
+
+    def test_timeout_keeps_pool(self):
+        self.assertIsNotNone(self.run_with_result(None))
+
+    def test_broken_pool_is_discarded(self):
+        self.assertIsNone(self.run_with_result(BrokenProcessPool()))
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="admin", password="secret-pass", email="admin@example.com", is_staff=True
+        )
+        self.token = TokenClaimsObtainPairSerializer.get_token(self.user).access_token
+        self.factory = APIRequestFactory()
+
+    def authenticate(self):
+        request = self.factory.get('/users/travel-requests/', HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        return StatelessJWTAuthentication().authenticate(request)
+
+    def test_builds_user_from_claims_without_queries(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual((user.id, user.username, user.is_staff), (self.user.id, "admin", True))
+
+    def test_string_user_id_claim(self):
+        # simplejwt 5.5 signs user_id as a string
+        self.token['user_id'] = str(self.user.id)
+        user, _ = self.authenticate()
+        self.assertEqual(user.id, self.user.id)
+        self.assertEqual(as_user_instance(user).pk, self.user.id)
+
+    def test_claim_change_revokes_tokens(self):
+        self.user.is_staff = False
+        self.user.save()
+        with self.assertRaises(InvalidToken):
+            self.authenticate()
+
+    async def test_async_authentication(self):
+        request = self.factory.get('/users/travel-requests/', HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        user = await aauthenticate(request)
+        self.assertEqual((type(user), user.id), (User, self.user.id))
+        self.assertIsNone(await aauthenticate(self.factory.get('/users/travel-requests/')))
+
+        with override_settings(REST_FRAMEWORK={
+            'DEFAULT_AUTHENTICATION_CLASSES': ('authentication.authentication.StatelessJWTAuthentication',),
+        }):
+            self.assertEqual((await aauthenticate(request)).username, "admin")
+            self.user.is_staff = False
+            await self.user.asave()
+            with self.assertRaises(InvalidToken):
+                await aauthenticate(request)
+
+    def test_logout_revokes_token(self):
+        client = APIClient()
+        response = client.post('/authenticate/logout/', HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(InvalidToken):
+            self.authenticate()
+
+
+class TokenRevocationTests(TestCase):
+    """Logged out and version-bumped tokens are refused by the default authentication and by refresh"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="employee", password=None, email="employee@example.com")
+        self.refresh = TokenClaimsObtainPairSerializer.get_token(self.user)
+        self.access = self.refresh.access_token
+        self.client = APIClient()
+
+    def refresh_status(self):
+        return self.client.post('/api/token/refresh/', {"refresh": str(self.refresh)}, format='json').status_code
+
+    def list_status(self, access):
+        return self.client.get('/users/travel-requests/', HTTP_AUTHORIZATION=f"Bearer {access}").status_code
+
+    def test_logout_revokes_access_and_refresh(self):
+        self.assertEqual(self.refresh_status(), 200)
+        response = self.client.post(
+            '/authenticate/logout/', {"refresh_token": str(self.refresh)},
+            format='json', HTTP_AUTHORIZATION=f"Bearer {self.access}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.list_status(self.access), 401)
+        self.assertEqual(self.refresh_status(), 401)
+
+    def test_token_version_bump_revokes_refresh(self):
+        self.assertEqual(self.list_status(self.access), 200)
+        revoke_user_tokens(self.user.id)
+        self.assertEqual(self.list_status(self.access), 401)
+        self.assertEqual(self.refresh_status(), 401)
+
+
+@override_settings(ROOT_URLCONF='main.async_urls')
+class AsyncLoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="employee", password="secret-pass", email="employee@example.com")
+
+    def setUp(self):
+        cache.clear()
+
+    async def login(self, email="employee@example.com", password="secret-pass", **extra):
+        return await self.async_client.post(
+            '/authenticate/login/', {"email": email, "password": password, **extra}, content_type='application/json'
+        )
+
+    async def test_signup_then_login(self):
+        signup = {"username": "new", "email": "new@example.com", "password": "another-pass"}
+        response = await self.async_client.post('/authenticate/register/', signup, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('password', response.json()['user'])
+        response = await self.async_client.post('/authenticate/register/', signup, content_type='application/json')
+        self.assertEqual(set(response.json()['errors']), {'username', 'email'})
+
+        response = await self.login("new@example.com", "another-pass")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['username'], "new")
+        response = await self.async_client.get(
+            '/users/travel-requests/', headers={'Authorization': f"Bearer {response.json()['access_token']}"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_invalid_credentials(self):
+        self.assertEqual((await self.login(password="wrong")).status_code, 401)
+        self.assertEqual((await self.login(isAdmin=True)).status_code, 401)
+
+    @override_settings(PASSWORD_HASH_ITERATIONS=1000)
+    async def test_attempts_per_email_are_throttled(self):
+        statuses = [(await self.login("nobody@example.com")).status_code for _ in range(11)]
+        self.assertEqual(statuses[:10], [401] * 10)
+        response = await self.login("nobody@example.com")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    async def test_non_object_body_is_rejected(self):
+        response = await self.async_client.post(
+            '/authenticate/login/', ["employee@example.com"], content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,21 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class LoginIPThrottle(SimpleRateThrottle):
+    """Login attempts per client IP, rate from DEFAULT_THROTTLE_RATES['login_ip']"""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginEmailThrottle(SimpleRateThrottle):
+    """Login attempts per account email, rate from DEFAULT_THROTTLE_RATES['login_email']"""
+    scope = 'login_email'
+
+    def get_cache_key(self, request, view):
+        # A JSON list or string body has no email; LoginUserView answers it with a 400
+        email = request.data.get('email') if isinstance(request.data, dict) else None
+        if not email:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': str(email).strip().lower()}
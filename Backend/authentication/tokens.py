@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from .models import User
+
+TOKEN_VERSION_KEY = "auth:token_version:{user_id}"
+REVOKED_TOKEN_KEY = "auth:revoked:{jti}"
+
+
+def get_token_version_cache_timeout():
+    return getattr(settings, 'JWT_TOKEN_VERSION_CACHE_TIMEOUT', 300)
+
+
+def get_token_version(user_id):
+    """Current token version of a user, from cache so authenticating needs no query"""
+    key = TOKEN_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            # Deleted user: no token can match
+            version = -1
+        cache.set(key, version, get_token_version_cache_timeout())
+    return version
+
+
+async def aget_token_version(user_id):
+    key = TOKEN_VERSION_KEY.format(user_id=user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = await User.objects.filter(pk=user_id).values_list('token_version', flat=True).afirst()
+        if version is None:
+            version = -1
+        await cache.aset(key, version, get_token_version_cache_timeout())
+    return version
+
+
+def revoke_user_tokens(user_id):
+    """Invalidate every token issued to the user so far"""
+    User.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
+    cache.delete(TOKEN_VERSION_KEY.format(user_id=user_id))
+
+
+def revoke_token(token):
+    """Put a single token on the revocation list until it would have expired anyway"""
+    remaining = token['exp'] - datetime.now(timezone.utc).timestamp()
+    if remaining > 0:
+        cache.set(REVOKED_TOKEN_KEY.format(jti=token['jti']), True, int(remaining) + 1)
+
+
+def is_jti_revoked(token):
+    """Whether this one token was revoked by a logout"""
+    return bool(cache.get(REVOKED_TOKEN_KEY.format(jti=token['jti'])))
+
+
+def is_token_revoked(token):
+    if is_jti_revoked(token):
+        return True
+    return token.get('token_version') != get_token_version(token['user_id'])
+
+
+async def ais_token_revoked(token):
+    if await cache.aget(REVOKED_TOKEN_KEY.format(jti=token['jti'])):
+        return True
+    return token.get('token_version') != await aget_token_version(token['user_id'])
+
+
+class TokenClaimsObtainPairSerializer(TokenObtainPairSerializer):
+    """Signs the claims StatelessJWTAuthentication builds its user from"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
+        token['token_version'] = user.token_version
+        return token
+
+
+class TokenClaimsRefreshSerializer(TokenRefreshSerializer):
+    """Refuses refresh tokens revoked by a logout or by a token version bump"""
+
+    def validate(self, attrs):
+        if is_token_revoked(self.token_class(attrs['refresh'])):
+            raise InvalidToken("Token has been revoked")
+        return super().validate(attrs)
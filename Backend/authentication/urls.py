@@ -1,8 +1,9 @@
 from django.contrib import admin
 from django.urls import path,include
-from .views import UserSignupView,LoginUserView
+from .views import UserSignupView,LoginUserView,LogoutUserView
 
 urlpatterns = [
     path('register/',UserSignupView.as_view(),name='CreateUser'),
     path('login/',LoginUserView.as_view(),name='LoginUser'),
+    path('logout/',LogoutUserView.as_view(),name='LogoutUser'),
 ]
\ No newline at end of file
@@ -1,10 +1,14 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.views import APIView
-from django.contrib.auth import authenticate
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework import status
-from .serializers import userSerializer
+from .serializers import LoginUserSerializer, userSerializer
+from .hashing import HashingBusy
+from .passwords import authenticate_credentials
+from .throttles import LoginEmailThrottle, LoginIPThrottle
+from .tokens import TokenClaimsObtainPairSerializer, revoke_token
 from rest_framework.response import Response
 from .models import User
 
@@ -19,9 +23,15 @@ class UserSignupView(APIView):
         }
         serializer = userSerializer(data=user_data)
         if serializer.is_valid():
-            serializer.save()
+            try:
+                user = serializer.save()
+            except HashingBusy:
+                return Response(
+                    {"error": "Too many signups in progress, please retry"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                )
             return Response(
-                {"message": "User Created Successfully", "user": serializer.data},
+                {"message": "User Created Successfully", "user": LoginUserSerializer(user).data},
                 status=status.HTTP_201_CREATED,
             )
         return Response(
@@ -32,21 +42,30 @@ class UserSignupView(APIView):
 
 class LoginUserView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
     def post(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response({"error": "Expected a JSON object"}, status=status.HTTP_400_BAD_REQUEST)
         email = request.data.get("email")
         password = request.data.get("password")
         is_admin = request.data.get("isAdmin", False)
-        print(email,password,is_admin)
-        user = authenticate(request, username=email, password=password)
+        try:
+            user = authenticate_credentials(email, password)
+        except HashingBusy:
+            return Response(
+                {"error": "Too many logins in progress, please retry"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
         if user is not None:
             if is_admin and not user.is_staff:
                 return Response(
                     {"error": "You are not authorized as an admin."},
                     status=status.HTTP_401_UNAUTHORIZED,
                 )
-            refresh = RefreshToken.for_user(user)
+            refresh = TokenClaimsObtainPairSerializer.get_token(user)
             access_token = str(refresh.access_token)
-            user_data = userSerializer(user).data
+            user_data = LoginUserSerializer(user).data
             return Response(
                 {
                     "message": "Login successful",
@@ -60,3 +79,17 @@ class LoginUserView(APIView):
             {"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED
         )
 
+
+class LogoutUserView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        """Revoke the presented access token and, when sent, the refresh token"""
+        revoke_token(request.auth)
+        refresh_token = request.data.get("refresh_token")
+        if refresh_token:
+            try:
+                revoke_token(RefreshToken(refresh_token))
+            except TokenError:
+                pass
+        return Response({"message": "Logged out"}, status=status.HTTP_200_OK)
@@ -2,6 +2,8 @@
 ASGI config for main project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+WebSocket connections to /ws/travel-requests/ get travel-request events (see users.events);
+everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -13,4 +15,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'main.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Needs the app registry, which get_asgi_application() sets up
+from users.events import WEBSOCKET_PATH, travel_request_websocket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        if scope['path'] == WEBSOCKET_PATH:
+            return await travel_request_websocket(scope, receive, send)
+        # Unknown WebSocket path: reject the handshake
+        await receive()
+        await send({'type': 'websocket.close'})
+        return
+    return await django_application(scope, receive, send)
@@ -0,0 +1,13 @@
+"""
+Root URL configuration when ASYNC_VIEWS is on: main.urls with travel-request CRUD, login,
+signup and chat answered by the async views (authentication/async_views.py,
+users/async_views.py). Everything else falls through to the sync routes.
+"""
+from django.urls import include, path
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('authenticate/', include('authentication.async_urls')),
+    path('users/', include('users.async_urls')),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,248 @@
+"""
+Cache configuration helpers: CACHES entries built from URLs and a two-tier cache backend
+with an in-process L1 in front of a shared L2, plus per-key counters.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlparse
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from main.metrics import record_cache_lookup
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    # Requires redis-py
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'rediss': 'django.core.cache.backends.redis.RedisCache',
+    # Requires pymemcache
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    # Requires "manage.py createcachetable"
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+# Key groups beyond this many are counted under "other" so the counters stay bounded
+MAX_METRIC_GROUPS = 100
+_missing = object()
+
+
+def cache_from_url(url, timeout=300):
+    """
+    Build a CACHES entry from locmem://name, file:///path, redis://host:port/db,
+    memcached://host:port, db://table or dummy://.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in BACKENDS:
+        raise ValueError(f"Unsupported cache URL scheme: {parsed.scheme!r}")
+
+    config = {'BACKEND': BACKENDS[parsed.scheme], 'TIMEOUT': timeout}
+    if parsed.scheme in ('redis', 'rediss'):
+        config['LOCATION'] = url
+    elif parsed.scheme == 'memcached':
+        config['LOCATION'] = parsed.netloc
+    elif parsed.scheme == 'file':
+        config['LOCATION'] = unquote(parsed.path)
+    elif parsed.scheme in ('locmem', 'db'):
+        config['LOCATION'] = parsed.netloc or unquote(parsed.path.lstrip('/'))
+    return config
+
+
+def key_group(key):
+    """Group keys by their prefix before the first ':' ("auth:revoked:<jti>" -> "auth")"""
+    key = str(key)
+    # DRF throttle keys end in the client's IP or email, which must not become a label
+    if key.startswith('throttle_'):
+        return 'throttle'
+    return key.split(':', 1)[0]
+
+
+class CacheMetrics:
+    """Hit/miss/latency counters per key group for the tiered cache"""
+
+    FIELDS = ('l1_hits', 'l2_hits', 'misses', 'sets', 'deletes', 'get_seconds')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.groups = {}
+
+    def record(self, key, field, seconds=0.0):
+        group = key_group(key)
+        with self._lock:
+            counters = self.groups.get(group)
+            if counters is None:
+                if len(self.groups) >= MAX_METRIC_GROUPS:
+                    group = 'other'
+                counters = self.groups.setdefault(group, dict.fromkeys(self.FIELDS, 0))
+            counters[field] += 1
+            if seconds:
+                counters['get_seconds'] += seconds
+
+    def reset(self):
+        with self._lock:
+            self.groups.clear()
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = {}
+            for group, counters in self.groups.items():
+                lookups = counters['l1_hits'] + counters['l2_hits'] + counters['misses']
+                snapshot[group] = {
+                    **counters,
+                    'get_seconds': round(counters['get_seconds'], 6),
+                    'hit_ratio': (counters['l1_hits'] + counters['l2_hits']) / lookups if lookups else 0.0,
+                }
+            return snapshot
+
+
+cache_metrics = CacheMetrics()
+
+
+class TieredCache(BaseCache):
+    """
+    In-process LRU (L1, short TTL) in front of a shared cache alias (L2).
+
+    Writes go to L2 first and then to the local L1, which keeps pickles as LocMemCache
+    does, so callers never share (and mutate) one object; other processes can serve a value
+    they already hold in L1 for up to L1_TIMEOUT seconds after it changed. Atomic
+    operations (add, incr) always run against L2, and keys starting with an
+    L1_EXCLUDE prefix bypass L1 entirely.
+
+    OPTIONS: L2 (alias, default "shared"), L1_TIMEOUT (seconds, 0 disables L1),
+    L1_MAX_ENTRIES, L1_EXCLUDE (tuple of key prefixes).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = options.get('L1_TIMEOUT', 2)
+        self.l1_max_entries = options.get('L1_MAX_ENTRIES', 1024)
+        self.l1_exclude = tuple(options.get('L1_EXCLUDE', ()))
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def uses_l1(self, key):
+        return self.l1_timeout > 0 and not str(key).startswith(self.l1_exclude)
+
+    def l1_get(self, key, version):
+        l1_key = self.make_and_validate_key(key, version)
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return _missing
+            if entry[1] <= time.monotonic():
+                del self._l1[l1_key]
+                return _missing
+            self._l1.move_to_end(l1_key)
+            pickled = entry[0]
+        return pickle.loads(pickled)
+
+    def l1_ttl(self, timeout):
+        """Seconds an L1 copy may live for a cache timeout: no longer than L2 keeps it, nor L1_TIMEOUT"""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.l2.default_timeout
+        return self.l1_timeout if timeout is None else min(self.l1_timeout, timeout)
+
+    def l1_set(self, key, value, timeout, version):
+        if not self.uses_l1(key):
+            return
+        ttl = self.l1_ttl(timeout)
+        l1_key = self.make_and_validate_key(key, version)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL) if ttl > 0 else None
+        with self._lock:
+            if ttl <= 0:
+                self._l1.pop(l1_key, None)
+                return
+            self._l1[l1_key] = (pickled, time.monotonic() + ttl)
+            self._l1.move_to_end(l1_key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def l1_touch(self, key, timeout, version):
+        """Shorten the L1 copy's life to the new timeout; touching never makes it live longer"""
+        ttl = self.l1_ttl(timeout)
+        l1_key = self.make_and_validate_key(key, version)
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return
+            if ttl <= 0:
+                del self._l1[l1_key]
+            else:
+                self._l1[l1_key] = (entry[0], min(entry[1], time.monotonic() + ttl))
+
+    def l1_delete(self, key, version):
+        l1_key = self.make_and_validate_key(key, version)
+        with self._lock:
+            self._l1.pop(l1_key, None)
+
+    def get(self, key, default=None, version=None):
+        started = time.perf_counter()
+        if self.uses_l1(key):
+            value = self.l1_get(key, version)
+            if value is not _missing:
+                cache_metrics.record(key, 'l1_hits', time.perf_counter() - started)
+                record_cache_lookup(hit=True)
+                return value
+        value = self.l2.get(key, _missing, version=version)
+        if value is _missing:
+            cache_metrics.record(key, 'misses', time.perf_counter() - started)
+            record_cache_lookup(hit=False)
+            return default
+        self.l1_set(key, value, self.l1_timeout, version)
+        cache_metrics.record(key, 'l2_hits', time.perf_counter() - started)
+        record_cache_lookup(hit=True)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self.l1_set(key, value, timeout, version)
+        cache_metrics.record(key, 'sets')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self.l1_set(key, value, timeout, version)
+            cache_metrics.record(key, 'sets')
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        touched = self.l2.touch(key, timeout, version=version)
+        if touched:
+            self.l1_touch(key, timeout, version)
+        else:
+            # Gone from L2, so the L1 copy is one a delete or expiry left behind
+            self.l1_delete(key, version)
+        return touched
+
+    def delete(self, key, version=None):
+        self.l1_delete(key, version)
+        cache_metrics.record(key, 'deletes')
+        return self.l2.delete(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.l1_delete(key, version)
+        return self.l2.incr(key, delta, version=version)
+
+    def has_key(self, key, version=None):
+        if self.uses_l1(key) and self.l1_get(key, version) is not _missing:
+            return True
+        return self.l2.has_key(key, version=version)
+
+    def clear(self):
+        self.clear_l1()
+        self.l2.clear()
+
+    def clear_l1(self):
+        with self._lock:
+            self._l1.clear()
+
+    def close(self, **kwargs):
+        self.l2.close(**kwargs)
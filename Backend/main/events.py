@@ -0,0 +1,156 @@
+"""
+Publish/subscribe for server-pushed events. ``memory://`` fans out to subscribers in this
+process only; ``redis://host:6379/0`` goes through Redis pub/sub, so events published by one
+worker (e.g. a WSGI process handling the write) reach clients connected to another.
+"""
+import asyncio
+import json
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Sent instead of the queued events when a subscriber falls this far behind; the client refetches
+RESYNC_EVENT = {'type': 'resync'}
+
+
+def encode_event(event):
+    return json.dumps(event, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+class MemorySubscription:
+    """Async context manager; registered with the broker while inside ``async with``"""
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = channels
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = None
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.broker.add_subscriber(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.remove_subscriber(self)
+
+    def deliver(self, event):
+        """Runs on the subscriber's event loop"""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC_EVENT
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout=None):
+        """Next event, or None when ``timeout`` seconds pass without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class MemoryBroker:
+    """In-process fan-out; publish() may be called from any thread"""
+
+    def __init__(self, queue_size):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down; it unsubscribes on its way out
+                pass
+
+    def subscribe(self, channels):
+        return MemorySubscription(self, channels, self.queue_size)
+
+    def add_subscriber(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+
+    def remove_subscriber(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({id(s) for subscribers in self._subscribers.values() for s in subscribers})
+
+
+class RedisSubscription:
+    def __init__(self, url, channels):
+        self.url = url
+        self.channels = channels
+        self.client = self.pubsub = None
+
+    async def __aenter__(self):
+        import redis.asyncio
+        self.client = redis.asyncio.Redis.from_url(self.url)
+        self.pubsub = self.client.pubsub()
+        await self.pubsub.subscribe(*self.channels)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+
+class RedisBroker:
+    """Redis pub/sub; needs the redis package"""
+
+    def __init__(self, url, prefix='events:'):
+        import redis
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, channel, event):
+        self._client.publish(self.prefix + channel, encode_event(event))
+
+    def subscribe(self, channels):
+        return RedisSubscription(self.url, [self.prefix + channel for channel in channels])
+
+    def subscriber_count(self):
+        return None
+
+
+def broker_from_url(url, queue_size=100):
+    scheme = url.split('://', 1)[0]
+    if scheme == 'memory':
+        return MemoryBroker(queue_size)
+    if scheme in ('redis', 'rediss'):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported events broker URL scheme: {scheme!r}")
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+def get_broker():
+    """The broker for EVENTS_BROKER_URL, created once per process"""
+    url = getattr(settings, 'EVENTS_BROKER_URL', 'memory://')
+    with _brokers_lock:
+        if url not in _brokers:
+            _brokers[url] = broker_from_url(url, getattr(settings, 'EVENTS_QUEUE_SIZE', 100))
+        return _brokers[url]
+
+
+def publish(channel, event):
+    get_broker().publish(channel, event)
@@ -0,0 +1,303 @@
+"""
+Request-level performance metrics: per-view latency histograms, database query counts and
+time, cache hits/misses and external call (Gemini, password hashing) durations.
+Exposed in Prometheus text format on /metrics and per response in a Server-Timing header.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label tuple, in the Prometheus layout"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series['buckets'][i] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+
+class RequestTimings:
+    """What one request spent on the database, the cache and external calls"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.external = {}
+
+    def add_external(self, service, seconds):
+        calls, total = self.external.get(service, (0, 0.0))
+        self.external[service] = (calls + 1, total + seconds)
+
+    def server_timing(self, total):
+        entries = [
+            f'app;dur={total * 1000:.1f}',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+        ]
+        for service, (calls, seconds) in self.external.items():
+            entries.append(f'{service};dur={seconds * 1000:.1f};desc="{calls} calls"')
+        return ', '.join(entries)
+
+
+_current = ContextVar('request_timings', default=None)
+
+
+class MetricsRegistry:
+    """Process-wide aggregates of every finished request and external call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = Histogram()
+            self.external = Histogram()
+            self.requests = {}
+            self.db = {}
+
+    def observe_request(self, view, method, status, seconds, timings):
+        with self._lock:
+            self.latency.observe((view, method), seconds)
+            key = (view, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            queries, db_seconds = self.db.get(view, (0, 0.0))
+            self.db[view] = (queries + timings.db_queries, db_seconds + timings.db_seconds)
+
+    def observe_external(self, service, seconds):
+        with self._lock:
+            self.external.observe((service,), seconds)
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def timed_call(service):
+    """Time an external call (e.g. "gemini") into the current request and the registry"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe_external(service, seconds)
+        timings = _current.get()
+        if timings is not None:
+            timings.add_external(service, seconds)
+
+
+def record_cache_lookup(hit):
+    timings = _current.get()
+    if timings is not None:
+        if hit:
+            timings.cache_hits += 1
+        else:
+            timings.cache_misses += 1
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_query_recorders():
+    """Cover this thread's open connections, which connection_created missed if opened before this import"""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+def on_connection_created(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+connection_created.connect(on_connection_created, dispatch_uid='main.metrics.on_connection_created')
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Times every request and adds a Server-Timing header with its db/cache/external breakdown"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        self.recorders_installed = False
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        install_query_recorders()
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        if not self.recorders_installed:
+            # Connections belong to the thread that uses them: the ORM under ASGI runs on
+            # sync_to_async's thread-sensitive thread, not on the event loop. Later connections
+            # there are covered by connection_created.
+            await sync_to_async(install_query_recorders)()
+            self.recorders_installed = True
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        # Streaming responses are timed to their first byte
+        seconds = time.perf_counter() - timings.started
+        registry.observe_request(view_label(request), request.method, response.status_code, seconds, timings)
+        response['Server-Timing'] = timings.server_timing(seconds)
+        return response
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_histogram(lines, name, help_text, histogram, label_names):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for labels, series in sorted(histogram.series.items()):
+        base = dict(zip(label_names, labels))
+        for bound, count in zip(histogram.buckets, series['buckets']):
+            lines.append(f'{name}_bucket{format_labels(**base, le=bound)} {count}')
+        lines.append(f'{name}_bucket{format_labels(**base, le="+Inf")} {series["count"]}')
+        lines.append(f'{name}_sum{format_labels(**base)} {series["sum"]:.6f}')
+        lines.append(f'{name}_count{format_labels(**base)} {series["count"]}')
+
+
+def render_counter(lines, name, help_text, samples, kind='counter'):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+    for labels, value in samples:
+        lines.append(f'{name}{format_labels(**labels)} {value}')
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    from main.cache import cache_metrics
+    from main.db import connection_metrics
+    from main.events import get_broker
+    from users.chat_cache import chat_response_cache
+
+    lines = []
+    with registry._lock:
+        render_histogram(
+            lines, 'http_request_duration_seconds', 'Request latency per view.',
+            registry.latency, ('view', 'method'),
+        )
+        render_counter(lines, 'http_requests_total', 'Finished requests per view and status.', [
+            ({'view': view, 'method': method, 'status': status}, count)
+            for (view, method, status), count in sorted(registry.requests.items())
+        ])
+        render_counter(lines, 'http_request_db_queries_total', 'Database queries run by each view.', [
+            ({'view': view}, queries) for view, (queries, _) in sorted(registry.db.items())
+        ])
+        render_counter(lines, 'http_request_db_seconds_total', 'Database time spent by each view.', [
+            ({'view': view}, f'{seconds:.6f}') for view, (_, seconds) in sorted(registry.db.items())
+        ])
+        render_histogram(
+            lines, 'external_call_duration_seconds', 'Duration of calls to Gemini and the password hasher.',
+            registry.external, ('service',),
+        )
+
+    cache_groups = sorted(cache_metrics.snapshot().items())
+    render_counter(lines, 'cache_lookups_total', 'Cache lookups per key group and tier.', [
+        ({'group': group, 'result': result}, counters[field])
+        for group, counters in cache_groups
+        for result, field in (('l1_hit', 'l1_hits'), ('l2_hit', 'l2_hits'), ('miss', 'misses'))
+    ])
+    render_counter(lines, 'cache_get_seconds_total', 'Time spent in cache lookups per key group.', [
+        ({'group': group}, counters['get_seconds']) for group, counters in cache_groups
+    ])
+
+    chat_cache = chat_response_cache.metrics()
+    render_counter(lines, 'chat_response_cache_total', 'Chat response cache hits, misses and evictions.', [
+        ({'result': result}, chat_cache[result]) for result in ('hits', 'misses', 'evictions')
+    ])
+    render_counter(lines, 'chat_response_cache_entries', 'Answers held in the chat response cache.', [
+        ({}, chat_cache['entries'])
+    ], kind='gauge')
+
+    subscribers = get_broker().subscriber_count()
+    if subscribers is not None:
+        render_counter(lines, 'events_subscribers', 'Open WebSocket/SSE event subscriptions.', [
+            ({}, subscribers)
+        ], kind='gauge')
+
+    render_counter(lines, 'db_connections_opened_total', 'New database connections per alias.', [
+        ({'alias': alias}, count)
+        for alias, count in sorted(connection_metrics.snapshot()['connections_opened'].items())
+    ])
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint; requires "Authorization: Bearer <METRICS_TOKEN>", and is only
+    open without a token when DEBUG is on
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse(status=403)
+    elif not settings.DEBUG:
+        return HttpResponse(status=403)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
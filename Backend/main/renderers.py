@@ -0,0 +1,29 @@
+"""
+JSON renderer backed by orjson, selected with API_JSON_RENDERER=orjson. orjson is an optional
+dependency (pip install orjson); without it the setting falls back to DRF's JSONRenderer.
+"""
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = DjangoJSONEncoder()
+
+
+def encode_other(value):
+    """Types orjson doesn't handle natively: Decimal, timedelta, lazy translation strings"""
+    return _encoder.default(value)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=encode_other, option=orjson.OPT_NON_STR_KEYS)
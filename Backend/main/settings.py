@@ -10,10 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import importlib.util
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
-from urllib.parse import urlparse
+from main.cache import cache_from_url
+from main.db import database_from_url
 
 
 # Load environment variables from .env file
@@ -29,7 +32,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.getenv('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = []
 
@@ -50,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'main.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,7 +65,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'main.urls'
+# Serve travel-request CRUD, login, signup and chat from async views on the async ORM.
+# Only pays off under an ASGI server (main.asgi); under WSGI each async view gets its own event loop
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+ROOT_URLCONF = 'main.async_urls' if ASYNC_VIEWS else 'main.urls'
 
 TEMPLATES = [
     {
@@ -79,22 +87,82 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'main.wsgi.application'
-tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Keep connections open between requests (seconds), with a liveness check before reuse
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+# psycopg 3 connection pool (Django 5.1+); replaces persistent connections when enabled
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+DB_POOL_OPTIONS = {
+    'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+    'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+    'timeout': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+} if DB_POOL else None
+
+# DATABASE_URL falls back to a local SQLite file in development (DEBUG) only, so a
+# deployment missing it fails at startup instead of writing to a throwaway file
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    if not DEBUG:
+        raise ImproperlyConfigured("DATABASE_URL must be set when DEBUG is off")
+    DATABASE_URL = f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
 DATABASES = {
+    'default': database_from_url(
+        DATABASE_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        health_checks=DB_CONN_HEALTH_CHECKS,
+        pool=DB_POOL_OPTIONS,
+    ),
+}
+
+# Optional read replica, used for the GET paths of the travel-requests API
+if os.getenv("DATABASE_REPLICA_URL"):
+    DATABASES['replica'] = database_from_url(
+        os.getenv("DATABASE_REPLICA_URL"),
+        conn_max_age=DB_CONN_MAX_AGE,
+        health_checks=DB_CONN_HEALTH_CHECKS,
+        pool=DB_POOL_OPTIONS,
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_ROUTERS = ['main.db.ReadReplicaRouter']
+
+# Cache
+# "shared" is the cross-process cache (CACHE_URL, e.g. redis://host:6379/0 or file:///var/tmp/django_cache);
+# "default" serves hot keys from an in-process L1 for CACHE_L1_TIMEOUT seconds in front of it
+CACHE_L1_TIMEOUT = int(os.getenv('CACHE_L1_TIMEOUT', 2))
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': tmpPostgres.path.replace('/', ''),
-        'USER': tmpPostgres.username,
-        'PASSWORD': tmpPostgres.password,
-        'HOST': tmpPostgres.hostname,
-        'PORT': 5432,
-    }
+        'BACKEND': 'main.cache.TieredCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_TIMEOUT': CACHE_L1_TIMEOUT,
+            'L1_MAX_ENTRIES': int(os.getenv('CACHE_L1_MAX_ENTRIES', 1024)),
+            # Rate limit counters, token revocations, the stats lock/version and the list change
+            # marks must always see the shared value
+            'L1_EXCLUDE': ('throttle_', 'auth:', 'travel_request_stats:', 'travel_requests:'),
+        },
+    },
+    'shared': cache_from_url(
+        os.getenv('CACHE_URL', 'locmem://shared'),
+        timeout=int(os.getenv('CACHE_TIMEOUT', 300)),
+    ),
 }
 
+# Real-time events (WebSocket /ws/travel-requests/ and SSE /users/events/)
+# memory:// reaches clients connected to this process only; with several processes use redis://host:6379/1
+EVENTS_BROKER_URL = os.getenv('EVENTS_BROKER_URL', 'memory://')
+# Events buffered per connection before a slow client is told to resync instead
+EVENTS_QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', 100))
+# Seconds between SSE keepalive comments
+EVENTS_KEEPALIVE = int(os.getenv('EVENTS_KEEPALIVE', 25))
+
+# Metrics
+# /metrics requires "Authorization: Bearer <METRICS_TOKEN>"; without a token it is only served when DEBUG is on
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -111,6 +179,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing profiles. Hashes from a hasher lower in the list, or with other
+# PBKDF2 iterations, are upgraded to the first hasher on the next successful login.
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', 870000))
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': [
+        'authentication.hashers.TunedPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ],
+    'scrypt': [
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+        'authentication.hashers.TunedPBKDF2PasswordHasher',
+    ],
+    # Requires argon2-cffi
+    'argon2': [
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'authentication.hashers.TunedPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ],
+}
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[os.getenv('PASSWORD_HASHER_PROFILE', 'pbkdf2')]
+
+# Login and signup hash passwords in this many worker processes, 0 hashes on the request thread
+LOGIN_HASH_WORKERS = int(os.getenv('LOGIN_HASH_WORKERS', 0))
+LOGIN_HASH_TIMEOUT = int(os.getenv('LOGIN_HASH_TIMEOUT', 10))
+
 # Internationalization
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -138,13 +231,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'authentication.User'
 
 # REST Framework settings
+# Stateless mode builds request.user from signed token claims instead of a users query
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'False') == 'True'
+JWT_TOKEN_VERSION_CACHE_TIMEOUT = int(os.getenv('JWT_TOKEN_VERSION_CACHE_TIMEOUT', 300))
+
+# "orjson" renders API JSON with orjson when it is installed (pip install orjson), "drf" keeps DRF's renderer
+API_JSON_RENDERER = (
+    'main.renderers.ORJSONRenderer'
+    if os.getenv('API_JSON_RENDERER', 'drf') == 'orjson' and importlib.util.find_spec('orjson') else
+    'rest_framework.renderers.JSONRenderer'
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authentication.authentication.StatelessJWTAuthentication'
+        if JWT_STATELESS_AUTH else
+        'authentication.authentication.RevocableJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        API_JSON_RENDERER,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv('LOGIN_RATE_PER_IP', '30/min'),
+        'login_email': os.getenv('LOGIN_RATE_PER_EMAIL', '10/min'),
+    },
+}
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'authentication.tokens.TokenClaimsObtainPairSerializer',
+    # /api/token/refresh/ refuses refresh tokens revoked by logout or a token version bump
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.tokens.TokenClaimsRefreshSerializer',
 }
 
 # CORS settings
@@ -185,3 +305,36 @@ CORS_ALLOW_HEADERS = [
 
 # OpenAI Configuration
 # OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+
+# Travel stats settings
+TRAVEL_STATS_RECENT_LIMIT = int(os.getenv('TRAVEL_STATS_RECENT_LIMIT', 10))
+TRAVEL_STATS_TOP_N = int(os.getenv('TRAVEL_STATS_TOP_N', 5))
+# Stats are patched on every change, the timeout is only a safety net
+TRAVEL_STATS_CACHE_TIMEOUT = int(os.getenv('TRAVEL_STATS_CACHE_TIMEOUT', 3600))
+
+# Serialized travel-request list pages are kept this long; any write retires them sooner
+TRAVEL_LIST_CACHE_TIMEOUT = int(os.getenv('TRAVEL_LIST_CACHE_TIMEOUT', 60))
+
+# Rows fetched per server-side cursor round trip (and per streamed chunk) by the export endpoint
+TRAVEL_EXPORT_CHUNK_SIZE = int(os.getenv('TRAVEL_EXPORT_CHUNK_SIZE', 2000))
+
+# Chat settings
+CHAT_STREAM_TIMEOUT = int(os.getenv('CHAT_STREAM_TIMEOUT', 60))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', 256))
+CHAT_CACHE_TTL = int(os.getenv('CHAT_CACHE_TTL', 600))
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv('CHAT_PROMPT_TOKEN_BUDGET', 2000))
+CHAT_PROMPT_RECENT_SAMPLE = int(os.getenv('CHAT_PROMPT_RECENT_SAMPLE', 10))
+CHAT_PROMPT_PURPOSE_CHARS = int(os.getenv('CHAT_PROMPT_PURPOSE_CHARS', 80))
+# "prompt" ships the stats in the prompt, "tools" lets Gemini query them through function calls
+CHAT_MODE = os.getenv('CHAT_MODE', 'prompt')
+# Set to "fake" to answer chats offline without Gemini (local runs, tests, chat job workers)
+CHAT_LLM_BACKEND = os.getenv('CHAT_LLM_BACKEND', 'gemini')
+# Milliseconds the fake backend waits per answer, standing in for Gemini's latency (see bench_asgi)
+CHAT_FAKE_LATENCY_MS = int(os.getenv('CHAT_FAKE_LATENCY_MS', 0))
+CHAT_JOB_MAX_CONCURRENCY = int(os.getenv('CHAT_JOB_MAX_CONCURRENCY', 4))
+CHAT_JOB_MAX_ATTEMPTS = int(os.getenv('CHAT_JOB_MAX_ATTEMPTS', 3))
+CHAT_JOB_RETRY_BACKOFF = int(os.getenv('CHAT_JOB_RETRY_BACKOFF', 2))
+# Seconds a running job's lease lasts without a heartbeat before another worker reclaims it
+CHAT_JOB_TIMEOUT = int(os.getenv('CHAT_JOB_TIMEOUT', 120))
+# Seconds one Gemini call may take; keep it below CHAT_JOB_TIMEOUT
+CHAT_LLM_TIMEOUT = int(os.getenv('CHAT_LLM_TIMEOUT', 60))
@@ -0,0 +1,10 @@
+from django.urls import path
+from .async_views import chat, travel_request_detail, travel_requests
+
+# Listed ahead of users.urls by main.async_urls; the router's bulk, export and bulk-status
+# routes still answer the rest of travel-requests/
+urlpatterns = [
+    path('travel-requests/', travel_requests, name='travel-request-list'),
+    path('travel-requests/<int:pk>/', travel_request_detail, name='travel-request-detail'),
+    path('chat/', chat, name='chat'),
+]
@@ -0,0 +1,178 @@
+"""
+Async counterparts of TravelRequestViewSet's list/create/retrieve/update/destroy and of chat,
+on the async ORM. main.async_urls routes them instead of the sync views when ASYNC_VIEWS is on;
+the bulk, export and bulk-status actions stay sync. Bodies and status codes match the sync views.
+"""
+import logging
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException, NotAuthenticated
+from rest_framework.request import Request
+from authentication.async_views import read_json
+from authentication.authentication import as_user_instance
+from main.db import read_from_replica
+from .list_cache import (
+    acache_page, aget_cached_page, alast_changed, not_modified_response, set_validators, validator_digest,
+)
+from .llm import CHAT_MODE_ERROR, aanswer_chat, is_valid_chat_mode
+from .models import TravelRegistration
+from .stats import stats_row
+from .views import TravelRequestViewSet, get_admin_user, get_authenticated_user
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def bind_viewset(request, user, action):
+    """
+    A TravelRequestViewSet for ``request`` that never dispatches: the async views borrow its
+    queryset, ?fields=, filtering, ordering and pagination, which don't touch the database
+    """
+    drf_request = Request(request)
+    drf_request.user = user
+    return TravelRequestViewSet(request=drf_request, format_kwarg=None, action=action, args=(), kwargs={})
+
+
+def error_response(exc):
+    """An APIException as DRF's exception handler would answer it"""
+    data = exc.detail if isinstance(exc.detail, (dict, list)) else {"detail": exc.detail}
+    return JsonResponse(data, status=exc.status_code, safe=False)
+
+
+def not_found_response():
+    return JsonResponse({"detail": "No TravelRegistration matches the given query."}, status=404)
+
+
+def bad_json_response():
+    return JsonResponse({"error": "Expected a JSON object"}, status=400)
+
+
+@csrf_exempt
+async def travel_requests(request):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return error_response(NotAuthenticated())
+    if request.method == "GET":
+        return await list_travel_requests(request, user)
+    if request.method == "POST":
+        return await create_travel_request(request, user)
+    return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+@csrf_exempt
+async def travel_request_detail(request, pk):
+    user = await get_authenticated_user(request)
+    if user is None:
+        return error_response(NotAuthenticated())
+    if request.method == "GET":
+        return await retrieve_travel_request(request, user, pk)
+    if request.method in ("PUT", "PATCH"):
+        return await update_travel_request(request, user, pk)
+    if request.method == "DELETE":
+        return await destroy_travel_request(request, user, pk)
+    return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+async def list_travel_requests(request, user):
+    """TravelRequestViewSet.list: 304 while nothing changed, cached pages, values() rows"""
+    view = bind_viewset(request, user, 'list')
+    with read_from_replica():
+        queryset = view.get_queryset()
+        changed = await alast_changed(user, queryset)
+        digest = validator_digest(view.request, changed)
+        not_modified = not_modified_response(request, digest, changed)
+        if not_modified is not None:
+            return not_modified
+        data = await aget_cached_page(digest)
+        if data is None:
+            try:
+                data = await view.arender_page(queryset)
+            except APIException as e:
+                # Bad filters and cursors
+                return error_response(e)
+            await acache_page(digest, data, changed, queryset.db)
+    return set_validators(JsonResponse(data), digest, changed, queryset.db)
+
+
+async def create_travel_request(request, user):
+    data = read_json(request)
+    if data is None:
+        return bad_json_response()
+    view = bind_viewset(request, user, 'create')
+    serializer = view.get_serializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    travel_request = await TravelRegistration.objects.acreate(
+        user=as_user_instance(user), **serializer.validated_data
+    )
+    return JsonResponse(view.get_serializer(travel_request).data, status=201)
+
+
+async def retrieve_travel_request(request, user, pk):
+    view = bind_viewset(request, user, 'retrieve')
+    with read_from_replica():
+        queryset = view.get_queryset()
+        changed = await alast_changed(user, queryset)
+        digest = validator_digest(view.request, changed)
+        not_modified = not_modified_response(request, digest, changed)
+        if not_modified is not None:
+            return not_modified
+        try:
+            travel_request = await queryset.aget(pk=pk)
+        except TravelRegistration.DoesNotExist:
+            return not_found_response()
+    return set_validators(JsonResponse(view.get_serializer(travel_request).data), digest, changed, queryset.db)
+
+
+async def update_travel_request(request, user, pk):
+    if not user.is_staff:
+        return JsonResponse({"error": "Only admins can update travel requests"}, status=403)
+    data = read_json(request)
+    if data is None:
+        return bad_json_response()
+    partial = request.method == "PATCH"
+    view = bind_viewset(request, user, 'partial_update' if partial else 'update')
+    try:
+        travel_request = await view.get_queryset().aget(pk=pk)
+    except TravelRegistration.DoesNotExist:
+        return not_found_response()
+    serializer = view.get_serializer(travel_request, data=data, partial=partial)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+    # What ModelSerializer.update does, with asave(); the stats signal gets the row it already has
+    travel_request._stats_previous = stats_row(travel_request)
+    for name, value in serializer.validated_data.items():
+        setattr(travel_request, name, value)
+    await travel_request.asave()
+    return JsonResponse(view.get_serializer(travel_request).data)
+
+
+async def destroy_travel_request(request, user, pk):
+    view = bind_viewset(request, user, 'destroy')
+    try:
+        travel_request = await view.get_queryset().aget(pk=pk)
+    except TravelRegistration.DoesNotExist:
+        return not_found_response()
+    await travel_request.adelete()
+    return HttpResponse(status=204)
+
+
+@csrf_exempt
+async def chat(request):
+    """Async counterpart of views.chat: the model call is awaited instead of holding a thread"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    if await get_admin_user(request) is None:
+        return JsonResponse({"error": "Admin authentication required"}, status=403)
+    data = read_json(request) or {}
+    message = data.get("message")
+    if not message:
+        return JsonResponse({"error": "Message is required"}, status=400)
+    if not is_valid_chat_mode(data.get("mode")):
+        return JsonResponse({"error": CHAT_MODE_ERROR}, status=400)
+    try:
+        answer = await aanswer_chat(message, data.get("mode"))
+    except Exception as e:
+        logger.error(f"Error generating response with Gemini: {str(e)}")
+        return JsonResponse({"error": "Failed to generate response"}, status=500)
+    return JsonResponse({"response": answer})
@@ -0,0 +1,72 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+def normalize_message(message):
+    """Fold case, punctuation and spacing so trivially different phrasings share an entry"""
+    message = re.sub(r"[^\w\s]", " ", message.casefold())
+    return " ".join(message.split())
+
+
+class ChatResponseCache:
+    """In-process LRU cache of chat answers with a per-entry TTL and hit/miss counters"""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, message, stats, mode=None):
+        # A new stats version means the data changed, so older answers can't be reused; prompt
+        # and tools mode answer the same question differently, so each keeps its own entry
+        return (normalize_message(message), stats.get('version'), mode or settings.CHAT_MODE)
+
+    def get(self, message, stats, mode=None):
+        key = self.make_key(message, stats, mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, message, stats, response, mode=None):
+        key = self.make_key(message, stats, mode)
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+chat_response_cache = ChatResponseCache(
+    max_entries=getattr(settings, 'CHAT_CACHE_MAX_ENTRIES', 256),
+    ttl=getattr(settings, 'CHAT_CACHE_TTL', 600),
+)
@@ -0,0 +1,209 @@
+import json
+from types import SimpleNamespace
+from django.utils.dateparse import parse_date
+from google.genai import types
+from main.metrics import timed_call
+from .models import TravelRegistration
+from .rollup import ROLLUP_DIMENSIONS, ROLLUP_INTERVALS, RollupQueryError, rollup_series
+from .stats import count_by, recent_requests_queryset, format_recent_request
+
+MAX_TOOL_ROUNDS = 4
+MAX_ROWS = 50
+MAX_SERIES_POINTS = 200
+GROUP_BY_FIELDS = {
+    'status': 'status',
+    'travel_mode': 'travel_mode',
+    'booking_mode': 'booking_mode',
+    'project_name': 'project_name',
+    'username': 'user__username',
+}
+
+TOOL_PROMPT = """You are a travel request assistant. You do not have the data in this message;
+call the provided functions to fetch exactly the counts or requests you need, then answer.
+
+User Question: {message}
+
+Provide a professional and concise response based on the function results. Include relevant statistics and percentages where appropriate."""
+
+FILTER_PROPERTIES = {
+    'status': {'type': 'STRING', 'enum': [value for value, _ in TravelRegistration.STATUS_CHOICES]},
+    'travel_mode': {'type': 'STRING', 'enum': [value for value, _ in TravelRegistration.TRAVEL_MODES]},
+    'booking_mode': {'type': 'STRING', 'enum': [value for value, _ in TravelRegistration.BOOKING_MODES]},
+    'project_name': {'type': 'STRING', 'description': "Exact project name"},
+    'username': {'type': 'STRING', 'description': "Username of the employee who raised the request"},
+    'start_date_from': {'type': 'STRING', 'description': "Earliest travel start date, YYYY-MM-DD"},
+    'start_date_to': {'type': 'STRING', 'description': "Latest travel start date, YYYY-MM-DD"},
+}
+
+TOOL_DECLARATIONS = [
+    types.FunctionDeclaration(
+        name='count_requests',
+        description="Count travel requests matching the filters, optionally grouped by one field.",
+        parameters={
+            'type': 'OBJECT',
+            'properties': {
+                **FILTER_PROPERTIES,
+                'group_by': {'type': 'STRING', 'enum': list(GROUP_BY_FIELDS)},
+            },
+        },
+    ),
+    types.FunctionDeclaration(
+        name='count_requests_over_time',
+        description=(
+            "Count travel requests by the day they were raised, bucketed per day, week, month or year and "
+            "optionally grouped by one field. Use this for trends; it reads a pre-aggregated table."
+        ),
+        parameters={
+            'type': 'OBJECT',
+            'properties': {
+                **{field: FILTER_PROPERTIES[field] for field in ROLLUP_DIMENSIONS},
+                'interval': {'type': 'STRING', 'enum': list(ROLLUP_INTERVALS)},
+                'group_by': {'type': 'STRING', 'enum': list(ROLLUP_DIMENSIONS)},
+                'created_from': {'type': 'STRING', 'description': "First day the requests were raised, YYYY-MM-DD"},
+                'created_to': {'type': 'STRING', 'description': "Last day the requests were raised, YYYY-MM-DD"},
+            },
+        },
+    ),
+    types.FunctionDeclaration(
+        name='find_requests',
+        description=f"List the newest travel requests matching the filters, at most {MAX_ROWS}.",
+        parameters={
+            'type': 'OBJECT',
+            'properties': {
+                **FILTER_PROPERTIES,
+                'limit': {'type': 'INTEGER', 'description': f"Number of requests to return, 1-{MAX_ROWS}"},
+            },
+        },
+    ),
+]
+
+
+class ToolError(Exception):
+    pass
+
+
+def filter_requests(status=None, travel_mode=None, booking_mode=None, project_name=None,
+                    username=None, start_date_from=None, start_date_to=None):
+    """Translate tool arguments into a parameterized TravelRegistration queryset"""
+    filters = {
+        'status': status,
+        'travel_mode': travel_mode,
+        'booking_mode': booking_mode,
+        'project_name': project_name,
+        'user__username': username,
+    }
+    for key, value in (('start_date__gte', start_date_from), ('start_date__lte', start_date_to)):
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ToolError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+            filters[key] = parsed
+    return TravelRegistration.objects.filter(**{key: value for key, value in filters.items() if value})
+
+
+def count_requests(group_by=None, **filters):
+    queryset = filter_requests(**filters)
+    if not group_by:
+        return {'count': queryset.count()}
+    if group_by not in GROUP_BY_FIELDS:
+        raise ToolError(f"Cannot group by {group_by!r}")
+    field = GROUP_BY_FIELDS[group_by]
+    return {
+        'total': queryset.count(),
+        'groups': [{group_by: row[field], 'count': row['count']} for row in count_by(queryset, field, limit=MAX_ROWS)],
+    }
+
+
+def count_requests_over_time(interval='month', group_by=None, created_from=None, created_to=None, **filters):
+    days = {}
+    for name, value in (('since', created_from), ('until', created_to)):
+        days[name] = parse_date(value) if value else None
+        if value and days[name] is None:
+            raise ToolError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+    try:
+        series = rollup_series(interval, group_by, **days, **filters)
+    except RollupQueryError as e:
+        raise ToolError(str(e))
+    points = [{**point, 'period': point['period'].isoformat()} for point in series[-MAX_SERIES_POINTS:]]
+    return {'points': points, 'truncated': len(series) > MAX_SERIES_POINTS}
+
+
+def find_requests(limit=10, **filters):
+    limit = max(1, min(int(limit), MAX_ROWS))
+    return {'requests': [format_recent_request(req) for req in recent_requests_queryset(filter_requests(**filters), limit)]}
+
+
+TOOLS = {
+    'count_requests': count_requests,
+    'count_requests_over_time': count_requests_over_time,
+    'find_requests': find_requests,
+}
+
+
+def run_tool(name, args):
+    """Execute one function call from the model, reporting bad calls back to it instead of failing"""
+    tool = TOOLS.get(name)
+    if tool is None:
+        return {'error': f"Unknown function {name!r}"}
+    try:
+        return tool(**(args or {}))
+    except (ToolError, TypeError, ValueError) as e:
+        return {'error': str(e)}
+
+
+class GeminiToolModel:
+    """Gemini with the travel request functions attached and automatic function calling disabled"""
+
+    def __init__(self, client, model, http_options=None):
+        self.client = client
+        self.model = model
+        self.config = types.GenerateContentConfig(
+            tools=[types.Tool(function_declarations=TOOL_DECLARATIONS)],
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+            http_options=http_options,
+        )
+
+    def start(self, prompt):
+        return [types.Content(role='user', parts=[types.Part.from_text(text=prompt)])]
+
+    def generate(self, contents):
+        with timed_call('gemini'):
+            return self.client.models.generate_content(model=self.model, contents=contents, config=self.config)
+
+    def add_tool_results(self, contents, response, results):
+        contents.append(response.candidates[0].content)
+        contents.append(types.Content(
+            role='tool',
+            parts=[types.Part.from_function_response(name=name, response={'result': result}) for name, result in results],
+        ))
+
+
+class StubToolModel:
+    """Offline stand-in for Gemini: issues a fixed list of function calls, then echoes their results"""
+
+    def __init__(self, calls=None):
+        self.calls = calls if calls is not None else [('count_requests', {'group_by': 'status'})]
+
+    def start(self, prompt):
+        return [prompt]
+
+    def generate(self, contents):
+        if len(contents) == 1:
+            calls = [SimpleNamespace(name=name, args=args) for name, args in self.calls]
+            return SimpleNamespace(function_calls=calls, text=None)
+        return SimpleNamespace(function_calls=None, text=json.dumps(contents[-1], default=str))
+
+    def add_tool_results(self, contents, response, results):
+        contents.append([{'name': name, 'result': result} for name, result in results])
+
+
+def answer_with_tools(message, tool_model):
+    """Let the model request aggregates through function calls until it produces an answer"""
+    contents = tool_model.start(TOOL_PROMPT.format(message=message))
+    for _ in range(MAX_TOOL_ROUNDS):
+        response = tool_model.generate(contents)
+        if not response.function_calls:
+            return response.text
+        results = [(call.name, run_tool(call.name, call.args)) for call in response.function_calls]
+        tool_model.add_tool_results(contents, response, results)
+    raise ToolError(f"No answer after {MAX_TOOL_ROUNDS} rounds of function calls")
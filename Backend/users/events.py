@@ -0,0 +1,137 @@
+"""
+Travel-request events pushed to browsers, so they don't have to poll the list:
+employees get status changes of their own requests, admins additionally get every new
+Pending request and every status change. Served over WebSocket (/ws/travel-requests/,
+see main/asgi.py) and Server-Sent Events (/users/events/).
+"""
+import asyncio
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from main.events import encode_event, get_broker, publish
+
+ADMIN_CHANNEL = "travel_requests:admins"
+WEBSOCKET_PATH = "/ws/travel-requests/"
+# Close code for a rejected handshake (4000-4999 are free for applications)
+CLOSE_UNAUTHORIZED = 4401
+NEW_REQUEST_FIELDS = (
+    'id', 'project_name', 'travel_purpose', 'start_date', 'travel_mode', 'booking_mode',
+    'start_location', 'end_location', 'status', 'created_at',
+)
+
+
+def get_keepalive():
+    return getattr(settings, 'EVENTS_KEEPALIVE', 25)
+
+
+def user_channel(user_id):
+    return f"travel_requests:user:{user_id}"
+
+
+def channels_for(user):
+    channels = [user_channel(user.id)]
+    if user.is_staff:
+        channels.append(ADMIN_CHANNEL)
+    return channels
+
+
+def publish_status_change(user_id, request_id, status, previous_status, updated_at=None):
+    event = {
+        'type': 'status_changed', 'id': request_id, 'status': status,
+        'previous_status': previous_status, 'updated_at': updated_at,
+    }
+    publish(user_channel(user_id), event)
+    publish(ADMIN_CHANNEL, event)
+
+
+def publish_new_request(row, username=None):
+    """Announce a new Pending request to admins; ``row`` is a dict or model instance"""
+    get = row.get if isinstance(row, dict) else lambda name: getattr(row, name)
+    request = {field: get(field) for field in NEW_REQUEST_FIELDS}
+    request['username'] = username
+    publish(ADMIN_CHANNEL, {'type': 'request_created', 'request': request})
+
+
+def publish_request_saved(old, new, user_id, updated_at=None):
+    """Events for a request created (old=None) or updated; rows are stats_row snapshots"""
+    if old is None:
+        if new['status'] == 'Pending':
+            publish_new_request(new, new.get('user__username'))
+    elif old['status'] != new['status']:
+        publish_status_change(user_id, new['id'], new['status'], old['status'], updated_at)
+
+
+def authenticate_token(raw_token):
+    """The user for a raw JWT, or None; EventSource and browser WebSockets can't send headers"""
+    if not raw_token:
+        return None
+    authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (AuthenticationFailed, TokenError):
+        return None
+
+
+def token_from_scope(scope):
+    """?token=... or an "Authorization: Bearer ..." header of an ASGI connection"""
+    tokens = parse_qs(scope.get('query_string', b'').decode()).get('token')
+    if tokens:
+        return tokens[0]
+    for name, value in scope.get('headers', ()):
+        if name == b'authorization' and value.startswith(b'Bearer '):
+            return value[len(b'Bearer '):].decode()
+    return None
+
+
+def authenticate_handshake(scope):
+    try:
+        return authenticate_token(token_from_scope(scope))
+    finally:
+        # WebSocket connections bypass Django's request cycle, which normally does this
+        close_old_connections()
+
+
+async def stream_sse(user):
+    """Server-Sent Events for ``user``, with a comment line every EVENTS_KEEPALIVE seconds"""
+    async with get_broker().subscribe(channels_for(user)) as subscription:
+        yield "event: ready\ndata: {}\n\n"
+        while True:
+            event = await subscription.get(timeout=get_keepalive())
+            if event is None:
+                # Keeps proxies from timing out the idle connection
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {event['type']}\ndata: {encode_event(event)}\n\n"
+
+
+async def forward_events(subscription, send):
+    while True:
+        event = await subscription.get()
+        await send({'type': 'websocket.send', 'text': encode_event(event)})
+
+
+async def travel_request_websocket(scope, receive, send):
+    """ASGI app for WEBSOCKET_PATH: authenticate the handshake, then relay events until disconnect"""
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    user = await sync_to_async(authenticate_handshake)(scope)
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+    async with get_broker().subscribe(channels_for(user)) as subscription:
+        await send({'type': 'websocket.accept'})
+        await send({'type': 'websocket.send', 'text': encode_event({'type': 'ready'})})
+        forwarder = asyncio.create_task(forward_events(subscription, send))
+        try:
+            # Clients have nothing to say; wait for them to go away
+            while (await receive())['type'] != 'websocket.disconnect':
+                pass
+        finally:
+            forwarder.cancel()
+            # Collects the cancellation, or the send error if the connection broke first
+            await asyncio.gather(forwarder, return_exceptions=True)
@@ -0,0 +1,79 @@
+import csv
+import io
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = (
+    'id', 'user__username', 'project_name', 'travel_purpose', 'start_date', 'travel_mode',
+    'booking_mode', 'start_location', 'end_location', 'status', 'created_at', 'updated_at',
+)
+# Column names in the export, 'user__username' is shown as 'username'
+EXPORT_COLUMNS = tuple(field.split('__')[-1] for field in EXPORT_FIELDS)
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+NDJSON_ENCODER = DjangoJSONEncoder(separators=(',', ':'))
+
+
+def get_export_chunk_size():
+    return getattr(settings, 'TRAVEL_EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_queryset(queryset):
+    """Value tuples, oldest first; iterated in chunks through a server-side cursor"""
+    return queryset.order_by('created_at', 'id').values_list(*EXPORT_FIELDS)
+
+
+def csv_header():
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_COLUMNS)
+    return buffer.getvalue()
+
+
+def csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def ndjson_chunk(rows):
+    """One JSON object per line"""
+    return ''.join(NDJSON_ENCODER.encode(dict(zip(EXPORT_COLUMNS, row))) + '\n' for row in rows)
+
+
+# Format -> (text sent before any row, or None; encoder for a list of rows)
+EXPORT_ENCODERS = {
+    'csv': (csv_header, csv_chunk),
+    'ndjson': (None, ndjson_chunk),
+}
+
+
+def stream_export(queryset, export_format, chunk_size=None):
+    """Encoded text in chunks of ``chunk_size`` rows, the header (if any) first"""
+    chunk_size = chunk_size or get_export_chunk_size()
+    header, encode = EXPORT_ENCODERS[export_format]
+    # Send the header right away, before the first chunk of rows is fetched
+    if header is not None:
+        yield header()
+    rows = export_queryset(queryset).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        yield encode(chunk)
+
+
+async def astream_export(queryset, export_format, chunk_size=None):
+    """
+    stream_export for ASGI, where Django collects a sync iterator into a list before sending the
+    first byte. Each chunk of rows is fetched on the request's worker thread, where the cursor lives;
+    QuerySet.aiterator() would start a values_list() query on the event loop.
+    """
+    chunk_size = chunk_size or get_export_chunk_size()
+    header, encode = EXPORT_ENCODERS[export_format]
+    if header is not None:
+        yield header()
+    rows = export_queryset(queryset).iterator(chunk_size=chunk_size)
+    next_chunk = sync_to_async(lambda: list(islice(rows, chunk_size)))
+    while chunk := await next_chunk():
+        yield encode(chunk)
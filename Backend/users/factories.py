@@ -0,0 +1,111 @@
+"""
+Fast builders for realistic users and travel requests, for bulk inserts in benchmarks and
+seeding. Projects, routes and statuses are skewed the way real traffic is: a few busy
+projects and routes, upcoming trips mostly Pending, past trips mostly decided.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+from django.utils import timezone
+from authentication.models import User
+from .models import TravelRegistration
+
+PROJECTS = [f"Project {name}" for name in (
+    "Apollo", "Borealis", "Cascade", "Delta", "Everest", "Falcon", "Granite", "Horizon",
+    "Ion", "Juniper", "Kestrel", "Lumen", "Meridian", "Nimbus", "Orion", "Polaris",
+)]
+CITIES = [
+    "Bangalore", "Mumbai", "Delhi", "Hyderabad", "Chennai", "Pune", "Kolkata", "Ahmedabad",
+    "Jaipur", "Kochi", "Goa", "Lucknow", "Chandigarh", "Indore", "Nagpur", "Coimbatore",
+]
+PURPOSES = [
+    "Client workshop", "Quarterly business review", "Site deployment", "Vendor audit",
+    "Team offsite", "Customer onboarding", "Conference talk", "Hiring drive",
+]
+STATUSES = ('Pending', 'Approved', 'Rejected')
+UPCOMING_STATUS_WEIGHTS = (60, 30, 10)
+PAST_STATUS_WEIGHTS = (5, 75, 20)
+TRAVEL_MODE_WEIGHTS = {'flight': 65, 'train': 35}
+BOOKING_MODE_WEIGHTS = {'travelDesk': 70, 'self': 30}
+# Trips are booked this many days ahead at most
+MAX_LEAD_DAYS = 60
+
+# Column order of the tuples produced by generate_travel_rows
+TRAVEL_ROW_FIELDS = (
+    'user_id', 'project_name', 'travel_purpose', 'start_date', 'travel_mode', 'booking_mode',
+    'start_location', 'end_location', 'status', 'created_at', 'updated_at',
+)
+
+
+def zipf_weights(count, exponent=1.1):
+    """Rank-based weights: the first item is picked most, the tail rarely"""
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+PROJECT_WEIGHTS = zipf_weights(len(PROJECTS))
+CITY_WEIGHTS = zipf_weights(len(CITIES))
+
+
+def build_users(count, prefix, domain, password, start=0):
+    """Unsaved users named <prefix><n>@<domain>; ``password`` is an already encoded hash"""
+    return [
+        User(username=f"{prefix}{i}", email=f"{prefix}{i}@{domain}", password=password)
+        for i in range(start, start + count)
+    ]
+
+
+def generate_travel_rows(user_ids, count, rng, created_from, created_days, as_of):
+    """
+    ``count`` travel requests as tuples in TRAVEL_ROW_FIELDS order, created uniformly over
+    ``created_days`` days from ``created_from`` and starting up to MAX_LEAD_DAYS later.
+    Trips starting on or before the ``as_of`` date are mostly decided, later ones mostly Pending.
+    Rows come out in creation order, so ids follow created_at as they do in production.
+    """
+    # Draw each column in one call; per-row rng.choices calls dominate the cost otherwise
+    owners = rng.choices(user_ids, k=count)
+    projects = rng.choices(PROJECTS, PROJECT_WEIGHTS, k=count)
+    starts = rng.choices(CITIES, CITY_WEIGHTS, k=count)
+    ends = rng.choices(CITIES, CITY_WEIGHTS, k=count)
+    travel_modes = rng.choices(tuple(TRAVEL_MODE_WEIGHTS), tuple(TRAVEL_MODE_WEIGHTS.values()), k=count)
+    booking_modes = rng.choices(tuple(BOOKING_MODE_WEIGHTS), tuple(BOOKING_MODE_WEIGHTS.values()), k=count)
+    upcoming_statuses = rng.choices(STATUSES, UPCOMING_STATUS_WEIGHTS, k=count)
+    past_statuses = rng.choices(STATUSES, PAST_STATUS_WEIGHTS, k=count)
+    span = created_days * 86400
+    random = rng.random
+    offsets = sorted(int(random() * span) for _ in range(count))
+
+    rows = []
+    for i in range(count):
+        start, end = starts[i], ends[i]
+        if start == end:
+            end = CITIES[(CITIES.index(end) + 1) % len(CITIES)]
+        created_at = created_from + timedelta(seconds=offsets[i])
+        start_date = created_at.date() + timedelta(days=1 + int(random() * MAX_LEAD_DAYS))
+        rows.append((
+            owners[i], projects[i], PURPOSES[i % len(PURPOSES)], start_date, travel_modes[i], booking_modes[i],
+            start, end, past_statuses[i] if start_date <= as_of else upcoming_statuses[i], created_at, created_at,
+        ))
+    return rows
+
+
+def build_travel_requests(users, count, rng, created_days=365):
+    """Unsaved travel requests for ``users`` created over the last ``created_days`` days"""
+    now = timezone.now()
+    rows = generate_travel_rows(
+        [user.id for user in users], count, rng, now - timedelta(days=created_days), created_days,
+        timezone.localdate(now),
+    )
+    return [TravelRegistration(**dict(zip(TRAVEL_ROW_FIELDS, row))) for row in rows]
+
+
+@contextmanager
+def preserved_timestamps():
+    """Let bulk_create keep generated created_at/updated_at instead of stamping "now" on every row"""
+    fields = [TravelRegistration._meta.get_field(name) for name in ('created_at', 'updated_at')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
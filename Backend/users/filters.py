@@ -0,0 +1,113 @@
+from datetime import datetime, time, timedelta
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from .models import TravelRegistration
+
+# Accept a comma separated list, e.g. ?status=Pending,Approved
+CHOICE_FILTERS = {
+    'status': TravelRegistration.STATUS_CHOICES,
+    'travel_mode': TravelRegistration.TRAVEL_MODES,
+    'booking_mode': TravelRegistration.BOOKING_MODES,
+}
+SEARCH_FIELDS = ('travel_purpose', 'start_location', 'end_location')
+# Has to match the travel_req_search_idx expression (migration 0005) for the index to be used
+SEARCH_CONFIG = 'english'
+SEARCH_MAX_LENGTH = 200
+
+
+class TravelFilterError(ValueError):
+    pass
+
+
+def parse_day(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise TravelFilterError(f"{name} must be a YYYY-MM-DD date")
+    return day
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def search_travel_requests(queryset, text):
+    """Rows whose purpose or locations match ``text``: full-text on PostgreSQL, plus substring matches"""
+    # Substrings catch partial words ("Bang") that stemming misses; on PostgreSQL the
+    # UPPER(column) pg_trgm indexes serve them
+    lookup = Q()
+    for field in SEARCH_FIELDS:
+        lookup |= Q(**{f'{field}__icontains': text})
+    if connections[queryset.db].vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchVector
+        # alias() rather than annotate() keeps the tsvector out of the SELECT list
+        queryset = queryset.alias(search=SearchVector(*SEARCH_FIELDS, config=SEARCH_CONFIG))
+        lookup |= Q(search=SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch'))
+    return queryset.filter(lookup)
+
+
+def filter_travel_requests(queryset, params):
+    """
+    Apply ?status=, ?travel_mode=, ?booking_mode=, ?project_name=, ?start_date_after=,
+    ?start_date_before=, ?created_after=, ?created_before= (inclusive dates) and ?search=
+    """
+    for name, choices in CHOICE_FILTERS.items():
+        if not params.get(name):
+            continue
+        values = [value.strip() for value in params[name].split(',') if value.strip()]
+        allowed = dict(choices)
+        if not values or any(value not in allowed for value in values):
+            raise TravelFilterError(f"{name} must be one of {', '.join(allowed)}")
+        queryset = queryset.filter(**{name: values[0]} if len(values) == 1 else {f'{name}__in': values})
+    if params.get('project_name'):
+        queryset = queryset.filter(project_name=params['project_name'])
+
+    start_after = parse_day(params, 'start_date_after')
+    if start_after:
+        queryset = queryset.filter(start_date__gte=start_after)
+    start_before = parse_day(params, 'start_date_before')
+    if start_before:
+        queryset = queryset.filter(start_date__lte=start_before)
+    # Compare created_at with datetime bounds rather than created_at__date, so its index is usable
+    created_after = parse_day(params, 'created_after')
+    if created_after:
+        queryset = queryset.filter(created_at__gte=day_start(created_after))
+    created_before = parse_day(params, 'created_before')
+    if created_before:
+        queryset = queryset.filter(created_at__lt=day_start(created_before + timedelta(days=1)))
+
+    search = params.get('search', '').strip()
+    if len(search) > SEARCH_MAX_LENGTH:
+        raise TravelFilterError(f"search must be at most {SEARCH_MAX_LENGTH} characters")
+    if search:
+        queryset = search_travel_requests(queryset, search)
+    return queryset
+
+
+class TravelRequestFilter(BaseFilterBackend):
+    """DRF filter backend for filter_travel_requests, answering bad parameters with a 400"""
+
+    def filter_queryset(self, request, queryset, view):
+        try:
+            return filter_travel_requests(queryset, request.query_params)
+        except TravelFilterError as e:
+            raise ValidationError({"error": str(e)})
+
+
+class TravelRequestOrdering(OrderingFilter):
+    """?ordering=start_date|-start_date|created_at|-created_at, with id as the cursor's tie-breaker"""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if ordering and ordering[-1].lstrip('-') != 'id':
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
@@ -0,0 +1,158 @@
+import logging
+import threading
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .llm import answer_chat
+from .models import ChatJob
+
+logger = logging.getLogger(__name__)
+
+
+def get_max_concurrency():
+    return getattr(settings, 'CHAT_JOB_MAX_CONCURRENCY', 4)
+
+
+def get_max_attempts():
+    return getattr(settings, 'CHAT_JOB_MAX_ATTEMPTS', 3)
+
+
+def get_retry_backoff():
+    return getattr(settings, 'CHAT_JOB_RETRY_BACKOFF', 2)
+
+
+def get_job_timeout():
+    return getattr(settings, 'CHAT_JOB_TIMEOUT', 120)
+
+
+def enqueue_chat_job(user_id, message, mode=None):
+    return ChatJob.objects.create(user_id=user_id, message=message, mode=mode or '')
+
+
+def get_heartbeat_interval():
+    """Seconds between lease renewals, well inside CHAT_JOB_TIMEOUT"""
+    return get_job_timeout() / 4
+
+
+def claim_next_job():
+    """
+    Move the oldest runnable job to running under a fresh lease, or return None when the queue
+    is empty or CHAT_JOB_MAX_CONCURRENCY jobs are already running across all workers.
+    Running jobs whose lease wasn't renewed for CHAT_JOB_TIMEOUT seconds (a dead worker) are
+    picked up again while they have attempts left, and failed once they don't.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=get_job_timeout())
+    abandoned = Q(status='running') & (Q(heartbeat_at__lt=stale) | Q(heartbeat_at__isnull=True))
+    max_attempts = get_max_attempts()
+    try:
+        with transaction.atomic():
+            ChatJob.objects.filter(abandoned, attempts__gte=max_attempts).update(
+                status='failed', error="The worker stopped responding", slot=None, updated_at=now,
+            )
+            queryset = ChatJob.objects.filter(
+                Q(status='queued', available_at__lte=now) | (abandoned & Q(attempts__lt=max_attempts))
+            ).order_by('available_at')
+            if connection.features.has_select_for_update_skip_locked:
+                queryset = queryset.select_for_update(skip_locked=True)
+            job = queryset.first()
+            if job is None:
+                return None
+            if job.status != 'running':
+                # A reclaimed job keeps its slot; a queued one needs a free one
+                taken = set(ChatJob.objects.filter(status='running').values_list('slot', flat=True))
+                job.slot = next((slot for slot in range(get_max_concurrency()) if slot not in taken), None)
+                if job.slot is None:
+                    return None
+            job.status = 'running'
+            job.started_at = job.heartbeat_at = now
+            job.lease_owner = uuid.uuid4().hex
+            job.attempts += 1
+            job.save(update_fields=[
+                'status', 'started_at', 'heartbeat_at', 'lease_owner', 'slot', 'attempts', 'updated_at',
+            ])
+    except IntegrityError:
+        # Another worker took the same free slot first (chat_job_running_slot)
+        return None
+    return job
+
+
+def keep_lease(job, stop_event):
+    """Renew the job's heartbeat until ``stop_event`` is set, so it isn't reclaimed while answering"""
+    try:
+        while not stop_event.wait(get_heartbeat_interval()):
+            ChatJob.objects.filter(pk=job.pk, lease_owner=job.lease_owner).update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def answer_job(job):
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(target=keep_lease, args=(job, stop_event), name=f"chat-lease-{job.pk}", daemon=True)
+    heartbeat.start()
+    try:
+        return answer_chat(job.message, job.mode or None)
+    finally:
+        stop_event.set()
+        heartbeat.join()
+
+
+def run_job(job):
+    """Answer one claimed job, re-queueing it with exponential backoff when the LLM call fails"""
+    try:
+        job.response = answer_job(job)
+        job.status = 'done'
+        job.error = ''
+    except Exception as e:
+        logger.warning(f"Chat job {job.id} attempt {job.attempts} failed: {str(e)}")
+        job.error = str(e)
+        if job.attempts >= get_max_attempts():
+            job.status = 'failed'
+        else:
+            job.status = 'queued'
+            job.available_at = timezone.now() + timedelta(seconds=get_retry_backoff() ** job.attempts)
+    job.slot = None
+    # Only the lease owner finishes the job; a worker that lost it to a reclaim drops its result
+    finished = ChatJob.objects.filter(pk=job.pk, lease_owner=job.lease_owner, status='running').update(
+        response=job.response, status=job.status, error=job.error, available_at=job.available_at,
+        slot=None, updated_at=timezone.now(),
+    )
+    if not finished:
+        logger.warning(f"Chat job {job.id} was reclaimed by another worker, dropping this attempt's result")
+        job.refresh_from_db()
+    return job
+
+
+def work(stop_event, poll_interval=1.0, once=False):
+    """Worker loop: process jobs until ``stop_event`` is set, or until the queue is drained with ``once``"""
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                job = claim_next_job()
+            except DatabaseError as e:
+                logger.warning(f"Could not claim a chat job: {str(e)}")
+                stop_event.wait(poll_interval)
+                continue
+            if job is not None:
+                run_job(job)
+            elif once:
+                return
+            else:
+                stop_event.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def start_workers(count, poll_interval=1.0, once=False):
+    stop_event = threading.Event()
+    threads = [
+        threading.Thread(target=work, args=(stop_event, poll_interval, once), name=f"chat-worker-{i}", daemon=True)
+        for i in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return stop_event, threads
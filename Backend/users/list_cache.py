@@ -0,0 +1,124 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# When the requests visible to a scope ("all" for admins, "user:<id>") last changed
+CACHE_KEY_CHANGED = "travel_requests:changed:{scope}"
+# Raised by bulk writes that don't know whose requests they touched
+CACHE_KEY_CHANGED_EVERYONE = "travel_requests:changed:everyone"
+CACHE_KEY_PAGE = "travel_list_page:{digest}"
+ADMIN_SCOPE = "all"
+# A page read from a replica this soon after a change may predate it, so it isn't cached
+REPLICA_SETTLE_SECONDS = 5
+
+
+def get_list_cache_timeout():
+    return getattr(settings, 'TRAVEL_LIST_CACHE_TIMEOUT', 60)
+
+
+def scope_of(user):
+    return ADMIN_SCOPE if user.is_staff else f"user:{user.id}"
+
+
+def last_changed(user, queryset):
+    """
+    When the requests in ``queryset`` (everything ``user`` may see) last changed. Taken from
+    max(updated_at) once, then moved forward by mark_changed on every write, deletes included.
+    """
+    key = CACHE_KEY_CHANGED.format(scope=scope_of(user))
+    values = cache.get_many([key, CACHE_KEY_CHANGED_EVERYONE])
+    changed = values.get(key)
+    if changed is None:
+        changed = queryset.aggregate(changed=Max('updated_at'))['changed'] or timezone.now()
+        # add() rather than set(), so a write marked in the meantime isn't overwritten
+        cache.add(key, changed, None)
+    everyone = values.get(CACHE_KEY_CHANGED_EVERYONE)
+    return max(changed, everyone) if everyone else changed
+
+
+async def alast_changed(user, queryset):
+    """last_changed for async views"""
+    key = CACHE_KEY_CHANGED.format(scope=scope_of(user))
+    values = await cache.aget_many([key, CACHE_KEY_CHANGED_EVERYONE])
+    changed = values.get(key)
+    if changed is None:
+        changed = (await queryset.aaggregate(changed=Max('updated_at')))['changed'] or timezone.now()
+        await cache.aadd(key, changed, None)
+    everyone = values.get(CACHE_KEY_CHANGED_EVERYONE)
+    return max(changed, everyone) if everyone else changed
+
+
+def mark_changed(*user_ids):
+    """Record a write to the requests of ``user_ids``; admins see every request, so theirs changed too"""
+    now = timezone.now()
+    keys = [CACHE_KEY_CHANGED.format(scope=ADMIN_SCOPE)]
+    keys.extend(CACHE_KEY_CHANGED.format(scope=f"user:{user_id}") for user_id in user_ids)
+    cache.set_many(dict.fromkeys(keys, now), None)
+
+
+def mark_all_changed():
+    """For bulk writes that bypass model signals (seeding, benchmarks)"""
+    now = timezone.now()
+    cache.set_many({
+        CACHE_KEY_CHANGED.format(scope=ADMIN_SCOPE): now,
+        CACHE_KEY_CHANGED_EVERYONE: now,
+    }, None)
+
+
+def validator_digest(request, changed):
+    """Identifies one representation: who asks, for what URL and media type, as of ``changed``"""
+    parts = (
+        scope_of(request.user), changed.isoformat(), request.build_absolute_uri(),
+        getattr(request, 'accepted_media_type', ''),
+    )
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def not_modified_response(request, digest, changed):
+    """A 304 when the client's If-None-Match / If-Modified-Since still hold, else None"""
+    response = get_conditional_response(
+        request, etag=f'"{digest}"', last_modified=int(changed.timestamp())
+    )
+    if response is not None:
+        set_validators(response, digest, changed)
+    return response
+
+
+def set_validators(response, digest, changed, db='default'):
+    """ETag and Last-Modified for a response read from ``db``; none while that read may be stale"""
+    if not is_settled(changed, db):
+        # A client keeping this body under the current validators would get 304s for it until the next write
+        response['Cache-Control'] = 'no-store'
+        return response
+    response['ETag'] = f'"{digest}"'
+    response['Last-Modified'] = http_date(changed.timestamp())
+    # Browsers may keep the response but have to revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def get_cached_page(digest):
+    return cache.get(CACHE_KEY_PAGE.format(digest=digest))
+
+
+async def aget_cached_page(digest):
+    return await cache.aget(CACHE_KEY_PAGE.format(digest=digest))
+
+
+def is_settled(changed, db):
+    return db == 'default' or (timezone.now() - changed).total_seconds() >= REPLICA_SETTLE_SECONDS
+
+
+def cache_page(digest, data, changed, db):
+    """Keep a serialized list page; pages are keyed by ``changed``, so any write retires them"""
+    if is_settled(changed, db):
+        cache.set(CACHE_KEY_PAGE.format(digest=digest), data, get_list_cache_timeout())
+
+
+async def acache_page(digest, data, changed, db):
+    if is_settled(changed, db):
+        await cache.aset(CACHE_KEY_PAGE.format(digest=digest), data, get_list_cache_timeout())
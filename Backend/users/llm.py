@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+from main.metrics import timed_call
+from .chat_cache import chat_response_cache
+from .chat_tools import StubToolModel, GeminiToolModel, answer_with_tools
+from .prompt import build_chat_prompt
+from .stats import get_travel_stats
+
+# Load environment variables
+load_dotenv()
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Configure Gemini API
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+client = genai.Client(api_key=GOOGLE_API_KEY)
+GEMINI_MODEL = "gemini-2.0-flash"
+# Values a client may pass as the chat mode; empty means settings.CHAT_MODE
+CHAT_MODES = ('prompt', 'tools')
+CHAT_MODE_ERROR = f"mode must be one of {', '.join(CHAT_MODES)}"
+
+
+def is_valid_chat_mode(mode):
+    return mode in (None, '', *CHAT_MODES)
+
+
+def use_fake_backend():
+    return getattr(settings, 'CHAT_LLM_BACKEND', 'gemini') == 'fake'
+
+
+def get_llm_timeout():
+    """Seconds one Gemini call may take before it fails"""
+    return getattr(settings, 'CHAT_LLM_TIMEOUT', 60)
+
+
+def get_http_options():
+    return types.HttpOptions(timeout=int(get_llm_timeout() * 1000))
+
+
+def get_tool_model():
+    if use_fake_backend():
+        return StubToolModel()
+    return GeminiToolModel(client, GEMINI_MODEL, get_http_options())
+
+
+def get_fake_latency():
+    """Seconds the fake backend takes per answer, to stand in for a slow model in benchmarks"""
+    return getattr(settings, 'CHAT_FAKE_LATENCY_MS', 0) / 1000
+
+
+def fake_answer(context):
+    return f"Fake answer for a {len(context)} character prompt"
+
+
+def generate_text(context):
+    """Single prompt completion; the fake backend answers locally so jobs and tests need no network"""
+    if use_fake_backend():
+        time.sleep(get_fake_latency())
+        return fake_answer(context)
+    with timed_call('gemini'):
+        return client.models.generate_content(
+            model=GEMINI_MODEL, contents=context, config=types.GenerateContentConfig(http_options=get_http_options()),
+        ).text
+
+
+async def agenerate_text(context):
+    """generate_text that awaits the model instead of blocking a thread"""
+    if use_fake_backend():
+        await asyncio.sleep(get_fake_latency())
+        return fake_answer(context)
+    with timed_call('gemini'):
+        response = await client.aio.models.generate_content(
+            model=GEMINI_MODEL, contents=context, config=types.GenerateContentConfig(http_options=get_http_options()),
+        )
+        return response.text
+
+
+def build_chat_context(stats, message):
+    """Build the Gemini prompt within the token budget and log its size"""
+    context, size = build_chat_prompt(stats, message)
+    logger.info(
+        f"Chat prompt: {size['tokens']}/{size['token_budget']} tokens, "
+        f"{size['chars']} chars, {size['recent_rows']} recent rows"
+    )
+    if size['message_truncated']:
+        logger.warning("Chat message truncated to fit the token budget")
+    if size['over_budget']:
+        logger.warning("Chat prompt exceeds the token budget even without optional sections")
+    return context
+
+
+def answer_chat(message, mode=None):
+    """Answer an admin question from the response cache, or through Gemini in prompt or tools mode"""
+    stats = get_travel_stats()
+
+    # Same question against the same data version: answer without calling Gemini
+    cached = chat_response_cache.get(message, stats, mode)
+    if cached is not None:
+        return cached
+
+    if (mode or settings.CHAT_MODE) == "tools":
+        # Gemini asks for the aggregates it needs through function calls
+        answer = answer_with_tools(message, get_tool_model())
+    else:
+        answer = generate_text(build_chat_context(stats, message))
+    chat_response_cache.set(message, stats, answer, mode)
+    logger.info(f"Chat response cache: {chat_response_cache.metrics()}")
+    return answer
+
+
+async def aanswer_chat(message, mode=None):
+    """answer_chat for the async views"""
+    stats = await sync_to_async(get_travel_stats)()
+    cached = chat_response_cache.get(message, stats, mode)
+    if cached is not None:
+        return cached
+
+    if (mode or settings.CHAT_MODE) == "tools":
+        # The tool calls query the database between model turns, so this stays on a thread
+        answer = await sync_to_async(answer_with_tools)(message, get_tool_model())
+    else:
+        answer = await agenerate_text(build_chat_context(stats, message))
+    chat_response_cache.set(message, stats, answer, mode)
+    return answer
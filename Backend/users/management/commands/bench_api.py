@@ -0,0 +1,265 @@
+import json
+import random
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from unittest import mock
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from authentication.hashing import hash_password
+from authentication.models import User
+from authentication.tokens import TokenClaimsObtainPairSerializer
+from authentication.views import LoginUserView
+from users.factories import PROJECTS, build_travel_requests, build_users
+from users.list_cache import mark_all_changed
+from users.models import TravelRegistration
+from users.rollup import rebuild_rollup
+from users.stats import invalidate_travel_stats
+
+BENCH_EMAIL_DOMAIN = "bench-api.invalid"
+BENCH_PASSWORD = "bench-password"
+SCENARIOS = ('register', 'login', 'list', 'create', 'update', 'chat')
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'api_baseline.json'
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+@contextmanager
+def scratch_databases():
+    """
+    Run against freshly migrated test databases (test_<NAME>) that are dropped afterwards, so the
+    benchmark never writes to the configured ones. The clients run on several threads, each with
+    its own connection, so a rolled back transaction can't contain them.
+    """
+    for alias in connections:
+        test_settings = connections[alias].settings_dict['TEST']
+        # SQLite's default in-memory test database locks whole tables: concurrent writers fail at once
+        if connections[alias].vendor == 'sqlite' and not test_settings.get('NAME') and not test_settings.get('MIRROR'):
+            test_settings['NAME'] = str(Path(tempfile.gettempdir()) / f"bench_{alias}.sqlite3")
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of already sorted values"""
+    return values[min(len(values) - 1, round(pct / 100 * (len(values) - 1)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive register/login/list/create/update/chat concurrently through the full middleware stack "
+        "and report p50/p95/p99 latency, throughput and queries per request against a baseline file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--rows', type=int, default=10000, help="Travel requests seeded before measuring")
+        parser.add_argument('--requests', type=int, default=100, help="Requests per scenario")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--scenarios', nargs='*', choices=SCENARIOS, default=list(SCENARIOS))
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--update-baseline', action='store_true', help="Write the results as the new baseline")
+        parser.add_argument(
+            '--tolerance', type=float, default=0.3,
+            help="Allowed relative p95/throughput drift before a scenario counts as a regression",
+        )
+        parser.add_argument('--output', help="Also write the results as JSON to this path")
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        encoded = hash_password(BENCH_PASSWORD)
+        admin = User(
+            username="bench-admin", email=f"admin@{BENCH_EMAIL_DOMAIN}", password=encoded, is_staff=True
+        )
+        users = User.objects.bulk_create(
+            [admin] + build_users(options['users'], "bench-user-", BENCH_EMAIL_DOMAIN, encoded)
+        )
+        # bulk_create doesn't return ids on every backend
+        users = list(User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}").order_by('id'))
+        TravelRegistration.objects.bulk_create(
+            build_travel_requests(users[1:], options['rows'], rng), batch_size=2000
+        )
+        invalidate_travel_stats()
+        mark_all_changed()
+        rebuild_rollup()
+        return users[0], users[1:]
+
+    def cleanup(self):
+        # The scratch database goes away; the shared caches must not keep serving its data
+        invalidate_travel_stats()
+        mark_all_changed()
+
+    def scenarios(self, admin, employees, run_id):
+        """Each scenario maps a request number to (client method, path, payload, user or None)"""
+        travel_ids = list(
+            TravelRegistration.objects.filter(user__in=employees).values_list('id', flat=True)[:1000]
+        )
+        start_date = (date.today() + timedelta(days=30)).isoformat()
+
+        def employee(i):
+            return employees[i % len(employees)]
+
+        return {
+            'register': lambda i: ('post', '/authenticate/register/', {
+                'username': f"bench-register-{run_id}-{i}",
+                'email': f"register-{run_id}-{i}@{BENCH_EMAIL_DOMAIN}",
+                'password': BENCH_PASSWORD,
+            }, None),
+            'login': lambda i: ('post', '/authenticate/login/', {
+                'email': employee(i).email, 'password': BENCH_PASSWORD,
+            }, None),
+            'list': lambda i: ('get', '/users/travel-requests/', None, admin if i % 2 else employee(i)),
+            'create': lambda i: ('post', '/users/travel-requests/', {
+                'project_name': PROJECTS[i % len(PROJECTS)],
+                'travel_purpose': "Benchmark trip",
+                'start_date': start_date,
+                'travel_mode': 'flight',
+                'booking_mode': 'self',
+                'start_location': "Bangalore",
+                'end_location': "Mumbai",
+            }, employee(i)),
+            'update': lambda i: ('patch', f'/users/travel-requests/{travel_ids[i % len(travel_ids)]}/', {
+                'status': 'Approved' if i % 2 else 'Rejected',
+            }, admin),
+            # A different question every time, so each one reaches the (stubbed) model
+            'chat': lambda i: ('post', '/users/chat/', {
+                'message': f"How many requests does {PROJECTS[i % len(PROJECTS)]} have? ({run_id}-{i})",
+            }, admin),
+        }
+
+    def send(self, build, i, tokens):
+        method, path, payload, user = build(i)
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f"Bearer {tokens[user.id]}"
+        kwargs = {'data': json.dumps(payload), 'content_type': 'application/json'} if payload is not None else {}
+        started = time.perf_counter()
+        response = getattr(Client(SERVER_NAME='localhost'), method)(path, **kwargs, **headers)
+        elapsed = time.perf_counter() - started
+        match = QUERIES_PATTERN.search(response.get('Server-Timing', ''))
+        return elapsed, response.status_code, int(match.group(1)) if match else 0
+
+    def worker(self, build, tokens, numbers):
+        """One simulated client; keeps its database connection like a server thread would"""
+        try:
+            return [self.send(build, i, tokens) for i in numbers]
+        finally:
+            connection.close()
+
+    def run_scenario(self, build, tokens, options):
+        self.send(build, -1, tokens)  # warm-up
+        concurrency = options['concurrency']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            batches = executor.map(
+                lambda k: self.worker(build, tokens, range(k, options['requests'], concurrency)),
+                range(concurrency),
+            )
+            results = [result for batch in batches for result in batch]
+        wall = time.perf_counter() - started
+
+        latencies = sorted(elapsed for elapsed, _, _ in results)
+        return {
+            'requests': len(results),
+            'errors': sum(1 for _, code, _ in results if code >= 400),
+            'throughput': round(len(results) / wall, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries_per_request': round(sum(queries for _, _, queries in results) / len(results), 2),
+        }
+
+    def compare(self, results, baseline, tolerance):
+        """Regressions against the baseline; query counts must not grow at all"""
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get('scenarios', {}).get(name)
+            if base is None:
+                continue
+            if result['queries_per_request'] > base['queries_per_request'] + 0.01:
+                regressions.append(
+                    f"{name}: {result['queries_per_request']} queries/request (baseline {base['queries_per_request']})"
+                )
+            if result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {result['p95_ms']} ms (baseline {base['p95_ms']} ms)")
+            if result['throughput'] < base['throughput'] * (1 - tolerance):
+                regressions.append(f"{name}: {result['throughput']} req/s (baseline {base['throughput']} req/s)")
+            if result['errors'] > base['errors']:
+                regressions.append(f"{name}: {result['errors']} errors (baseline {base['errors']})")
+        return regressions
+
+    def measure(self, options):
+        admin, employees = self.seed(options)
+        run_id = int(time.time())
+        tokens = {
+            user.id: str(TokenClaimsObtainPairSerializer.get_token(user).access_token)
+            for user in [admin] + employees
+        }
+        results = {}
+        try:
+            builders = self.scenarios(admin, employees, run_id)
+            # Throttling would reject most of the login traffic; chat answers come from the stub model
+            with mock.patch.object(LoginUserView, 'throttle_classes', []), \
+                    override_settings(CHAT_LLM_BACKEND='fake'):
+                for name in options['scenarios']:
+                    results[name] = self.run_scenario(builders[name], tokens, options)
+                    self.stdout.write(
+                        f"{name:>9}: {results[name]['throughput']:8.1f} req/s  "
+                        f"p50 {results[name]['p50_ms']:8.2f} ms  p95 {results[name]['p95_ms']:8.2f} ms  "
+                        f"p99 {results[name]['p99_ms']:8.2f} ms  "
+                        f"{results[name]['queries_per_request']:5.2f} queries/req  {results[name]['errors']} errors"
+                    )
+        finally:
+            self.cleanup()
+        return results
+
+    def handle(self, *args, **options):
+        with scratch_databases():
+            results = self.measure(options)
+
+        report = {
+            'environment': {
+                'database': connection.vendor,
+                'users': options['users'],
+                'rows': options['rows'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + "\n")
+        # Error responses are fast and cheap; timing them would only record a broken run
+        failed = [f"{name}: {result['errors']} errors" for name, result in results.items() if result['errors']]
+        if failed:
+            raise CommandError("Requests failed, no baseline written or compared:\n  " + "\n  ".join(failed))
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}, run with --update-baseline"))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('environment') != report['environment']:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded with {baseline.get('environment')}, latency comparisons may not be meaningful"
+            ))
+        regressions = self.compare(results, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError("Performance regression:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
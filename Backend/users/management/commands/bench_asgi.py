@@ -0,0 +1,172 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection
+from django.test import Client, override_settings
+from authentication.tokens import TokenClaimsObtainPairSerializer
+from .bench_api import Command as BenchAPICommand, percentile, scratch_databases
+
+# How each mode serves requests: the server model and the URLconf it routes with
+MODES = {
+    'wsgi': 'main.urls',
+    'asgi-sync': 'main.urls',
+    'asgi-async': 'main.async_urls',
+}
+SCENARIOS = ('chat', 'list', 'create', 'update')
+
+
+class Command(BenchAPICommand):
+    help = (
+        "Compare throughput of WSGI (sync views on a fixed pool of server threads), ASGI with the sync "
+        "views and ASGI with the async views (ASYNC_VIEWS) at high concurrency, with the chat model "
+        "replaced by a fake that answers after --latency-ms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--rows', type=int, default=2000, help="Travel requests seeded before measuring")
+        parser.add_argument('--requests', type=int, default=400, help="Requests per scenario and mode")
+        parser.add_argument('--concurrency', type=int, default=100, help="Clients sending at the same time")
+        parser.add_argument(
+            '--threads', type=int, default=8, help="Server threads in wsgi mode, like gunicorn --threads",
+        )
+        parser.add_argument('--latency-ms', type=int, default=200, help="Time the fake model takes per answer")
+        parser.add_argument('--modes', nargs='*', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--scenarios', nargs='*', choices=SCENARIOS, default=['chat', 'list'])
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Also write the results as JSON to this path")
+
+    def wsgi_sender(self, build, tokens, executor):
+        """Requests go through Django's WSGI handler on one of the ``executor`` threads"""
+        def request(i):
+            method, path, payload, user = build(i)
+            headers = {'Authorization': f"Bearer {tokens[user.id]}"} if user is not None else {}
+            kwargs = {'data': json.dumps(payload), 'content_type': 'application/json'} if payload is not None else {}
+            return getattr(Client(SERVER_NAME='localhost'), method)(path, headers=headers, **kwargs).status_code
+
+        async def send(i):
+            return await asyncio.get_running_loop().run_in_executor(executor, request, i)
+        return send
+
+    def asgi_sender(self, build, tokens, app):
+        """Requests go straight into Django's ASGI handler, as an ASGI server would pass them"""
+        async def send(i):
+            method, path, payload, user = build(i)
+            path, _, query = path.partition('?')
+            content = json.dumps(payload).encode() if payload is not None else b''
+            headers = [
+                (b'host', b'localhost'), (b'content-type', b'application/json'),
+                (b'content-length', str(len(content)).encode()),
+            ]
+            if user is not None:
+                headers.append((b'authorization', f"Bearer {tokens[user.id]}".encode()))
+            body = [{'type': 'http.request', 'body': content}]
+            response = {}
+
+            async def receive():
+                if body:
+                    return body.pop()
+                # The client stays connected until the response is complete
+                await asyncio.Future()
+
+            async def send_message(message):
+                if message['type'] == 'http.response.start':
+                    response['status'] = message['status']
+
+            await app({
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method.upper(),
+                'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+                'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+            }, receive, send_message)
+            return response['status']
+        return send
+
+    async def drive(self, send, options):
+        """``concurrency`` clients sending requests back to back, sampling the process' thread count"""
+        numbers = iter(range(options['requests']))
+        results = []
+        peak_threads = threading.active_count()
+
+        async def client():
+            for i in numbers:
+                started = time.perf_counter()
+                status = await send(i)
+                results.append((time.perf_counter() - started, status))
+
+        async def sample_threads():
+            nonlocal peak_threads
+            while True:
+                peak_threads = max(peak_threads, threading.active_count())
+                await asyncio.sleep(0.01)
+
+        await send(-1)  # warm-up
+        sampler = asyncio.create_task(sample_threads())
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+        wall = time.perf_counter() - started
+        sampler.cancel()
+
+        latencies = sorted(elapsed for elapsed, _ in results)
+        return {
+            'requests': len(results),
+            'errors': sum(1 for _, status in results if status >= 400),
+            'throughput': round(len(results) / wall, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'peak_threads': peak_threads,
+        }
+
+    def run_mode(self, mode, build, tokens, options):
+        with override_settings(ROOT_URLCONF=MODES[mode]):
+            if mode == 'wsgi':
+                with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                    return asyncio.run(self.drive(self.wsgi_sender(build, tokens, executor), options))
+            return asyncio.run(self.drive(self.asgi_sender(build, tokens, ASGIHandler()), options))
+
+    def measure(self, options):
+        admin, employees = self.seed(options)
+        run_id = int(time.time())
+        tokens = {
+            user.id: str(TokenClaimsObtainPairSerializer.get_token(user).access_token)
+            for user in [admin] + employees
+        }
+        results = {}
+        try:
+            builders = self.scenarios(admin, employees, run_id)
+            with override_settings(CHAT_LLM_BACKEND='fake', CHAT_FAKE_LATENCY_MS=options['latency_ms']):
+                for name in options['scenarios']:
+                    results[name] = {}
+                    build = builders[name]
+                    for index, mode in enumerate(options['modes']):
+                        # Each mode gets its own request numbers (chat questions), so none hits the cache
+                        offset = index * (options['requests'] + 1) + 1
+                        result = self.run_mode(mode, lambda i: build(offset + i), tokens, options)
+                        results[name][mode] = result
+                        self.stdout.write(
+                            f"{name:>7} {mode:>10}: {result['throughput']:8.1f} req/s  "
+                            f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+                            f"p99 {result['p99_ms']:8.2f} ms  {result['peak_threads']:4d} threads  "
+                            f"{result['errors']} errors"
+                        )
+        finally:
+            self.cleanup()
+        return results
+
+    def handle(self, *args, **options):
+        with scratch_databases():
+            results = self.measure(options)
+
+        if options['output']:
+            report = {
+                'environment': {
+                    'database': connection.vendor,
+                    **{key: options[key] for key in ('rows', 'requests', 'concurrency', 'threads', 'latency_ms')},
+                },
+                'scenarios': results,
+            }
+            Path(options['output']).write_text(json.dumps(report, indent=2) + "\n")
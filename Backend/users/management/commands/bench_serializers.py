@@ -0,0 +1,81 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from authentication.models import User
+from main.renderers import ORJSONRenderer, orjson
+from users.factories import build_travel_requests, build_users
+from users.models import TravelRegistration
+from users.serializers import TravelRegistrationRowSerializer, TravelRegistrationSerializer
+
+BENCH_EMAIL_DOMAIN = "bench-serializers.invalid"
+
+
+def best_of(repeat, func):
+    """Fastest of ``repeat`` runs in seconds, and the last result"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark of the travel-request list serialization: TravelRegistrationSerializer over "
+        "model instances against the values() row serializer, and DRF's JSON renderer against orjson "
+        "(when installed). Rows are inserted in a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement, the fastest counts")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def report(self, label, seconds, rows, baseline=None):
+        speedup = f"  {baseline / seconds:5.1f}x" if baseline else ""
+        self.stdout.write(f"{label:>36}: {rows / seconds:12,.0f} rows/sec  {seconds * 1000:9.1f} ms{speedup}")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with transaction.atomic():
+            users = User.objects.bulk_create(build_users(20, "bench-serializers-", BENCH_EMAIL_DOMAIN, "!"))
+            users = list(User.objects.filter(email__endswith=f"@{BENCH_EMAIL_DOMAIN}"))
+            TravelRegistration.objects.bulk_create(
+                build_travel_requests(users, rows, random.Random(options['seed'])), batch_size=2000
+            )
+            queryset = TravelRegistration.objects.filter(user__in=users).order_by('-created_at', '-id')
+            row_serializer = TravelRegistrationRowSerializer()
+            self.stdout.write(f"Serializing {rows} travel requests, best of {repeat}")
+
+            # Fetch and serialize, as a list request does
+            drf_total, drf_data = best_of(repeat, lambda: TravelRegistrationSerializer(
+                list(queryset.select_related('user')), many=True
+            ).data)
+            fast_total, fast_data = best_of(repeat, lambda: row_serializer.many(row_serializer.values(queryset)))
+            self.report("fetch + DRF serializer", drf_total, rows)
+            self.report("fetch + values() row serializer", fast_total, rows, drf_total)
+
+            # Serialization alone, from already fetched data
+            instances = list(queryset.select_related('user'))
+            values = list(row_serializer.values(queryset))
+            drf_only, _ = best_of(repeat, lambda: TravelRegistrationSerializer(instances, many=True).data)
+            fast_only, _ = best_of(repeat, lambda: row_serializer.many(values))
+            self.report("DRF serializer", drf_only, rows)
+            self.report("values() row serializer", fast_only, rows, drf_only)
+
+            if [dict(item) for item in drf_data] != fast_data:
+                self.stdout.write(self.style.ERROR("The two serializers disagree on the output"))
+
+            payload = {'next': None, 'previous': None, 'results': fast_data}
+            json_render, _ = best_of(repeat, lambda: JSONRenderer().render(payload))
+            self.report("DRF JSONRenderer", json_render, rows)
+            if orjson is not None:
+                orjson_render, _ = best_of(repeat, lambda: ORJSONRenderer().render(payload))
+                self.report("ORJSONRenderer", orjson_render, rows, json_render)
+            else:
+                self.stdout.write(f"{'ORJSONRenderer':>36}: skipped, orjson is not installed")
+            transaction.set_rollback(True)
@@ -0,0 +1,84 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from rest_framework.request import Request
+from authentication.models import User
+from users.models import TravelRegistration
+from users.stats import count_by, get_recent_limit, recent_requests_queryset
+from users.views import TravelRequestViewSet
+
+# Plan fragments that mean the whole travel_requests table is read row by row
+SEQ_SCAN_PATTERNS = [
+    re.compile(r'Seq Scan on travel_requests\b'),  # PostgreSQL
+    re.compile(r'\bSCAN travel_requests\b(?! USING)'),  # SQLite
+]
+
+
+def uses_index(plan):
+    return not any(pattern.search(plan) for pattern in SEQ_SCAN_PATTERNS)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN (ANALYZE on PostgreSQL) against the travel request view querysets "
+        "and report which of them fall back to a sequential scan. "
+        "Run it against realistic data volumes, the planner prefers seq scans on tiny tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Email of the employee used for the per-user listing")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the full plan of every query")
+        parser.add_argument(
+            '--fail-on-seq-scan',
+            action='store_true',
+            help="Exit with an error when an indexed query uses a sequential scan",
+        )
+
+    def get_view_queryset(self, user):
+        request = Request(RequestFactory().get('/users/travel-requests/'))
+        request.user = user
+        view = TravelRequestViewSet(request=request, action='list', args=(), kwargs={}, format_kwarg=None)
+        # Explain the first page the way the cursor paginator fetches it
+        paginator = view.pagination_class()
+        return view.get_queryset().order_by(*paginator.ordering)[:paginator.page_size + 1]
+
+    def get_querysets(self, user):
+        admin = User(is_staff=True)
+        queryset = TravelRegistration.objects.all()
+        querysets = [
+            ('travel-requests list (admin)', self.get_view_queryset(admin), True),
+            ('stats recent window', recent_requests_queryset(queryset, get_recent_limit()), True),
+            ('approval queue', queryset.filter(status='Pending').order_by('created_at'), True),
+            # Breakdowns aggregate every row, an index only scan is the best case here
+            ('stats status breakdown', count_by(queryset, 'status', as_queryset=True), False),
+        ]
+        if user is not None:
+            querysets.insert(1, ('travel-requests list (employee)', self.get_view_queryset(user), True))
+        return querysets
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(email=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user with email {options['user']}")
+        else:
+            user = User.objects.filter(is_staff=False).order_by('id').first()
+
+        analyze = connection.vendor == 'postgresql'
+        seq_scans = []
+        for name, queryset, expects_index in self.get_querysets(user):
+            plan = queryset.explain(analyze=True) if analyze else queryset.explain()
+            indexed = uses_index(plan)
+            if indexed:
+                self.stdout.write(self.style.SUCCESS(f"[index]    {name}"))
+            elif expects_index:
+                seq_scans.append(name)
+                self.stdout.write(self.style.WARNING(f"[seq scan] {name}"))
+            else:
+                self.stdout.write(f"[seq scan] {name} (full table aggregate)")
+            if options['verbose_plans'] or (expects_index and not indexed):
+                self.stdout.write(plan)
+
+        if seq_scans and options['fail_on_seq_scan']:
+            raise CommandError(f"Sequential scans in: {', '.join(seq_scans)}")
@@ -0,0 +1,32 @@
+import time
+from datetime import datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from users.rollup import rebuild_rollup
+
+
+def parse_day(value):
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute travel_daily_rollup from travel_requests. Run periodically with --days to reconcile "
+        "the incremental updates, or without arguments after bulk imports."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Only rebuild the last N days")
+        parser.add_argument('--since', type=parse_day, help="First day to rebuild (YYYY-MM-DD)")
+        parser.add_argument('--until', type=parse_day, help="Last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        since, until = options['since'], options['until']
+        if options['days']:
+            since = timezone.localdate() - timedelta(days=options['days'] - 1)
+        started = time.perf_counter()
+        rows = rebuild_rollup(since, until)
+        span = f"{since or 'the beginning'} to {until or 'today'}"
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {rows} rollup rows for {span} in {time.perf_counter() - started:.1f}s"
+        ))
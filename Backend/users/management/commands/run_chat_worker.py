@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from users.jobs import get_max_concurrency, start_workers
+
+
+class Command(BaseCommand):
+    help = "Process queued chat jobs. Run one per host; CHAT_JOB_MAX_CONCURRENCY caps running jobs across all of them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, help="Worker threads in this process (default CHAT_JOB_MAX_CONCURRENCY)")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is drained")
+
+    def handle(self, *args, **options):
+        count = options['threads'] or get_max_concurrency()
+        self.stdout.write(f"Starting {count} chat worker thread(s)")
+        stop_event, threads = start_workers(count, options['poll_interval'], options['once'])
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping chat workers")
+            stop_event.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,165 @@
+import csv
+import io
+import random
+import time
+from datetime import date, datetime, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from authentication.hashing import hash_password
+from authentication.models import User
+from users.factories import (
+    TRAVEL_ROW_FIELDS, build_users, generate_travel_rows, preserved_timestamps,
+)
+from users.list_cache import mark_all_changed
+from users.models import TravelRegistration
+from users.rollup import rebuild_rollup
+from users.stats import invalidate_travel_stats
+
+SEED_EMAIL_DOMAIN = "seed.invalid"
+SEED_USER_PREFIX = "seed-user-"
+SEED_PASSWORD = "seed-password"
+METHODS = ('auto', 'copy', 'insert', 'orm')
+# A fixed default, so the same --seed gives the same data (statuses included) whatever day it runs
+DEFAULT_START_DATE = date(2024, 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic users and travel requests with skewed project/route/status distributions. "
+        "Uses COPY on PostgreSQL and batched multi-row inserts elsewhere; the same --seed gives the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--start-date', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+            default=DEFAULT_START_DATE, help=f"First creation day (YYYY-MM-DD), default {DEFAULT_START_DATE}",
+        )
+        parser.add_argument('--days', type=int, default=730, help="Requests are created over this many days")
+        parser.add_argument(
+            '--method', choices=METHODS, default='auto',
+            help="copy (PostgreSQL only), insert (executemany) or orm (bulk_create); auto picks the fastest",
+        )
+        parser.add_argument('--reset', action='store_true', help="Delete previously seeded users and requests first")
+
+    def reset(self):
+        seeded = TravelRegistration.objects.filter(user__email__endswith=f"@{SEED_EMAIL_DOMAIN}")
+        # Skip the per-row delete signals, the stats snapshot is invalidated once at the end
+        deleted = seeded._raw_delete(seeded.db)
+        User.objects.filter(email__endswith=f"@{SEED_EMAIL_DOMAIN}").delete()
+        self.stdout.write(f"Deleted {deleted} seeded travel requests")
+
+    def seed_users(self, count, seed, batch_size):
+        """
+        Create the seed users <prefix><seed>-<n> (one shared password hash) and return their ids.
+        Names depend only on the seed and index, and users left from an earlier run are kept.
+        """
+        prefix = f"{SEED_USER_PREFIX}{seed}-"
+        User.objects.bulk_create(
+            build_users(count, prefix, SEED_EMAIL_DOMAIN, hash_password(SEED_PASSWORD)),
+            batch_size=batch_size, ignore_conflicts=True,
+        )
+        return list(
+            User.objects.filter(username__startswith=prefix, email__endswith=f"@{SEED_EMAIL_DOMAIN}")
+            .order_by('id').values_list('id', flat=True)[:count]
+        )
+
+    def write_copy(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows(rows)
+        buffer.seek(0)
+        sql = (
+            f"COPY {TravelRegistration._meta.db_table} ({', '.join(TRAVEL_ROW_FIELDS)}) "
+            f"FROM STDIN WITH (FORMAT csv)"
+        )
+        with connection.cursor() as cursor:
+            raw = cursor.cursor
+            if hasattr(raw, 'copy_expert'):
+                # psycopg2
+                raw.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with raw.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def write_insert(self, rows):
+        table = connection.ops.quote_name(TravelRegistration._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(name) for name in TRAVEL_ROW_FIELDS)
+        placeholders = ', '.join(['%s'] * len(TRAVEL_ROW_FIELDS))
+        adapt_date = connection.ops.adapt_datefield_value
+        adapt_datetime = connection.ops.adapt_datetimefield_value
+        params = []
+        for row in rows:
+            # created_at and updated_at are the same value
+            stamp = adapt_datetime(row[9])
+            params.append((*row[:3], adapt_date(row[3]), *row[4:9], stamp, stamp))
+        with connection.cursor() as cursor:
+            cursor.executemany(f"INSERT INTO {table} ({columns}) VALUES ({placeholders})", params)
+
+    def write_orm(self, rows):
+        with preserved_timestamps():
+            TravelRegistration.objects.bulk_create(
+                [TravelRegistration(**dict(zip(TRAVEL_ROW_FIELDS, row))) for row in rows],
+                batch_size=len(rows),
+            )
+
+    def handle(self, *args, **options):
+        method = options['method']
+        if method == 'auto':
+            method = 'copy' if connection.vendor == 'postgresql' else 'insert'
+        if method == 'copy' and connection.vendor != 'postgresql':
+            raise CommandError("--method copy needs PostgreSQL")
+        write = getattr(self, f"write_{method}")
+
+        if options['reset']:
+            self.reset()
+        user_ids = self.seed_users(options['users'], options['seed'], options['batch_size'])
+        if not user_ids:
+            raise CommandError("--users must be at least 1")
+
+        days = options['days']
+        start = options['start_date']
+        created_from = timezone.make_aware(datetime.combine(start, datetime.min.time()))
+        # Statuses are assigned as of the last creation day, not as of the day the command runs
+        as_of = start + timedelta(days=days)
+        rng = random.Random(options['seed'])
+        total = options['requests']
+        batch_size = options['batch_size']
+        report_every = max(total // 10, batch_size)
+
+        self.stdout.write(f"Seeding {total} travel requests for {len(user_ids)} users with {method}")
+        started = time.perf_counter()
+        done = next_report = 0
+        while done < total:
+            count = min(batch_size, total - done)
+            # Each batch covers the next slice of the date range, keeping ids in creation order
+            rows = generate_travel_rows(
+                user_ids, count, rng,
+                created_from + timedelta(days=days * done / total), days * count / total, as_of,
+            )
+            with transaction.atomic():
+                write(rows)
+            done += count
+            if done >= next_report or done == total:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {done:>10}/{total} rows  {done / elapsed:10,.0f} rows/sec")
+                next_report = done + report_every
+
+        if connection.vendor == 'postgresql':
+            # Fresh planner statistics, so EXPLAIN output reflects the new data
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {TravelRegistration._meta.db_table}")
+        # Bulk writes bypass the signals that keep the stats snapshot and the daily rollup current
+        invalidate_travel_stats()
+        mark_all_changed()
+        elapsed = time.perf_counter() - started
+        rollup_rows = rebuild_rollup()
+        self.stdout.write(f"Rebuilt {rollup_rows} daily rollup rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {total} travel requests in {elapsed:.1f}s ({total / elapsed:,.0f} rows/sec)"
+        ))
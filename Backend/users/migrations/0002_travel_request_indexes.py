@@ -0,0 +1,35 @@
+# Generated by Django 5.1.7 on 2026-10-18 09:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='travelregistration',
+            index=models.Index(fields=['user', '-created_at'], name='travel_req_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelregistration',
+            index=models.Index(fields=['-created_at', '-id'], name='travel_req_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelregistration',
+            index=models.Index(fields=['status', '-created_at'], name='travel_req_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelregistration',
+            index=models.Index(fields=['travel_mode', 'booking_mode'], name='travel_req_modes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelregistration',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['created_at'], name='travel_req_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:03
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollup(apps, schema_editor):
+    TravelRegistration = apps.get_model('users', 'TravelRegistration')
+    TravelDailyRollup = apps.get_model('users', 'TravelDailyRollup')
+    rows = (
+        TravelRegistration.objects.annotate(day=TruncDate('created_at'))
+        .values('day', 'status', 'travel_mode', 'booking_mode', 'project_name')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    TravelDailyRollup.objects.bulk_create((TravelDailyRollup(**row) for row in rows), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_chat_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TravelDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Approved', 'Approved'), ('Rejected', 'Rejected')], max_length=10)),
+                ('travel_mode', models.CharField(choices=[('train', 'By Train'), ('flight', 'By Flight')], max_length=10)),
+                ('booking_mode', models.CharField(choices=[('self', 'Self'), ('travelDesk', 'Travel Desk')], max_length=10)),
+                ('project_name', models.CharField(max_length=255)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'travel_daily_rollup',
+                'indexes': [models.Index(fields=['project_name', 'day'], name='travel_rollup_project_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'status', 'travel_mode', 'booking_mode', 'project_name'), name='travel_rollup_key')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:13
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models.functions import Upper
+
+TRIGRAM_INDEXES = {
+    'travel_purpose': 'travel_req_purpose_trgm_idx',
+    'start_location': 'travel_req_start_trgm_idx',
+    'end_location': 'travel_req_end_trgm_idx',
+}
+
+
+def search_indexes():
+    # Same expression as users.filters.search_travel_requests, so its full-text queries can use it
+    yield GinIndex(SearchVector(*TRIGRAM_INDEXES, config='english'), name='travel_req_search_idx')
+    # icontains compiles to UPPER(column) LIKE UPPER(...), so index that expression
+    for field, name in TRIGRAM_INDEXES.items():
+        yield GinIndex(OpClass(Upper(field), name='gin_trgm_ops'), name=name)
+
+
+def add_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    model = apps.get_model('users', 'TravelRegistration')
+    for index in search_indexes():
+        schema_editor.add_index(model, index)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    model = apps.get_model('users', 'TravelRegistration')
+    for index in search_indexes():
+        schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_travel_daily_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # No-ops on other databases
+        TrigramExtension(),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+        migrations.AddIndex(
+            model_name='travelregistration',
+            index=models.Index(fields=['project_name', '-created_at'], name='travel_req_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='travelregistration',
+            index=models.Index(fields=['start_date', 'id'], name='travel_req_start_date_idx'),
+        ),
+    ]
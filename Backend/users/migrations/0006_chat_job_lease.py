@@ -0,0 +1,34 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_travel_request_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='chatjob',
+            name='lease_owner',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='chatjob',
+            name='slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='chatjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'running')), fields=('slot',), name='chat_job_running_slot'),
+        ),
+    ]
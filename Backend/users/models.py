@@ -1,4 +1,6 @@
+import uuid
 from django.db import models
+from django.utils import timezone
 from authentication.models import User
 
 # Create your models here.
@@ -30,4 +32,82 @@ class TravelRegistration(models.Model):
 
     class Meta:
         db_table='travel_requests'
+        indexes = [
+            # Employee listing: filter by user, newest first
+            models.Index(fields=['user', '-created_at'], name='travel_req_user_created_idx'),
+            # Admin listing and the stats recent window
+            models.Index(fields=['-created_at', '-id'], name='travel_req_created_idx'),
+            # Status breakdowns and status filtered listings
+            models.Index(fields=['status', '-created_at'], name='travel_req_status_created_idx'),
+            models.Index(fields=['travel_mode', 'booking_mode'], name='travel_req_modes_idx'),
+            # Project filtered listings, and listings ordered or filtered by trip date
+            models.Index(fields=['project_name', '-created_at'], name='travel_req_project_created_idx'),
+            models.Index(fields=['start_date', 'id'], name='travel_req_start_date_idx'),
+            # Approval queue only ever looks at Pending rows
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(status='Pending'),
+                name='travel_req_pending_idx',
+            ),
+            # The full-text and trigram search indexes are PostgreSQL only, see migration 0005
+        ]
 
+
+
+class ChatJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_jobs')
+    message = models.TextField()
+    mode = models.CharField(max_length=10, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    response = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # The claiming worker's lease: only its owner may finish the job, and it renews heartbeat_at
+    # while the model is answering so other workers don't reclaim a job that is still running
+    lease_owner = models.CharField(max_length=32, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    # One of CHAT_JOB_MAX_CONCURRENCY slots while running; the unique constraint enforces the limit
+    slot = models.PositiveSmallIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'chat_jobs'
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='chat_job_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['slot'], condition=models.Q(status='running'), name='chat_job_running_slot'),
+        ]
+
+
+class TravelDailyRollup(models.Model):
+    """Requests created per day and status/travel mode/booking mode/project, kept current on every write"""
+    day = models.DateField()
+    status = models.CharField(max_length=10, choices=TravelRegistration.STATUS_CHOICES)
+    travel_mode = models.CharField(max_length=10, choices=TravelRegistration.TRAVEL_MODES)
+    booking_mode = models.CharField(max_length=10, choices=TravelRegistration.BOOKING_MODES)
+    project_name = models.CharField(max_length=255)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'travel_daily_rollup'
+        constraints = [
+            # Also serves day range scans
+            models.UniqueConstraint(
+                fields=['day', 'status', 'travel_mode', 'booking_mode', 'project_name'],
+                name='travel_rollup_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['project_name', 'day'], name='travel_rollup_project_idx'),
+        ]
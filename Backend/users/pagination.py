@@ -0,0 +1,113 @@
+import operator
+from functools import reduce
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+# Joins the ordering fields' values in a cursor position; dates, datetimes and ids never contain it
+POSITION_SEPARATOR = '|'
+
+
+class TravelRequestCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id) so every page costs the same regardless of depth.
+    The cursor holds every ordering field, not just the first as in DRF, so rows sharing a
+    created_at are split across pages by id instead of by an offset that shifts as rows arrive.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+
+    # CursorPagination.paginate_queryset, split around its one query so the async views can
+    # run that query with async iteration
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([row async for row in self.page_queryset(queryset, request, view)])
+
+    def page_queryset(self, queryset, request, view=None):
+        """The page's rows plus one more, which tells whether another page follows"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self.after_position(current_position))
+            except (ValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset[offset:offset + self.page_size + 1]
+
+    def after_position(self, position):
+        """
+        Rows strictly past the position in the ordering, spelled out as
+        (a < x) OR (a = x AND b < y) for ordering (-a, -b).
+        """
+        values = position.split(POSITION_SEPARATOR)
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        conditions = []
+        equal = Q()
+        for order, value in zip(self.ordering, values):
+            order_attr = order.lstrip('-')
+            # (cursor reversed) XOR (queryset reversed)
+            lookup = '__lt' if self.cursor.reverse != order.startswith('-') else '__gt'
+            conditions.append(equal & Q(**{order_attr + lookup: value}))
+            equal &= Q(**{order_attr: value})
+        return reduce(operator.or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            values = [instance[order.lstrip('-')] for order in ordering]
+        else:
+            values = [getattr(instance, order.lstrip('-')) for order in ordering]
+        return POSITION_SEPARATOR.join(str(value) for value in values)
+
+    def set_page(self, results):
+        """Work out the page and the next/previous positions from page_queryset()'s rows"""
+        offset, reverse, current_position = self.cursor or (0, False, None)
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            # The query ran in reverse, so put the page back in order
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
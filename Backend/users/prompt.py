@@ -0,0 +1,109 @@
+from django.conf import settings
+
+PROMPT_HEADER = "You are a travel request assistant. Here's the current data:"
+PROMPT_FOOTER = (
+    "Provide a professional and concise response based on this data. "
+    "Include relevant statistics and percentages where appropriate."
+)
+RECENT_COLUMNS = ('username', 'project', 'status', 'travel_mode', 'route', 'date', 'purpose')
+
+
+def get_token_budget():
+    return getattr(settings, 'CHAT_PROMPT_TOKEN_BUDGET', 2000)
+
+
+def get_recent_sample():
+    return getattr(settings, 'CHAT_PROMPT_RECENT_SAMPLE', 10)
+
+
+def get_purpose_chars():
+    return getattr(settings, 'CHAT_PROMPT_PURPOSE_CHARS', 80)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) that needs no API call"""
+    return len(text) // 4 + 1
+
+
+def truncate(value, limit):
+    value = " ".join(str(value).split())
+    return value if len(value) <= limit else value[:limit - 1] + "…"
+
+
+def format_counts(counts):
+    return ", ".join(f"{key}={value}" for key, value in counts.items())
+
+
+def format_top(items, label):
+    return ", ".join(f"{item[label]}={item['count']}" for item in items)
+
+
+def format_recent_table(recent_requests, purpose_chars):
+    """Encode recent requests as a pipe separated table, one header row and one line per request"""
+    lines = ["|".join(RECENT_COLUMNS)]
+    for req in recent_requests:
+        row = dict(req, purpose=truncate(req['purpose'], purpose_chars))
+        lines.append("|".join(str(row[column]).replace("|", "/") for column in RECENT_COLUMNS))
+    return "\n".join(lines)
+
+
+def render_prompt(stats, message, recent_requests, top_n):
+    sections = [
+        PROMPT_HEADER,
+        f"Total requests: {stats['total_requests']}\n"
+        f"By status: {format_counts(stats['by_status'])}\n"
+        f"By travel mode: {format_counts(stats['by_travel_mode'])}\n"
+        f"By booking mode: {format_counts(stats['by_booking_mode'])}",
+    ]
+    if top_n:
+        sections.append(
+            f"Top projects: {format_top(stats['top_projects'][:top_n], 'project')}\n"
+            f"Top routes: {format_top(stats['top_routes'][:top_n], 'route')}"
+        )
+    if recent_requests:
+        sections.append(
+            f"Most recent {len(recent_requests)} requests:\n"
+            f"{format_recent_table(recent_requests, get_purpose_chars())}"
+        )
+    sections.append(f"User question: {message}")
+    sections.append(PROMPT_FOOTER)
+    return "\n\n".join(sections)
+
+
+def build_chat_prompt(stats, message, token_budget=None):
+    """
+    Build the Gemini prompt from precomputed aggregates and a capped sample of recent requests.
+    Recent rows and then the top lists are dropped until the prompt fits the token budget; if it
+    still doesn't, the user's message is truncated to the room left. Returns the prompt and a
+    dict describing its size.
+    """
+    if token_budget is None:
+        token_budget = get_token_budget()
+
+    recent_requests = stats['recent_requests'][:get_recent_sample()]
+    top_n = max(len(stats['top_projects']), len(stats['top_routes']))
+
+    prompt = render_prompt(stats, message, recent_requests, top_n)
+    while estimate_tokens(prompt) > token_budget and (recent_requests or top_n):
+        if recent_requests:
+            recent_requests = recent_requests[:-1]
+        else:
+            top_n -= 1
+        prompt = render_prompt(stats, message, recent_requests, top_n)
+
+    message_truncated = estimate_tokens(prompt) > token_budget
+    if message_truncated:
+        # estimate_tokens(text) <= budget holds up to 4 * budget - 1 characters
+        room = 4 * token_budget - 1 - len(render_prompt(stats, "", recent_requests, top_n))
+        message = truncate(message, room) if room > 0 else ""
+        prompt = render_prompt(stats, message, recent_requests, top_n)
+
+    tokens = estimate_tokens(prompt)
+    return prompt, {
+        'chars': len(prompt),
+        'tokens': tokens,
+        'token_budget': token_budget,
+        'recent_rows': len(recent_requests),
+        'message_truncated': message_truncated,
+        'over_budget': tokens > token_budget,
+    }
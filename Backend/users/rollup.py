@@ -0,0 +1,127 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+from .models import TravelDailyRollup, TravelRegistration
+from .stats import changed_groups
+
+ROLLUP_DIMENSIONS = ('status', 'travel_mode', 'booking_mode', 'project_name')
+ROLLUP_INTERVALS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'year': TruncYear,
+}
+ROLLUP_BATCH_SIZE = 5000
+
+
+class RollupQueryError(ValueError):
+    pass
+
+
+def rollup_key(row):
+    """(day, status, travel_mode, booking_mode, project_name) of a request snapshot (see stats_row)"""
+    return (timezone.localdate(row['created_at']), *(row[field] for field in ROLLUP_DIMENSIONS))
+
+
+def rollup_deltas(old, new):
+    """Count changes for a request created (old=None), updated or deleted (new=None)"""
+    deltas = Counter()
+    for key, delta in changed_groups(old, new, rollup_key):
+        deltas[key] += delta
+    return deltas
+
+
+def created_deltas(instances):
+    """Count changes for requests inserted with bulk_create"""
+    return Counter(
+        (timezone.localdate(instance.created_at), *(getattr(instance, field) for field in ROLLUP_DIMENSIONS))
+        for instance in instances
+    )
+
+
+def status_change_deltas(rows, new_status):
+    """Count changes for rows (dicts with created_at and ROLLUP_DIMENSIONS) all moving to ``new_status``"""
+    deltas = Counter()
+    for row in rows:
+        if row['status'] != new_status:
+            deltas.update(rollup_deltas(row, {**row, 'status': new_status}))
+    return deltas
+
+
+def apply_rollup_deltas(deltas):
+    """Add each delta to its rollup row with an atomic UPDATE, creating missing rows"""
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        lookup = dict(zip(('day',) + ROLLUP_DIMENSIONS, key))
+        # A missing row on a decrement means the rollup hasn't been built for that day;
+        # leave it to rebuild_travel_rollup rather than store a negative count
+        if TravelDailyRollup.objects.filter(**lookup).update(count=F('count') + delta) or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                TravelDailyRollup.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Another writer created the row in the meantime
+            TravelDailyRollup.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def day_bounds(since=None, until=None):
+    """created_at range filters for whole days ``since``..``until`` (inclusive)"""
+    filters = {}
+    if since:
+        filters['created_at__gte'] = timezone.make_aware(datetime.combine(since, time.min))
+    if until:
+        filters['created_at__lt'] = timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+    return filters
+
+
+def rebuild_rollup(since=None, until=None):
+    """Recompute the rollup for days ``since``..``until`` (default: everything) from travel_requests"""
+    rows = (
+        TravelRegistration.objects.filter(**day_bounds(since, until))
+        .annotate(day=TruncDate('created_at'))
+        .values('day', *ROLLUP_DIMENSIONS)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    existing = TravelDailyRollup.objects.all()
+    if since:
+        existing = existing.filter(day__gte=since)
+    if until:
+        existing = existing.filter(day__lte=until)
+    with transaction.atomic():
+        existing.delete()
+        created = TravelDailyRollup.objects.bulk_create(
+            (TravelDailyRollup(**row) for row in rows.iterator(chunk_size=ROLLUP_BATCH_SIZE)),
+            batch_size=ROLLUP_BATCH_SIZE,
+        )
+    return len(created)
+
+
+def rollup_series(interval='day', group_by=None, since=None, until=None, **filters):
+    """Request counts per period (and per ``group_by`` value), read from the rollup table only"""
+    if interval not in ROLLUP_INTERVALS:
+        raise RollupQueryError(f"interval must be one of {', '.join(ROLLUP_INTERVALS)}")
+    if group_by and group_by not in ROLLUP_DIMENSIONS:
+        raise RollupQueryError(f"group_by must be one of {', '.join(ROLLUP_DIMENSIONS)}")
+    unknown = set(filters) - set(ROLLUP_DIMENSIONS)
+    if unknown:
+        raise RollupQueryError(f"Cannot filter the rollup by {', '.join(sorted(unknown))}")
+
+    queryset = TravelDailyRollup.objects.filter(**{field: value for field, value in filters.items() if value})
+    if since:
+        queryset = queryset.filter(day__gte=since)
+    if until:
+        queryset = queryset.filter(day__lte=until)
+    trunc = ROLLUP_INTERVALS[interval]
+    queryset = queryset.annotate(period=trunc('day') if trunc else F('day'))
+    columns = ['period', group_by] if group_by else ['period']
+    rows = queryset.values(*columns).annotate(total=Sum('count')).filter(total__gt=0).order_by(*columns)
+    return [
+        {'period': row['period'], **({group_by: row[group_by]} if group_by else {}), 'count': row['total']}
+        for row in rows
+    ]
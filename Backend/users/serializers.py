@@ -1,5 +1,8 @@
-from rest_framework import serializers
-from .models import TravelRegistration
+from datetime import date
+from operator import itemgetter
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from .models import ChatJob, TravelRegistration
 
 class TravelRegistrationSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
@@ -8,8 +11,15 @@ class TravelRegistrationSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ['user']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse fieldsets: drop every field the client did not ask for
+        fields = self.context.get('fields')
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def validate_start_date(self, value):
-        from datetime import date
         if value <= date.today():
             raise serializers.ValidationError("Start date must be a future date.")
         return value
@@ -20,3 +30,72 @@ class TravelRegistrationSerializer(serializers.ModelSerializer):
         if start_location and end_location and start_location == end_location:
             raise serializers.ValidationError("Start and end locations cannot be the same.")
         return data
+
+
+def iso_datetime(field):
+    """DRF's ISO 8601 DateTimeField output, minus the per-value format and timezone lookups"""
+    tz = field.default_timezone()
+
+    def convert(value):
+        text = value.astimezone(tz).isoformat() if tz is not None else value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def field_converter(field):
+    """A function turning a raw column value into ``field``'s output, or None when it is already that"""
+    if isinstance(field, serializers.DateTimeField) and getattr(field, 'format', None) is None \
+            and api_settings.DATETIME_FORMAT == ISO_8601:
+        return iso_datetime(field)
+    if isinstance(field, serializers.DateField) and getattr(field, 'format', None) is None \
+            and api_settings.DATE_FORMAT == ISO_8601:
+        return date.isoformat
+    if isinstance(field, (
+        serializers.CharField, serializers.ChoiceField, serializers.IntegerField, serializers.PrimaryKeyRelatedField,
+    )):
+        # Text, choice values, ids and foreign keys come out of values() already as rendered
+        return None
+    return field.to_representation
+
+
+class TravelRegistrationRowSerializer:
+    """
+    Read-only fast path for lists: maps values() rows straight to the dicts
+    TravelRegistrationSerializer would produce. The column for each field and how to
+    convert it are worked out once per serializer instead of once per row and field.
+    """
+
+    def __init__(self, fields=None, extra_columns=()):
+        serializer = TravelRegistrationSerializer(context={'fields': fields})
+        self.names = tuple(serializer.fields)
+        sources = [field.source.replace('.', '__') for field in serializer.fields.values()]
+        # Extra columns (e.g. the cursor's ordering fields) are loaded but not rendered
+        self.columns = tuple(dict.fromkeys([*sources, *extra_columns]))
+        self.getter = itemgetter(*sources) if len(sources) > 1 else lambda row: (row[sources[0]],)
+        self.converters = [
+            (name, convert) for name, convert in
+            ((name, field_converter(field)) for name, field in serializer.fields.items())
+            if convert is not None
+        ]
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row):
+        item = dict(zip(self.names, self.getter(row)))
+        for name, convert in self.converters:
+            value = item[name]
+            if value is not None:
+                item[name] = convert(value)
+        return item
+
+    def many(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class ChatJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source='id', read_only=True)
+
+    class Meta:
+        model = ChatJob
+        fields = ['job_id', 'status', 'response', 'error', 'attempts', 'created_at', 'updated_at']
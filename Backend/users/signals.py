@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import TravelRegistration
+from .events import publish_request_saved
+from .list_cache import mark_changed
+from .rollup import apply_rollup_deltas, rollup_deltas
+from .stats import RECENT_REQUEST_FIELDS, apply_stats_change, stats_row
+
+
+@receiver(pre_save, sender=TravelRegistration)
+def capture_previous_request(sender, instance, raw, **kwargs):
+    """Remember the stored version of a request so the stats can be patched after the update"""
+    if raw or instance.pk is None:
+        instance._stats_previous = None
+        return
+    # Callers that already hold the stored row (see TravelRequestViewSet.perform_update) set it up front
+    if getattr(instance, '_stats_previous', None) is None:
+        instance._stats_previous = TravelRegistration.objects.filter(pk=instance.pk)\
+            .values(*RECENT_REQUEST_FIELDS)\
+            .first()
+
+
+@receiver(post_save, sender=TravelRegistration)
+def update_stats_on_save(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._stats_previous
+    instance._stats_previous = None
+    new = stats_row(instance)
+    transaction.on_commit(lambda: apply_stats_change(old, new))
+    # After commit, so hot rollup rows aren't locked for the whole write transaction;
+    # rebuild_travel_rollup reconciles anything lost in between
+    transaction.on_commit(lambda: apply_rollup_deltas(rollup_deltas(old, new)))
+    transaction.on_commit(lambda: mark_changed(instance.user_id))
+    transaction.on_commit(lambda: publish_request_saved(old, new, instance.user_id, instance.updated_at))
+
+
+@receiver(post_delete, sender=TravelRegistration)
+def update_stats_on_delete(sender, instance, **kwargs):
+    old = stats_row(instance, include_username=False)
+    transaction.on_commit(lambda: apply_stats_change(old, None))
+    transaction.on_commit(lambda: apply_rollup_deltas(rollup_deltas(old, None)))
+    transaction.on_commit(lambda: mark_changed(instance.user_id))
@@ -0,0 +1,328 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from .models import TravelRegistration
+
+# Cache settings
+CACHE_KEY_STATS = "travel_request_stats"
+CACHE_KEY_STATS_LOCK = "travel_request_stats:lock"
+CACHE_KEY_STATS_VERSION = "travel_request_stats:version"
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+REBUILD_WAIT = 5
+
+
+RECENT_REQUEST_FIELDS = (
+    'id',
+    'user__username',
+    'project_name',
+    'travel_purpose',
+    'status',
+    'travel_mode',
+    'booking_mode',
+    'start_location',
+    'end_location',
+    'start_date',
+    'created_at',
+)
+
+
+def get_recent_limit():
+    return getattr(settings, 'TRAVEL_STATS_RECENT_LIMIT', 10)
+
+
+def get_top_n():
+    return getattr(settings, 'TRAVEL_STATS_TOP_N', 5)
+
+
+def get_cache_timeout():
+    return getattr(settings, 'TRAVEL_STATS_CACHE_TIMEOUT', 300)
+
+
+def count_by(queryset, *fields, limit=None, as_queryset=False):
+    """Group the queryset by the given fields and count rows per group in the database"""
+    rows = queryset.order_by().values(*fields)\
+        .annotate(count=Count('id'))\
+        .order_by('-count', *fields)
+    if limit is not None:
+        rows = rows[:limit]
+    return rows if as_queryset else list(rows)
+
+
+def choice_counts(queryset, field, choices):
+    """Count rows per choice value, including choices that currently have no rows"""
+    counts = {value: 0 for value, _ in choices}
+    for row in count_by(queryset, field):
+        counts[row[field]] = row['count']
+    return counts
+
+
+def route_of(row):
+    return f"{row['start_location']} to {row['end_location']}"
+
+
+def format_recent_request(req):
+    """Format a recent request row returned by values()"""
+    return {
+        'id': req['id'],
+        'username': req['user__username'],
+        'project': req['project_name'],
+        'purpose': req['travel_purpose'],
+        'status': req['status'],
+        'travel_mode': req['travel_mode'],
+        'route': route_of(req),
+        'date': req['start_date'].strftime('%Y-%m-%d'),
+        'created': req['created_at'].strftime('%Y-%m-%d %H:%M'),
+    }
+
+
+def recent_requests_queryset(queryset, limit):
+    return queryset.order_by('-created_at', '-id').values(*RECENT_REQUEST_FIELDS)[:limit]
+
+
+def get_recent_requests(queryset, limit):
+    """Fetch only the newest ``limit`` requests instead of the whole table"""
+    return [format_recent_request(req) for req in recent_requests_queryset(queryset, limit)]
+
+
+def get_top_projects(queryset, top_n):
+    return [
+        {'project': row['project_name'], 'count': row['count']}
+        for row in count_by(queryset, 'project_name', limit=top_n)
+    ]
+
+
+def get_top_routes(queryset, top_n):
+    return [
+        {'route': route_of(row), 'count': row['count']}
+        for row in count_by(queryset, 'start_location', 'end_location', limit=top_n)
+    ]
+
+
+# Snapshot key -> (label of a group, query that recomputes the list)
+TOP_LISTS = {
+    'top_projects': ('project', get_top_projects),
+    'top_routes': ('route', get_top_routes),
+}
+
+
+def compute_travel_stats(recent_limit=None, top_n=None):
+    """Compute travel request statistics with GROUP BY aggregates in the database"""
+    if recent_limit is None:
+        recent_limit = get_recent_limit()
+    if top_n is None:
+        top_n = get_top_n()
+
+    queryset = TravelRegistration.objects.all()
+
+    by_status = choice_counts(queryset, 'status', TravelRegistration.STATUS_CHOICES)
+    by_travel_mode = choice_counts(queryset, 'travel_mode', TravelRegistration.TRAVEL_MODES)
+    by_booking_mode = choice_counts(queryset, 'booking_mode', TravelRegistration.BOOKING_MODES)
+
+    return {
+        'total_requests': sum(by_status.values()),
+        'by_status': by_status,
+        'by_travel_mode': by_travel_mode,
+        'by_booking_mode': by_booking_mode,
+        'top_projects': get_top_projects(queryset, top_n),
+        'top_routes': get_top_routes(queryset, top_n),
+        'recent_requests': get_recent_requests(queryset, recent_limit),
+    }
+
+
+def get_stats_version():
+    return cache.get(CACHE_KEY_STATS_VERSION, 0)
+
+
+def bump_stats_version():
+    """Mark every snapshot built before now as outdated"""
+    cache.add(CACHE_KEY_STATS_VERSION, 0, None)
+    return cache.incr(CACHE_KEY_STATS_VERSION)
+
+
+def acquire_stats_lock(wait):
+    """Try to take the single-flight lock, polling for at most ``wait`` seconds"""
+    deadline = time.monotonic() + wait
+    while not cache.add(CACHE_KEY_STATS_LOCK, 1, LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(LOCK_POLL_INTERVAL)
+    return True
+
+
+def release_stats_lock():
+    cache.delete(CACHE_KEY_STATS_LOCK)
+
+
+def rebuild_travel_stats():
+    """Recompute the snapshot and cache it unless a change landed while it was being built"""
+    version = get_stats_version()
+    stats = compute_travel_stats()
+    stats['version'] = version
+    if get_stats_version() == version:
+        cache.set(CACHE_KEY_STATS, stats, get_cache_timeout())
+    return stats
+
+
+def get_cached_stats():
+    """
+    The cached snapshot, or None when there is none or it was built for an older version: a
+    rebuild can cache its result just after a write bumped the version, and the write can't
+    always take the lock to drop it
+    """
+    stats = cache.get(CACHE_KEY_STATS)
+    if stats is None or stats.get('version') != get_stats_version():
+        return None
+    return fill_top_lists(stats)
+
+
+def fill_top_lists(stats):
+    """Recompute the top lists a patch had to give up on (None), each with one bounded GROUP BY"""
+    missing = [key for key in TOP_LISTS if stats[key] is None]
+    if not missing:
+        return stats
+    queryset = TravelRegistration.objects.all()
+    for key in missing:
+        stats[key] = TOP_LISTS[key][1](queryset, get_top_n())
+    if acquire_stats_lock(0):
+        try:
+            if get_stats_version() == stats['version']:
+                cache.set(CACHE_KEY_STATS, stats, get_cache_timeout())
+        finally:
+            release_stats_lock()
+    return stats
+
+
+def get_travel_stats():
+    """Get travel request statistics from cache or database"""
+    # Try to get stats from cache
+    stats = get_cached_stats()
+    if stats is not None:
+        return stats
+
+    # Cold cache: only the worker holding the lock rebuilds, the others wait for its result
+    deadline = time.monotonic() + REBUILD_WAIT
+    while time.monotonic() < deadline:
+        if acquire_stats_lock(0):
+            try:
+                return rebuild_travel_stats()
+            finally:
+                release_stats_lock()
+        time.sleep(LOCK_POLL_INTERVAL)
+        stats = get_cached_stats()
+        if stats is not None:
+            return stats
+
+    # The rebuilding worker is taking too long, answer from the database without caching
+    stats = compute_travel_stats()
+    stats['version'] = get_stats_version()
+    return stats
+
+
+def stats_row(instance, include_username=True):
+    """Snapshot the fields of a request that the stats depend on"""
+    row = {field: getattr(instance, field) for field in RECENT_REQUEST_FIELDS if field != 'user__username'}
+    row['user__username'] = instance.user.username if include_username else None
+    return row
+
+
+def changed_groups(old, new, key):
+    """Return (group, delta) pairs for a row moving from ``old`` to ``new``"""
+    old_key = key(old) if old is not None else None
+    new_key = key(new) if new is not None else None
+    if old is not None and new is not None and old_key == new_key:
+        return []
+    deltas = []
+    if old is not None:
+        deltas.append((old_key, -1))
+    if new is not None:
+        deltas.append((new_key, 1))
+    return deltas
+
+
+def patch_top(items, label, value, delta, top_n):
+    """Adjust a top-N list in place, returning False when the result can't be known without a query"""
+    for item in items:
+        if item[label] == value:
+            lowest = min(other['count'] for other in items)
+            item['count'] += delta
+            if delta < 0 and len(items) >= top_n and item['count'] < lowest:
+                # A group outside the list may now rank above this one
+                return False
+            if item['count'] <= 0:
+                items.remove(item)
+            break
+    else:
+        if delta > 0:
+            if len(items) >= top_n:
+                # The group's total outside the list is unknown
+                return False
+            items.append({label: value, 'count': delta})
+    items.sort(key=lambda item: (-item['count'], item[label]))
+    return True
+
+
+def patch_travel_stats(stats, old, new):
+    """Apply a single request change to a cached snapshot in place"""
+    if old is None:
+        stats['total_requests'] += 1
+    if new is None:
+        stats['total_requests'] -= 1
+
+    for key, field in (
+        ('by_status', 'status'),
+        ('by_travel_mode', 'travel_mode'),
+        ('by_booking_mode', 'booking_mode'),
+    ):
+        for value, delta in changed_groups(old, new, lambda row: row[field]):
+            stats[key][value] = stats[key].get(value, 0) + delta
+
+    # The counts are always patched; a top list that can't be is recomputed on the next read
+    top_n = get_top_n()
+    for key, group in (('top_projects', lambda row: row['project_name']), ('top_routes', route_of)):
+        for value, delta in changed_groups(old, new, group):
+            if stats[key] is not None and not patch_top(stats[key], TOP_LISTS[key][0], value, delta, top_n):
+                stats[key] = None
+
+    recent = stats['recent_requests']
+    recent_ids = [req['id'] for req in recent]
+    if new is None:
+        if old['id'] in recent_ids:
+            # Refill the window with a bounded query rather than leaving a gap
+            stats['recent_requests'] = get_recent_requests(TravelRegistration.objects.all(), get_recent_limit())
+    elif new['id'] in recent_ids:
+        recent[recent_ids.index(new['id'])] = format_recent_request(new)
+    elif old is None:
+        recent.insert(0, format_recent_request(new))
+        del recent[get_recent_limit():]
+
+
+def apply_stats_change(old, new):
+    """Update the cached snapshot for a created (old=None), updated or deleted (new=None) request"""
+    version = bump_stats_version()
+    # Never wait on the write path: this runs in the request that saved the row
+    if not acquire_stats_lock(0):
+        # Another worker is rebuilding or patching; drop the snapshot so it gets rebuilt
+        cache.delete(CACHE_KEY_STATS)
+        return
+    try:
+        stats = cache.get(CACHE_KEY_STATS)
+        if stats is None:
+            return
+        # Only a snapshot that is exactly one change behind can be patched; anything older
+        # (a concurrent writer, or a copy still held in this process's L1) is rebuilt instead
+        if stats.get('version') == version - 1:
+            patch_travel_stats(stats, old, new)
+            stats['version'] = version
+            cache.set(CACHE_KEY_STATS, stats, get_cache_timeout())
+        else:
+            cache.delete(CACHE_KEY_STATS)
+    finally:
+        release_stats_lock()
+
+
+def invalidate_travel_stats():
+    """Drop the snapshot after bulk writes that bypass model signals; the next read rebuilds it once"""
+    bump_stats_version()
+    cache.delete(CACHE_KEY_STATS)
@@ -1,3 +1,1270 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import runpy
+import time
+from datetime import date, timedelta
+from importlib.util import find_spec
+from unittest import mock, skipIf
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from authentication.models import User
+from authentication.tokens import TokenClaimsObtainPairSerializer
+from main.cache import TieredCache
+from main.events import RESYNC_EVENT, MemoryBroker
+from main.metrics import record_query
+from main.renderers import ORJSONRenderer, orjson
+from .models import ChatJob, TravelDailyRollup, TravelRegistration
+from .list_cache import REPLICA_SETTLE_SECONDS, set_validators
+from .jobs import claim_next_job, enqueue_chat_job, run_job
+from .chat_cache import ChatResponseCache
+from .chat_tools import StubToolModel, answer_with_tools, run_tool
+from .events import ADMIN_CHANNEL, WEBSOCKET_PATH, publish_status_change, travel_request_websocket, user_channel
+from .prompt import PROMPT_FOOTER, build_chat_prompt, estimate_tokens, render_prompt
+from .rollup import rebuild_rollup
+from .serializers import TravelRegistrationRowSerializer, TravelRegistrationSerializer
+from .stats import CACHE_KEY_STATS, acquire_stats_lock, bump_stats_version, compute_travel_stats, get_travel_stats
+from .views import TravelRequestViewSet
 
-# Create your tests here.
+
+def make_travel_requests(users, count):
+    start_date = date.today() + timedelta(days=30)
+    TravelRegistration.objects.bulk_create(
+        [
+            TravelRegistration(
+                user=users[i % len(users)],
+                project_name=f"Project {i % 7}",
+                travel_purpose="Client workshop",
+                start_date=start_date,
+                travel_mode='flight' if i % 3 else 'train',
+                booking_mode='self' if i % 2 else 'travelDesk',
+                start_location="Bangalore",
+                end_location="Mumbai",
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+
+
+class TravelRequestQueryCountMixin:
+    """Query counts of the travel-requests endpoints must not depend on the table size"""
+    rows = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        cls.employees = [
+            User.objects.create_user(username=f"employee{i}", password="secret", email=f"employee{i}@example.com")
+            for i in range(5)
+        ]
+        make_travel_requests(cls.employees, cls.rows)
+        cls.travel_request = TravelRegistration.objects.filter(user=cls.employees[0]).first()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_admin_list(self):
+        self.client.force_authenticate(self.admin)
+        # max(updated_at) for the ETag on a cold cache, then the page
+        with self.assertNumQueries(2):
+            response = self.client.get('/users/travel-requests/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), min(self.rows, 50))
+
+    def test_admin_list_sparse_fields(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(2):
+            response = self.client.get('/users/travel-requests/?fields=id,status')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'status'})
+
+    def test_employee_list(self):
+        self.client.force_authenticate(self.employees[0])
+        with self.assertNumQueries(2):
+            response = self.client.get('/users/travel-requests/?page_size=500')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(row['username'] == "employee0" for row in response.data['results']))
+
+    def test_retrieve(self):
+        self.client.force_authenticate(self.employees[0])
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/users/travel-requests/{self.travel_request.id}/')
+        self.assertEqual(response.data['username'], "employee0")
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.client.force_authenticate(self.admin)
+        self.client.get('/users/travel-requests/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/users/travel-requests/')
+        self.assertEqual(len(response.data['results']), min(self.rows, 50))
+
+    def test_create(self):
+        self.client.force_authenticate(self.employees[0])
+        data = {
+            "project_name": "Project X",
+            "travel_purpose": "Kickoff",
+            "start_date": str(date.today() + timedelta(days=10)),
+            "travel_mode": "train",
+            "booking_mode": "self",
+            "start_location": "Chennai",
+            "end_location": "Pune",
+        }
+        with self.assertNumQueries(1):
+            response = self.client.post('/users/travel-requests/', data, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['username'], "employee0")
+
+    def test_update(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(2):
+            response = self.client.patch(
+                f'/users/travel-requests/{self.travel_request.id}/', {"status": "Approved"}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], "Approved")
+
+
+class TravelRequestQueryCount10Tests(TravelRequestQueryCountMixin, TestCase):
+    rows = 10
+
+
+class TravelRequestQueryCount1kTests(TravelRequestQueryCountMixin, TestCase):
+    rows = 1000
+
+
+class TravelRequestQueryCount10kTests(TravelRequestQueryCountMixin, TestCase):
+    rows = 10000
+
+
+class ChatResponseCacheTests(TestCase):
+    @override_settings(CHAT_MODE='prompt')
+    def test_modes_keep_separate_answers(self):
+        responses = ChatResponseCache(max_entries=10, ttl=60)
+        stats = {'version': 3}
+        responses.set("How many trips?", stats, "From the prompt")
+        self.assertEqual(responses.get("how many trips", stats, "prompt"), "From the prompt")
+        self.assertIsNone(responses.get("How many trips?", stats, "tools"))
+
+
+class ChatPromptTests(TestCase):
+    stats = {
+        'total_requests': 3,
+        'by_status': {'Pending': 2, 'Approved': 1},
+        'by_travel_mode': {'flight': 3},
+        'by_booking_mode': {'self': 3},
+        'top_projects': [{'project': f"Project {i}", 'count': 3 - i} for i in range(3)],
+        'top_routes': [{'route': f"City {i} -> Mumbai", 'count': 3 - i} for i in range(3)],
+        'recent_requests': [
+            {
+                'username': f"employee{i}", 'project': f"Project {i}", 'status': 'Pending',
+                'travel_mode': 'flight', 'route': f"City {i} -> Mumbai", 'date': '2026-01-01',
+                'purpose': "Client workshop",
+            }
+            for i in range(3)
+        ],
+    }
+
+    def budget_for(self, recent_rows, top_n, message="How many trips?"):
+        return estimate_tokens(render_prompt(self.stats, message, self.stats['recent_requests'][:recent_rows], top_n))
+
+    def test_exact_budget_keeps_every_section(self):
+        prompt, size = build_chat_prompt(self.stats, "How many trips?", token_budget=self.budget_for(3, 3))
+        self.assertEqual(size['recent_rows'], 3)
+        self.assertIn("Top routes: City 0 -> Mumbai=3, City 1 -> Mumbai=2, City 2 -> Mumbai=1", prompt)
+        self.assertFalse(size['over_budget'])
+
+        _, size = build_chat_prompt(self.stats, "How many trips?", token_budget=self.budget_for(3, 3) - 1)
+        self.assertEqual(size['recent_rows'], 2)
+
+    def test_recent_rows_are_dropped_before_the_top_lists(self):
+        prompt, size = build_chat_prompt(self.stats, "How many trips?", token_budget=self.budget_for(0, 3))
+        self.assertEqual(size['recent_rows'], 0)
+        self.assertIn("Top projects: Project 0=3, Project 1=2, Project 2=1", prompt)
+
+        prompt, size = build_chat_prompt(self.stats, "How many trips?", token_budget=self.budget_for(0, 1))
+        self.assertIn("Top projects: Project 0=3\n", prompt)
+        self.assertLessEqual(size['tokens'], size['token_budget'])
+        self.assertFalse(size['message_truncated'])
+
+    def test_oversized_message_is_truncated_to_the_budget(self):
+        budget = self.budget_for(0, 0, message="") + 10
+        message = "How many trips " + "really " * 500
+        prompt, size = build_chat_prompt(self.stats, message, token_budget=budget)
+        self.assertTrue(size['message_truncated'])
+        self.assertFalse(size['over_budget'])
+        self.assertEqual(size['tokens'], budget)
+        self.assertIn("User question: How many trips really", prompt)
+        self.assertTrue(prompt.endswith(PROMPT_FOOTER))
+
+
+class ChatToolsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        cls.employees = [
+            User.objects.create_user(username=f"employee{i}", password="secret", email=f"employee{i}@example.com")
+            for i in range(2)
+        ]
+        make_travel_requests(cls.employees, 12)
+        first_ids = list(TravelRegistration.objects.order_by('id').values_list('id', flat=True)[:3])
+        TravelRegistration.objects.filter(id__in=first_ids).update(status='Approved')
+
+    def test_count_requests_grouped(self):
+        result = run_tool('count_requests', {'group_by': 'status'})
+        self.assertEqual(result['total'], 12)
+        self.assertEqual(result['groups'][0], {'status': 'Pending', 'count': 9})
+
+    def test_count_requests_filters(self):
+        self.assertEqual(run_tool('count_requests', {'status': 'Approved', 'travel_mode': 'flight'}), {'count': 2})
+
+    def test_find_requests_for_user(self):
+        result = run_tool('find_requests', {'username': 'employee1', 'limit': 3})
+        self.assertEqual(len(result['requests']), 3)
+        self.assertTrue(all(req['username'] == "employee1" for req in result['requests']))
+
+    def test_bad_calls_are_reported_to_the_model(self):
+        self.assertIn('error', run_tool('drop_table', {}))
+        self.assertIn('error', run_tool('count_requests', {'start_date_from': "yesterday"}))
+        self.assertIn('error', run_tool('count_requests', {'unknown': 1}))
+
+    def test_answer_with_stub_model(self):
+        model = StubToolModel([('count_requests', {'status': 'Pending'})])
+        answer = answer_with_tools("How many pending?", model)
+        self.assertEqual(json.loads(answer), [{'name': 'count_requests', 'result': {'count': 9}}])
+
+    @override_settings(CHAT_LLM_BACKEND='fake')
+    def test_chat_tools_mode(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/users/chat/', {"message": "Status breakdown?", "mode": "tools"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data['response'])[0]['result']['total'], 12)
+
+
+@override_settings(CHAT_LLM_BACKEND='fake', CHAT_JOB_MAX_CONCURRENCY=1)
+class ChatJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_enqueue_process_and_poll(self):
+        response = self.client.post('/users/chat/jobs/', {"message": "How many pending?"}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job_id']
+        self.assertEqual(self.client.get(f'/users/chat/{job_id}/').data['status'], 'queued')
+
+        run_job(claim_next_job())
+
+        response = self.client.get(f'/users/chat/{job_id}/')
+        self.assertEqual(response.data['status'], 'done')
+        self.assertTrue(response.data['response'].startswith("Fake answer"))
+
+    def test_unknown_mode_is_rejected(self):
+        for mode in ("sql", "prompt-and-tools"):
+            response = self.client.post('/users/chat/jobs/', {"message": "Hi", "mode": mode}, format='json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(ChatJob.objects.exists())
+
+    def test_sync_chat_rejects_unknown_mode(self):
+        response = self.client.post('/users/chat/', {"message": "Hi", "mode": "sql"}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_live_job_is_not_reclaimed(self):
+        enqueue_chat_job(self.admin.id, "slow")
+        job = claim_next_job()
+        # Started long ago, but its worker keeps renewing the lease
+        ChatJob.objects.filter(id=job.id).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(claim_next_job())
+
+    def test_abandoned_job_is_reclaimed_until_out_of_attempts(self):
+        job = enqueue_chat_job(self.admin.id, "orphan")
+        claim_next_job()
+        abandoned = timezone.now() - timedelta(hours=1)
+        ChatJob.objects.filter(id=job.id).update(heartbeat_at=abandoned)
+        reclaimed = claim_next_job()
+        self.assertEqual((reclaimed.id, reclaimed.attempts), (job.id, 2))
+        self.assertNotEqual(reclaimed.lease_owner, job.lease_owner)
+
+        ChatJob.objects.filter(id=job.id).update(heartbeat_at=abandoned, attempts=3)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.slot), ('failed', None))
+
+    def test_worker_that_lost_its_lease_drops_its_result(self):
+        enqueue_chat_job(self.admin.id, "slow")
+        job = claim_next_job()
+        ChatJob.objects.filter(id=job.id).update(lease_owner="another-worker")
+        job = run_job(job)
+        self.assertEqual((job.status, job.response, job.lease_owner), ('running', '', "another-worker"))
+
+    def test_concurrency_cap(self):
+        enqueue_chat_job(self.admin.id, "first")
+        enqueue_chat_job(self.admin.id, "second")
+        self.assertIsNotNone(claim_next_job())
+        self.assertIsNone(claim_next_job())
+
+    def test_retry_with_backoff_then_fail(self):
+        job = enqueue_chat_job(self.admin.id, "flaky")
+        with mock.patch('users.jobs.answer_chat', side_effect=RuntimeError("rate limited")):
+            job = run_job(claim_next_job())
+            self.assertEqual(job.status, 'queued')
+            self.assertGreater(job.available_at, timezone.now())
+            self.assertIsNone(claim_next_job())
+
+            ChatJob.objects.filter(id=job.id).update(available_at=timezone.now())
+            run_job(claim_next_job())
+            ChatJob.objects.filter(id=job.id).update(available_at=timezone.now())
+            job = run_job(claim_next_job())
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, 3)
+
+
+def statements(queries):
+    """Captured queries without the savepoints TestCase wraps around transaction.atomic"""
+    return [query for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+
+
+class TravelRequestBulkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        cls.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def travel_request_data(self, **overrides):
+        data = {
+            "project_name": "Project X",
+            "travel_purpose": "Kickoff",
+            "start_date": str(date.today() + timedelta(days=10)),
+            "travel_mode": "train",
+            "booking_mode": "self",
+            "start_location": "Chennai",
+            "end_location": "Pune",
+        }
+        data.update(overrides)
+        return data
+
+    def test_bulk_create(self):
+        self.client.force_authenticate(self.employee)
+        items = [self.travel_request_data(project_name=f"Project {i}") for i in range(200)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/users/travel-requests/bulk/', items, format='json')
+        # One INSERT on PostgreSQL, SQLite splits it by its bound variable limit
+        self.assertLessEqual(len(statements(queries)), 3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 200)
+        self.assertEqual(TravelRegistration.objects.filter(user=self.employee).count(), 200)
+
+    def test_bulk_create_is_all_or_nothing(self):
+        self.client.force_authenticate(self.employee)
+        items = [self.travel_request_data(), self.travel_request_data(end_location="Chennai")]
+        response = self.client.post('/users/travel-requests/bulk/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.data['results']], ['valid', 'invalid'])
+        self.assertFalse(TravelRegistration.objects.exists())
+
+    def test_bulk_status(self):
+        make_travel_requests([self.employee], 300)
+        ids = list(TravelRegistration.objects.values_list('id', flat=True))
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(
+                '/users/travel-requests/bulk-status/', {"ids": ids + [0], "status": "Approved"}, format='json'
+            )
+        # The locking SELECT of existing ids and a single UPDATE
+        self.assertEqual(len(statements(queries)), 2)
+        self.assertEqual(response.data['updated'], 300)
+        self.assertEqual(response.data['results'][-1], {"id": 0, "status": "not_found"})
+        self.assertEqual(TravelRegistration.objects.filter(status='Approved').count(), 300)
+
+    def test_bulk_status_rejects_booleans(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch('/users/travel-requests/bulk-status/', {"ids": [True], "status": "Approved"}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_bulk_status_requires_admin(self):
+        self.client.force_authenticate(self.employee)
+        response = self.client.patch('/users/travel-requests/bulk-status/', {"ids": [1], "status": "Approved"}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class TravelRequestIndexTests(TestCase):
+    def test_indexes_exist(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, TravelRegistration._meta.db_table)
+        indexes = {name for name, info in constraints.items() if info['index']}
+        self.assertLessEqual({
+            'travel_req_user_created_idx', 'travel_req_created_idx', 'travel_req_status_created_idx',
+            'travel_req_modes_idx', 'travel_req_pending_idx',
+        }, indexes)
+
+    def test_explain_command_runs(self):
+        employee = User.objects.create_user(username="employee", password=None, email="employee@example.com")
+        make_travel_requests([employee], 20)
+        out = io.StringIO()
+        call_command('explain_travel_queries', '--verbose-plans', stdout=out)
+        for name in ('travel-requests list (admin)', 'travel-requests list (employee)', 'approval queue'):
+            self.assertIn(name, out.getvalue())
+
+
+class TravelStatsTests(TestCase):
+    """compute_travel_stats counts with one GROUP BY query per breakdown"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = User.objects.create_user(username="employee", password=None, email="employee@example.com")
+        make_travel_requests([cls.employee], 10)
+        TravelRegistration.objects.filter(project_name="Project 3").update(end_location="Chennai", status='Approved')
+
+    def test_group_by_counts(self):
+        with self.assertNumQueries(6):
+            stats = compute_travel_stats(recent_limit=3, top_n=3)
+        self.assertEqual(stats['total_requests'], 10)
+        # Choices without rows are reported as zero
+        self.assertEqual(stats['by_status'], {'Pending': 9, 'Approved': 1, 'Rejected': 0})
+        self.assertEqual(stats['by_travel_mode'], {'train': 4, 'flight': 6})
+        self.assertEqual(stats['by_booking_mode'], {'self': 5, 'travelDesk': 5})
+        # Ties are broken by name
+        self.assertEqual(stats['top_projects'], [
+            {'project': "Project 0", 'count': 2},
+            {'project': "Project 1", 'count': 2},
+            {'project': "Project 2", 'count': 2},
+        ])
+        self.assertEqual(stats['top_routes'], [
+            {'route': "Bangalore to Mumbai", 'count': 9},
+            {'route': "Bangalore to Chennai", 'count': 1},
+        ])
+        newest = TravelRegistration.objects.order_by('-created_at', '-id').values_list('id', flat=True)[:3]
+        self.assertEqual([row['id'] for row in stats['recent_requests']], list(newest))
+        self.assertEqual(stats['recent_requests'][0]['username'], "employee")
+
+
+class TravelStatsCacheTests(TestCase):
+    """The stats snapshot is patched on writes, but never from an outdated copy"""
+
+    def setUp(self):
+        cache.clear()
+        self.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+        make_travel_requests([self.employee], 5)
+
+    def test_write_patches_snapshot(self):
+        get_travel_stats()
+        travel_request = TravelRegistration.objects.first()
+        travel_request.status = 'Approved'
+        with self.captureOnCommitCallbacks(execute=True):
+            travel_request.save()
+        self.assertEqual(cache.get(CACHE_KEY_STATS)['by_status'], compute_travel_stats()['by_status'])
+
+    def test_outdated_snapshot_is_dropped(self):
+        stats = get_travel_stats()
+        # A copy of the snapshot from before another worker's change
+        cache.set(CACHE_KEY_STATS, {**stats, 'version': stats['version'] - 1})
+        with self.captureOnCommitCallbacks(execute=True):
+            TravelRegistration.objects.first().delete()
+        self.assertIsNone(cache.get(CACHE_KEY_STATS))
+        self.assertEqual(get_travel_stats()['total_requests'], compute_travel_stats()['total_requests'])
+
+    def test_snapshot_of_an_older_version_is_not_served(self):
+        stats = get_travel_stats()
+        # A rebuild that cached its result just after a write bumped the version
+        cache.set(CACHE_KEY_STATS, {**stats, 'total_requests': -1})
+        bump_stats_version()
+        self.assertEqual(get_travel_stats()['total_requests'], compute_travel_stats()['total_requests'])
+
+    @override_settings(TRAVEL_STATS_TOP_N=2)
+    def test_new_group_only_recomputes_the_top_list(self):
+        get_travel_stats()
+        travel_request = TravelRegistration.objects.first()
+        travel_request.pk = None
+        travel_request.project_name = "Project New"
+        with self.captureOnCommitCallbacks(execute=True):
+            travel_request.save()
+        snapshot = cache.get(CACHE_KEY_STATS)
+        self.assertIsNone(snapshot['top_projects'])
+        self.assertEqual(snapshot['total_requests'], 6)
+        # One GROUP BY for the top projects instead of a full rebuild
+        with self.assertNumQueries(1):
+            stats = get_travel_stats()
+        expected = compute_travel_stats()
+        self.assertEqual(stats['top_projects'], expected['top_projects'])
+        self.assertEqual(stats['top_routes'], expected['top_routes'])
+        self.assertEqual(cache.get(CACHE_KEY_STATS), stats)
+
+    def test_write_never_waits_for_the_lock(self):
+        get_travel_stats()
+        acquire_stats_lock(0)
+        with mock.patch('users.stats.time.sleep') as sleep, self.captureOnCommitCallbacks(execute=True):
+            TravelRegistration.objects.first().delete()
+        sleep.assert_not_called()
+        self.assertIsNone(cache.get(CACHE_KEY_STATS))
+
+    def test_callers_get_their_own_copy(self):
+        # The snapshot is served from L1; patching one caller's copy must not reach the others
+        stats = get_travel_stats()
+        expected = cache.get(CACHE_KEY_STATS)
+        self.assertIsNot(expected, stats)
+        cache.get(CACHE_KEY_STATS)['by_status'].clear()
+        stats['total_requests'] = -1
+        self.assertEqual(cache.get(CACHE_KEY_STATS), expected)
+
+
+class TieredCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tiered = TieredCache(None, {'OPTIONS': {'L2': 'shared', 'L1_TIMEOUT': 60}})
+
+    def test_touch_expires_the_l1_copy(self):
+        self.tiered.set('tiered-test', "value")
+        self.assertTrue(self.tiered.touch('tiered-test', 0))
+        self.assertIsNone(self.tiered.get('tiered-test'))
+
+    def test_touch_of_a_key_gone_from_l2_evicts_it(self):
+        self.tiered.set('tiered-test', "value")
+        # Deleted by another process
+        self.tiered.l2.delete('tiered-test')
+        self.assertFalse(self.tiered.touch('tiered-test', 30))
+        self.assertIsNone(self.tiered.get('tiered-test'))
+
+    def test_l1_copy_does_not_outlive_the_timeout(self):
+        self.tiered.set('tiered-test', "value", 0)
+        self.assertIsNone(self.tiered.get('tiered-test'))
+        self.tiered.set('tiered-test', "value", 30)
+        self.assertLessEqual(self.tiered._l1[self.tiered.make_key('tiered-test')][1], time.monotonic() + 30)
+
+
+class DatabaseSettingsTests(TestCase):
+    """DATABASE_URL may only be left out in development"""
+
+    def load_settings(self, **environ):
+        environ = {'SECRET_KEY': "x", 'GOOGLE_API_KEY': "x", **environ}
+        with mock.patch.dict(os.environ, environ, clear=True), mock.patch('dotenv.load_dotenv'):
+            return runpy.run_path(find_spec('main.settings').origin)
+
+    def test_missing_url_is_an_error_without_debug(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "DATABASE_URL must be set when DEBUG is off"):
+            self.load_settings(DEBUG='False')
+
+    def test_debug_falls_back_to_sqlite(self):
+        databases = self.load_settings(DEBUG='True')['DATABASES']
+        self.assertEqual(databases['default']['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertTrue(str(databases['default']['NAME']).endswith('db.sqlite3'))
+
+    def test_url_is_used_without_debug(self):
+        databases = self.load_settings(DEBUG='False', DATABASE_URL="postgres://app:secret@db:5432/travel")['DATABASES']
+        self.assertEqual(
+            (databases['default']['ENGINE'], databases['default']['HOST'], databases['default']['NAME']),
+            ('django.db.backends.postgresql', 'db', 'travel'),
+        )
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        admin = User.objects.create_user(
+            username="admin", password=None, email="admin@example.com", is_staff=True
+        )
+        self.client.force_authenticate(admin)
+        self.headers = {'Authorization': f"Bearer {TokenClaimsObtainPairSerializer.get_token(admin).access_token}"}
+
+    def test_server_timing_header(self):
+        response = self.client.get('/users/travel-requests/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        # The list's ETag lookup and the page
+        self.assertIn('desc="2 queries"', response['Server-Timing'])
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_endpoint(self):
+        self.client.get('/users/travel-requests/')
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_request_duration_seconds_count{view="travel-request-list",method="GET"}',
+            response.content.decode(),
+        )
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_closed_without_a_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    async def test_async_requests_count_queries_on_existing_connections(self):
+        # As if the connection had been opened before main.metrics was imported
+        await sync_to_async(lambda: connection.execute_wrappers.remove(record_query))()
+        response = await self.async_client.get('/users/travel-requests/', headers=self.headers)
+        # The token's user, the ETag lookup and the page
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+
+
+class SeedTravelTests(TestCase):
+    def seed(self, **options):
+        call_command('seed_travel', users=5, requests=300, batch_size=100, days=30, stdout=io.StringIO(), **options)
+        return list(TravelRegistration.objects.order_by('id').values_list(
+            'project_name', 'status', 'start_date', 'created_at', 'user__email'
+        ))
+
+    def test_seeds_rows_in_creation_order(self):
+        rows = self.seed(start_date=date(2024, 1, 1))
+        self.assertEqual(len(rows), 300)
+        self.assertEqual(User.objects.filter(email__endswith='@seed.invalid').count(), 5)
+        created = [row[3] for row in rows]
+        self.assertEqual(created, sorted(created))
+        self.assertTrue(all(date(2024, 1, 1) <= stamp.date() < date(2024, 1, 31) for stamp in created))
+        self.assertTrue(all(row[2] > row[3].date() for row in rows))
+
+    def test_same_seed_same_data(self):
+        first = self.seed(start_date=date(2024, 1, 1), seed=7, method='orm')
+        second = self.seed(start_date=date(2024, 1, 1), seed=7, reset=True)
+        self.assertEqual(first, second)
+
+    def test_data_does_not_depend_on_the_day_it_runs(self):
+        first = self.seed()
+        self.assertEqual(first[0][3].date(), date(2024, 1, 1))
+        later = timezone.now() + timedelta(days=400)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            second = self.seed(reset=True)
+        self.assertEqual(first, second)
+
+    def test_users_left_from_an_earlier_run_are_reused(self):
+        self.seed(seed=7)
+        User.objects.get(username="seed-user-7-1").delete()
+        # Counting the remaining users used to restart the names at an index still taken
+        self.seed(seed=7)
+        self.assertEqual(
+            sorted(User.objects.filter(email__endswith='@seed.invalid').values_list('username', flat=True)),
+            [f"seed-user-7-{i}" for i in range(5)],
+        )
+
+
+class TravelRequestExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        cls.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+        make_travel_requests([cls.employee], 25)
+        TravelRegistration.objects.filter(project_name="Project 1").update(status='Approved')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, query=''):
+        response = self.client.get(f'/users/travel-requests/export/{query}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        lines = self.export().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'username', 'project_name'])
+        self.assertEqual(len(lines), 26)
+
+    def test_ndjson_with_filters(self):
+        rows = [json.loads(line) for line in self.export('?output=ndjson&status=Approved').splitlines()]
+        self.assertEqual(len(rows), TravelRegistration.objects.filter(status='Approved').count())
+        self.assertTrue(all(row['project_name'] == "Project 1" and row['username'] == "employee" for row in rows))
+
+    def test_created_range(self):
+        today = timezone.localdate()
+        self.assertEqual(len(self.export(f'?created_after={today}&created_before={today}').splitlines()), 26)
+        self.assertEqual(len(self.export(f'?created_after={today + timedelta(days=1)}').splitlines()), 1)
+        response = self.client.get('/users/travel-requests/export/?created_after=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.employee)
+        self.assertEqual(self.client.get('/users/travel-requests/export/').status_code, 403)
+
+    @override_settings(TRAVEL_EXPORT_CHUNK_SIZE=10)
+    async def test_asgi_export_streams_asynchronously(self):
+        token = TokenClaimsObtainPairSerializer.get_token(self.admin).access_token
+        response = await self.async_client.get(
+            '/users/travel-requests/export/?output=ndjson', headers={'Authorization': f"Bearer {token}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        # Under ASGI a sync iterator would be read into a list before the first byte goes out
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual([chunk.count(b'\n') for chunk in chunks], [10, 10, 5])
+        self.assertEqual(
+            [json.loads(line)['id'] for line in b''.join(chunks).splitlines()],
+            [row async for row in TravelRegistration.objects.order_by('created_at', 'id').values_list('id', flat=True)],
+        )
+
+
+class TravelRequestConditionalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        cls.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+        cls.other = User.objects.create_user(username="other", password="secret", email="other@example.com")
+        make_travel_requests([cls.employee, cls.other], 6)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_not_modified_until_a_write(self):
+        first = self.client.get('/users/travel-requests/')
+        self.assertEqual(first['Cache-Control'], 'private, no-cache')
+        with self.assertNumQueries(0):
+            response = self.client.get('/users/travel-requests/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+        travel_request = TravelRegistration.objects.filter(user=self.employee).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/users/travel-requests/{travel_request.id}/', {"status": "Approved"}, format='json')
+        response = self.client.get('/users/travel-requests/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(
+            next(row['status'] for row in response.data['results'] if row['id'] == travel_request.id), "Approved"
+        )
+
+    def test_delete_retires_cached_pages(self):
+        self.client.get('/users/travel-requests/')
+        with self.captureOnCommitCallbacks(execute=True):
+            TravelRegistration.objects.filter(user=self.other).first().delete()
+        self.assertEqual(len(self.client.get('/users/travel-requests/').data['results']), 5)
+
+    def test_writes_only_touch_the_owner_and_admins(self):
+        self.client.force_authenticate(self.other)
+        other_etag = self.client.get('/users/travel-requests/')['ETag']
+        self.client.force_authenticate(self.employee)
+        employee_etag = self.client.get('/users/travel-requests/')['ETag']
+        self.assertNotEqual(other_etag, employee_etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TravelRegistration.objects.filter(user=self.employee).update(status='Rejected')
+            TravelRegistration.objects.filter(user=self.employee).first().save()
+        response = self.client.get('/users/travel-requests/', HTTP_IF_NONE_MATCH=employee_etag)
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(self.other)
+        response = self.client.get('/users/travel-requests/', HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unsettled_replica_reads_get_no_validators(self):
+        changed = timezone.now()
+        response = set_validators(HttpResponse(), "digest", changed, 'replica')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        settled = changed - timedelta(seconds=REPLICA_SETTLE_SECONDS)
+        self.assertEqual(set_validators(HttpResponse(), "digest", settled, 'replica')['ETag'], '"digest"')
+
+    def test_retrieve_if_modified_since(self):
+        travel_request = TravelRegistration.objects.first()
+        response = self.client.get(f'/users/travel-requests/{travel_request.id}/')
+        response = self.client.get(
+            f'/users/travel-requests/{travel_request.id}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class TravelRequestFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        cls.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+        make_travel_requests([cls.employee], 12)
+        TravelRegistration.objects.filter(project_name="Project 1").update(status='Approved')
+        TravelRegistration.objects.filter(project_name="Project 2").update(
+            travel_purpose="Vendor audit", end_location="Chennai", start_date=date.today() + timedelta(days=5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def list(self, query):
+        response = self.client.get(f'/users/travel-requests/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_choice_and_project_filters(self):
+        self.assertEqual(
+            {row['status'] for row in self.list('?status=Approved')}, {'Approved'}
+        )
+        self.assertEqual(len(self.list('?status=Approved,Pending')), 12)
+        rows = self.list('?travel_mode=train&booking_mode=travelDesk')
+        self.assertEqual(len(rows), TravelRegistration.objects.filter(travel_mode='train', booking_mode='travelDesk').count())
+        self.assertEqual({row['project_name'] for row in self.list('?project_name=Project%203')}, {"Project 3"})
+        response = self.client.get('/users/travel-requests/?status=Lost')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status must be one of', str(response.data['error']))
+
+    def test_date_ranges(self):
+        soon = date.today() + timedelta(days=5)
+        self.assertEqual({row['project_name'] for row in self.list(f'?start_date_before={soon}')}, {"Project 2"})
+        self.assertEqual(len(self.list(f'?start_date_after={soon + timedelta(days=1)}')), 10)
+        today = timezone.localdate()
+        self.assertEqual(len(self.list(f'?created_after={today}&created_before={today}')), 12)
+        self.assertEqual(self.client.get('/users/travel-requests/?start_date_after=soon').status_code, 400)
+
+    def test_search(self):
+        self.assertEqual({row['project_name'] for row in self.list('?search=audit')}, {"Project 2"})
+        # Partial words match too
+        self.assertEqual({row['end_location'] for row in self.list('?search=chenn')}, {"Chennai"})
+        self.assertEqual(len(self.list('?search=bangalore')), 12)
+        self.assertEqual(self.list('?search=Lisbon'), [])
+
+    def test_ordering_by_start_date_pages_through_everything(self):
+        seen = []
+        url = '/users/travel-requests/?ordering=start_date&page_size=5'
+        while url:
+            response = self.client.get(url)
+            seen.extend(response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len({row['id'] for row in seen}), 12)
+        self.assertEqual([row['start_date'] for row in seen], sorted(row['start_date'] for row in seen))
+        self.assertEqual(seen[0]['project_name'], "Project 2")
+
+    def test_employee_filters_stay_within_own_requests(self):
+        other = User.objects.create_user(username="other", password="secret", email="other@example.com")
+        make_travel_requests([other], 3)
+        self.client.force_authenticate(other)
+        self.assertEqual(len(self.list('?search=workshop')), 3)
+
+    def test_filtered_list_is_a_single_query(self):
+        self.list('')  # warms the ETag validator
+        with CaptureQueriesContext(connection) as queries:
+            self.list('?status=Pending&travel_mode=flight&search=mumbai&ordering=-start_date')
+        self.assertEqual(len(statements(queries)), 1)
+
+    def test_export_accepts_the_same_filters(self):
+        response = self.client.get('/users/travel-requests/export/?search=audit')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines) - 1, TravelRegistration.objects.filter(project_name="Project 2").count())
+
+
+class TravelRequestCursorTests(TestCase):
+    """Rows sharing a created_at must page by id, not by an offset into the tie"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        make_travel_requests([cls.admin], 7)
+        cls.created_at = timezone.now()
+        TravelRegistration.objects.update(created_at=cls.created_at)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_ties_page_by_id(self):
+        seen = []
+        url = '/users/travel-requests/?page_size=3'
+        while url:
+            data = self.page(url)
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(seen, sorted(TravelRegistration.objects.values_list('id', flat=True), reverse=True))
+
+    def test_new_row_in_the_tie_does_not_shift_the_next_page(self):
+        first = self.page('/users/travel-requests/?page_size=3')
+        newer = TravelRegistration.objects.create(
+            user=self.admin, project_name="Project 9", travel_purpose="Late addition",
+            start_date=date.today() + timedelta(days=30), travel_mode='flight', booking_mode='self',
+            start_location="Bangalore", end_location="Mumbai",
+        )
+        TravelRegistration.objects.filter(pk=newer.pk).update(created_at=self.created_at)
+        second = self.page(first['next'])
+        first_ids = [row['id'] for row in first['results']]
+        older = TravelRegistration.objects.exclude(pk=newer.pk).order_by('-id').values_list('id', flat=True)
+        self.assertEqual([row['id'] for row in second['results']], list(older[3:6]))
+
+        previous = self.page(second['previous'])
+        self.assertEqual([row['id'] for row in previous['results']], first_ids)
+
+    def test_malformed_cursor_is_not_found(self):
+        for position in ("soon|1", str(self.created_at)):
+            cursor = base64.b64encode(f"p={position}".encode()).decode()
+            response = self.client.get('/users/travel-requests/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class TravelDailyRollupTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        self.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+        self.client = APIClient()
+
+    def rollup(self):
+        return set(TravelDailyRollup.objects.filter(count__gt=0).values_list(
+            'day', 'status', 'travel_mode', 'booking_mode', 'project_name', 'count'
+        ))
+
+    def test_incremental_updates_match_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_travel_requests([self.employee], 6)
+        rebuild_rollup()
+        requests = list(TravelRegistration.objects.order_by('id'))
+        with self.captureOnCommitCallbacks(execute=True):
+            requests[0].status = 'Approved'
+            requests[0].save()
+            requests[1].project_name = "Project 9"
+            requests[1].save()
+            requests[2].delete()
+            TravelRegistration.objects.create(
+                user=self.employee, project_name="Project 9", travel_purpose="Audit",
+                start_date=date.today() + timedelta(days=5), travel_mode='train', booking_mode='self',
+                start_location="Pune", end_location="Goa",
+            )
+        self.client.force_authenticate(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                '/users/travel-requests/bulk-status/', {"ids": [requests[3].id, requests[4].id], "status": "Rejected"},
+                format='json',
+            )
+            self.client.post('/users/travel-requests/bulk/', [{
+                "project_name": "Project 1", "travel_purpose": "Kickoff",
+                "start_date": str(date.today() + timedelta(days=10)), "travel_mode": "train",
+                "booking_mode": "self", "start_location": "Chennai", "end_location": "Pune",
+            }], format='json')
+        incremental = self.rollup()
+        rebuild_rollup()
+        self.assertEqual(incremental, self.rollup())
+
+    def test_series_endpoint(self):
+        make_travel_requests([self.employee], 10)
+        rebuild_rollup()
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/users/travel-stats/series/?interval=month&group_by=travel_mode')
+        self.assertEqual(response.status_code, 200)
+        counts = {point['travel_mode']: point['count'] for point in response.data['series']}
+        self.assertEqual(counts, {'flight': 6, 'train': 4})
+
+        response = self.client.get('/users/travel-stats/series/?project_name=Project 1')
+        self.assertEqual(sum(point['count'] for point in response.data['series']), 2)
+        self.assertEqual(self.client.get('/users/travel-stats/series/?interval=hour').status_code, 400)
+        self.client.force_authenticate(self.employee)
+        self.assertEqual(self.client.get('/users/travel-stats/series/').status_code, 403)
+
+    def test_chat_tool(self):
+        make_travel_requests([self.employee], 10)
+        rebuild_rollup()
+        result = run_tool('count_requests_over_time', {'interval': 'year', 'status': 'Pending'})
+        self.assertEqual([point['count'] for point in result['points']], [10])
+        self.assertIn('error', run_tool('count_requests_over_time', {'group_by': 'username'}))
+
+
+class TravelRequestEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username="admin", password="secret", email="admin@example.com", is_staff=True
+        )
+        cls.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+        make_travel_requests([cls.employee], 1)
+        cls.travel_request = TravelRegistration.objects.get()
+        cls.token = str(TokenClaimsObtainPairSerializer.get_token(cls.employee).access_token)
+
+    async def connect(self, query_string):
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        await inbox.put({'type': 'websocket.connect'})
+        scope = {'type': 'websocket', 'path': WEBSOCKET_PATH, 'query_string': query_string, 'headers': []}
+        task = asyncio.create_task(travel_request_websocket(scope, inbox.get, outbox.put))
+        return inbox, outbox, task
+
+    async def test_websocket_pushes_own_status_changes(self):
+        with mock.patch('users.events.close_old_connections'):
+            inbox, outbox, task = await self.connect(f'token={self.token}'.encode())
+            self.assertEqual((await outbox.get())['type'], 'websocket.accept')
+            self.assertEqual(json.loads((await outbox.get())['text']), {'type': 'ready'})
+
+            publish_status_change(self.employee.id + 1, 99, 'Approved', 'Pending')
+            publish_status_change(self.employee.id, self.travel_request.id, 'Rejected', 'Pending')
+            event = json.loads((await asyncio.wait_for(outbox.get(), 5))['text'])
+            self.assertEqual(
+                (event['type'], event['id'], event['status']), ('status_changed', self.travel_request.id, 'Rejected')
+            )
+
+            await inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+            await asyncio.wait_for(task, 5)
+
+    async def test_websocket_rejects_bad_tokens(self):
+        with mock.patch('users.events.close_old_connections'):
+            _, outbox, task = await self.connect(b'token=not-a-jwt')
+            await asyncio.wait_for(task, 5)
+        self.assertEqual(await outbox.get(), {'type': 'websocket.close', 'code': 4401})
+
+    async def test_server_sent_events(self):
+        response = await self.async_client.get(f'/users/events/?token={self.token}')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'event: ready\ndata: {}\n\n')
+        publish_status_change(self.employee.id, self.travel_request.id, 'Approved', 'Pending')
+        chunk = await asyncio.wait_for(anext(events), 5)
+        self.assertTrue(chunk.startswith(b'event: status_changed\n'))
+        await events.aclose()
+        self.assertEqual((await self.async_client.get('/users/events/')).status_code, 401)
+
+    async def test_slow_subscribers_are_told_to_resync(self):
+        broker = MemoryBroker(queue_size=2)
+        async with broker.subscribe(['updates']) as subscription:
+            for i in range(3):
+                broker.publish('updates', {'type': 'tick', 'i': i})
+            await asyncio.sleep(0)
+            self.assertEqual(await subscription.get(timeout=1), RESYNC_EVENT)
+            self.assertIsNone(await subscription.get(timeout=0.01))
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    def test_writes_publish_after_commit(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with mock.patch('users.events.publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                client.patch(f'/users/travel-requests/{self.travel_request.id}/', {"status": "Approved"}, format='json')
+            channels = [call.args[0] for call in publish.call_args_list]
+            self.assertEqual(channels, [user_channel(self.employee.id), ADMIN_CHANNEL])
+            self.assertEqual(publish.call_args.args[1]['previous_status'], 'Pending')
+
+            publish.reset_mock()
+            client.force_authenticate(self.employee)
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post('/users/travel-requests/', {
+                    "project_name": "Project X", "travel_purpose": "Kickoff",
+                    "start_date": str(date.today() + timedelta(days=10)), "travel_mode": "train",
+                    "booking_mode": "self", "start_location": "Chennai", "end_location": "Pune",
+                }, format='json')
+            publish.assert_called_once()
+            channel, event = publish.call_args.args
+            self.assertEqual((channel, event['type'], event['request']['username']), (ADMIN_CHANNEL, 'request_created', "employee"))
+
+
+class TravelRegistrationRowSerializerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = User.objects.create_user(username="employee", password="secret", email="employee@example.com")
+        make_travel_requests([cls.employee], 5)
+
+    def assertSameOutput(self, fields):
+        queryset = TravelRegistration.objects.order_by('id')
+        expected = TravelRegistrationSerializer(
+            queryset.select_related('user'), many=True, context={'fields': fields}
+        ).data
+        row_serializer = TravelRegistrationRowSerializer(fields)
+        actual = row_serializer.many(row_serializer.values(queryset))
+        # Same keys in the same order, same values
+        self.assertEqual([list(item.items()) for item in expected], [list(item.items()) for item in actual])
+
+    def test_matches_model_serializer(self):
+        self.assertSameOutput(None)
+
+    def test_sparse_fields(self):
+        self.assertSameOutput(['id', 'username', 'created_at'])
+
+    def test_list_endpoint_uses_rows(self):
+        cache.clear()
+        client = APIClient()
+        client.force_authenticate(self.employee)
+        with mock.patch.object(TravelRegistrationSerializer, 'to_representation') as to_representation:
+            response = client.get('/users/travel-requests/?fields=id,start_date')
+        to_representation.assert_not_called()
+        self.assertEqual(list(response.data['results'][0]), ['id', 'start_date'])
+
+    @skipIf(orjson is None, "orjson is not installed")
+    def test_orjson_renderer_matches_json_renderer(self):
+        row_serializer = TravelRegistrationRowSerializer()
+        data = {'next': None, 'results': row_serializer.many(row_serializer.values(TravelRegistration.objects.all()))}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), json.loads(JSONRenderer().render(data)))
+
+
+@override_settings(ROOT_URLCONF='main.async_urls', CHAT_LLM_BACKEND='fake')
+class AsyncTravelRequestViewTests(TransactionTestCase):
+    """
+    Transactions are committed, as in production: the async ORM runs on another thread than
+    the test body, so TestCase's captureOnCommitCallbacks wouldn't see the writes' hooks
+    """
+
+    def setUp(self):
+        cache.clear()
+        # No passwords: hashing them per test would dominate the run time
+        self.admin = User.objects.create_user(
+            username="admin", email="admin@example.com", password=None, is_staff=True
+        )
+        self.employee = User.objects.create_user(username="employee", email="employee@example.com", password=None)
+        self.other = User.objects.create_user(username="other", email="other@example.com", password=None)
+        make_travel_requests([self.employee, self.other], 5)
+
+    def auth(self, user):
+        return {'Authorization': f"Bearer {TokenClaimsObtainPairSerializer.get_token(user).access_token}"}
+
+    async def test_list_pages_match_the_serializer(self):
+        queryset = TravelRegistration.objects.select_related('user').order_by('-created_at', '-id')
+        expected = await sync_to_async(lambda: TravelRegistrationSerializer(queryset, many=True).data)()
+
+        results = []
+        url = '/users/travel-requests/?page_size=2'
+        while url:
+            response = await self.async_client.get(url, headers=self.auth(self.admin))
+            self.assertEqual(response.status_code, 200)
+            results.extend(response.json()['results'])
+            url = response.json()['next']
+        self.assertEqual(results, expected)
+
+        first = await self.async_client.get('/users/travel-requests/', headers=self.auth(self.admin))
+        response = await self.async_client.get(
+            '/users/travel-requests/', headers={**self.auth(self.admin), 'If-None-Match': first['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    async def test_employees_see_and_create_their_own(self):
+        response = await self.async_client.get('/users/travel-requests/', headers=self.auth(self.employee))
+        self.assertEqual({row['username'] for row in response.json()['results']}, {"employee"})
+
+        response = await self.async_client.post('/users/travel-requests/', {
+            "project_name": "Project X", "travel_purpose": "Kickoff",
+            "start_date": str(date.today() + timedelta(days=10)), "travel_mode": "train",
+            "booking_mode": "self", "start_location": "Chennai", "end_location": "Pune",
+        }, content_type='application/json', headers=self.auth(self.employee))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()['username'], response.json()['status']), ("employee", "Pending"))
+        response = await self.async_client.get('/users/travel-requests/', headers=self.auth(self.employee))
+        self.assertEqual(len(response.json()['results']), 4)
+
+        response = await self.async_client.post(
+            '/users/travel-requests/', {"project_name": "Project X"},
+            content_type='application/json', headers=self.auth(self.employee),
+        )
+        self.assertIn('start_date', response.json())
+
+    async def test_update_and_delete(self):
+        travel_request = await TravelRegistration.objects.filter(user=self.other).afirst()
+        url = f'/users/travel-requests/{travel_request.id}/'
+        response = await self.async_client.patch(
+            url, {"status": "Approved"}, content_type='application/json', headers=self.auth(self.other)
+        )
+        self.assertEqual(response.status_code, 403)
+
+        await sync_to_async(get_travel_stats)()
+        response = await self.async_client.patch(
+            url, {"status": "Approved"}, content_type='application/json', headers=self.auth(self.admin)
+        )
+        self.assertEqual(response.json()['status'], "Approved")
+        # The cached stats were patched by the save signal
+        self.assertEqual((await sync_to_async(get_travel_stats)())['by_status']['Approved'], 1)
+
+        response = await self.async_client.get(url, headers=self.auth(self.employee))
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.delete(url, headers=self.auth(self.other))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(await TravelRegistration.objects.filter(id=travel_request.id).aexists())
+
+    async def test_errors(self):
+        self.assertEqual((await self.async_client.get('/users/travel-requests/')).status_code, 401)
+        response = await self.async_client.get('/users/travel-requests/?status=Lost', headers=self.auth(self.admin))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+    def test_async_urls_route_to_the_async_views(self):
+        for path, view in (
+            ('/users/travel-requests/', 'users.async_views.travel_requests'),
+            ('/users/travel-requests/1/', 'users.async_views.travel_request_detail'),
+            ('/users/chat/', 'users.async_views.chat'),
+            ('/authenticate/login/', 'authentication.async_views.login'),
+        ):
+            func = resolve(path).func
+            self.assertEqual(f"{func.__module__}.{func.__name__}", view)
+            self.assertTrue(iscoroutinefunction(func), path)
+        self.assertTrue(iscoroutinefunction(resolve('/users/chat/stream/').func))
+        # Routes without an async twin fall through to the sync ones
+        self.assertEqual(resolve('/users/travel-requests/export/').func.cls, TravelRequestViewSet)
+
+    async def test_chat_stream(self):
+        async def chunks():
+            for text in ("Two ", "pending"):
+                yield mock.Mock(text=text)
+
+        gemini = mock.Mock()
+        gemini.aio.models.generate_content_stream = mock.AsyncMock(return_value=chunks())
+        message = {"message": "How many pending right now?"}
+        with mock.patch('users.views.client', gemini):
+            response = await self.async_client.post(
+                '/users/chat/stream/', message, content_type='application/json', headers=self.auth(self.admin),
+            )
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(body.split("\n\n")[:3], [
+            'data: {"text": "Two "}', 'data: {"text": "pending"}', 'event: done\ndata: {}',
+        ])
+
+        # The same question is replayed from the response cache
+        response = await self.async_client.post(
+            '/users/chat/stream/', message, content_type='application/json', headers=self.auth(self.admin),
+        )
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(body.startswith('data: {"text": "Two pending"}'))
+        self.assertEqual(gemini.aio.models.generate_content_stream.await_count, 1)
+
+        response = await self.async_client.post(
+            '/users/chat/stream/', message, content_type='application/json', headers=self.auth(self.employee),
+        )
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.post(
+            '/users/chat/stream/', {}, content_type='application/json', headers=self.auth(self.admin),
+        )
+        self.assertEqual(response.status_code, 400)
+
+    async def test_chat(self):
+        response = await self.async_client.post(
+            '/users/chat/', {"message": "How many pending?"},
+            content_type='application/json', headers=self.auth(self.admin),
+        )
+        self.assertTrue(response.json()['response'].startswith("Fake answer"))
+        response = await self.async_client.post(
+            '/users/chat/', {"message": "How many pending?"},
+            content_type='application/json', headers=self.auth(self.employee),
+        )
+        self.assertEqual(response.status_code, 403)
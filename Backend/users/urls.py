@@ -1,11 +1,19 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TravelRequestViewSet, chat
+from .views import (
+    TravelRequestViewSet, chat, chat_job_create, chat_job_detail, chat_stream, travel_request_events,
+    travel_stats_series,
+)
 
 router = DefaultRouter()
 router.register(r'travel-requests', TravelRequestViewSet, basename='travel-request')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('events/', travel_request_events, name='travel-request-events'),
+    path('travel-stats/series/', travel_stats_series, name='travel-stats-series'),
     path('chat/', chat, name='chat'),
+    path('chat/stream/', chat_stream, name='chat-stream'),
+    path('chat/jobs/', chat_job_create, name='chat-job-create'),
+    path('chat/<uuid:job_id>/', chat_job_detail, name='chat-job-detail'),
 ]
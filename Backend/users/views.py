@@ -1,77 +1,45 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from .models import TravelRegistration
-from .serializers import TravelRegistrationSerializer
-from django.db.models import Count
+from rest_framework.exceptions import AuthenticationFailed
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.csrf import csrf_exempt
+from authentication.authentication import aauthenticate, as_user_instance
+from main.db import read_from_replica
+from main.metrics import timed_call
+from .models import ChatJob, TravelRegistration
+from .serializers import ChatJobSerializer, TravelRegistrationRowSerializer, TravelRegistrationSerializer
+from .jobs import enqueue_chat_job
+from .pagination import TravelRequestCursorPagination
+from .chat_cache import chat_response_cache
+from .events import authenticate_token, publish_new_request, publish_status_change, stream_sse
+from .export import EXPORT_FORMATS, astream_export, stream_export
+from .filters import TravelFilterError, TravelRequestFilter, TravelRequestOrdering, filter_travel_requests
+from .list_cache import (
+    cache_page, get_cached_page, last_changed, mark_changed, not_modified_response, set_validators, validator_digest,
+)
+from .llm import CHAT_MODE_ERROR, GEMINI_MODEL, answer_chat, build_chat_context, client, is_valid_chat_mode
+from .rollup import (
+    ROLLUP_DIMENSIONS, RollupQueryError, apply_rollup_deltas, created_deltas, rollup_series, status_change_deltas,
+)
+from .stats import get_travel_stats, invalidate_travel_stats, stats_row
+import asyncio
+import json
 import logging
-from google import genai
-from django.core.cache import cache
 import time
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-client = genai.Client(api_key=GOOGLE_API_KEY)
-
-# Cache settings
-CACHE_KEY_STATS = "travel_request_stats"
-CACHE_TIMEOUT = 300
-
-
-def get_travel_stats():
-    """Get travel request statistics from cache or database"""
-    # Try to get stats from cache
-    stats = cache.get(CACHE_KEY_STATS)
-    if stats is not None:
-        return stats
-
-    # If not in cache, query database
-    travel_requests = TravelRegistration.objects.select_related('user')\
-        .values(
-            'status', 
-            'travel_mode', 
-            'user__username',
-            'project_name',
-            'travel_purpose',
-            'start_date',
-            'start_location',
-            'end_location',
-            'created_at'
-        )\
-        .annotate(count=Count('id'))\
-        .order_by('-created_at') # Get last 10 requests for recent activity
-    
-    # Format recent requests
-    recent_requests = [
-        {
-            'username': req['user__username'],
-            'project': req['project_name'],
-            'purpose':req['travel_purpose'],
-            'status': req['status'],
-            'travel_mode': req['travel_mode'],
-            'route': f"{req['start_location']} to {req['end_location']}",
-            'date': req['start_date'].strftime('%Y-%m-%d'),
-            'created': req['created_at'].strftime('%Y-%m-%d %H:%M')
-        }
-        for req in travel_requests
-    ]
-
-    # Create stats dictionary with detailed information
-    stats = {
-        'recent_requests': recent_requests,
-    }
-
-    # Store in cache
-    cache.set(CACHE_KEY_STATS, stats, CACHE_TIMEOUT)
-    return stats
+# Largest batch accepted by the bulk endpoints
+BULK_MAX_ITEMS = 500
 
 
 @api_view(["POST"])
@@ -84,29 +52,14 @@ def chat(request):
             return Response(
                 {"error": "Message is required"}, status=status.HTTP_400_BAD_REQUEST
             )
-
-        # Get cached stats
-        stats = get_travel_stats()
-        print(stats)
-
-        # Create context for AI
-        context = f"""You are a travel request assistant. Here's the current data:
-
-        Total Requests: {stats['recent_requests']}
-
-        Recent Requests:
-        {'\n'.join(f"- {req['username']}'s request for {req['project']} ({req['status']}) Purpose :{req['purpose']} - {req['route']} on {req['date']} by {req['travel_mode']}" for req in stats['recent_requests'])}
-
-        User Question: {message}
-
-        Provide a professional and concise response based on this data. Include relevant statistics and percentages where appropriate."""
+        mode = request.data.get("mode")
+        if not is_valid_chat_mode(mode):
+            return Response({"error": CHAT_MODE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
 
         # Generate response using Gemini
         try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash", contents=context
-            )
-            return Response({"response": response.text})
+            answer = answer_chat(message, mode)
+            return Response({"response": answer})
         except Exception as e:
             logger.error(f"Error generating response with Gemini: {str(e)}")
             return Response(
@@ -122,26 +75,360 @@ def chat(request):
         )
 
 
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def travel_stats_series(request):
+    """Request counts over time from the daily rollup (?interval=, ?group_by=, ?since=, ?until=, dimension filters)"""
+    params = request.query_params
+    days = {}
+    for name in ("since", "until"):
+        try:
+            days[name] = parse_date(params[name]) if params.get(name) else None
+        except ValueError:
+            days[name] = None
+        if params.get(name) and days[name] is None:
+            return Response({"error": f"{name} must be a YYYY-MM-DD date"}, status=400)
+
+    interval = params.get("interval", "day")
+    group_by = params.get("group_by") or None
+    try:
+        series = rollup_series(
+            interval, group_by, **days, **{field: params.get(field) for field in ROLLUP_DIMENSIONS}
+        )
+    except RollupQueryError as e:
+        return Response({"error": str(e)}, status=400)
+    return Response({"interval": interval, "group_by": group_by, "series": series})
+
+
+@api_view(["POST"])
+@permission_classes([permissions.IsAdminUser])
+def chat_job_create(request):
+    """Queue a chat question for the worker pool and return the job id to poll"""
+    message = request.data.get("message")
+    if not message:
+        return Response(
+            {"error": "Message is required"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    mode = request.data.get("mode")
+    if not is_valid_chat_mode(mode):
+        return Response({"error": CHAT_MODE_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+    job = enqueue_chat_job(request.user.id, message, mode)
+    return Response(ChatJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(["GET"])
+@permission_classes([permissions.IsAdminUser])
+def chat_job_detail(request, job_id):
+    job = get_object_or_404(ChatJob, id=job_id, user_id=request.user.id)
+    return Response(ChatJobSerializer(job).data)
+
+
+def sse_event(data, event=None):
+    """Encode one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def get_authenticated_user(request):
+    """Authenticate the JWT in the Authorization header, returning the user or None"""
+    try:
+        return await aauthenticate(request)
+    except AuthenticationFailed:
+        return None
+
+
+async def get_admin_user(request):
+    """Like get_authenticated_user, but only for admins"""
+    user = await get_authenticated_user(request)
+    return user if user is not None and user.is_staff else None
+
+
+async def stream_chat_response(context, on_complete=None):
+    """Relay Gemini's streamed chunks as SSE events, giving up after CHAT_STREAM_TIMEOUT seconds"""
+    stream = None
+    chunks = []
+    try:
+        # The stream outlives the request's middleware, so only the process-wide histogram sees it
+        with timed_call('gemini'):
+            async with asyncio.timeout(settings.CHAT_STREAM_TIMEOUT):
+                stream = await client.aio.models.generate_content_stream(
+                    model=GEMINI_MODEL, contents=context
+                )
+                async for chunk in stream:
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        yield sse_event({"text": chunk.text})
+        if on_complete is not None:
+            on_complete("".join(chunks))
+        yield sse_event({}, event="done")
+    except TimeoutError:
+        logger.warning("Gemini stream timed out")
+        yield sse_event({"error": "Response timed out"}, event="error")
+    except asyncio.CancelledError:
+        # The client went away, stop pulling tokens from Gemini
+        logger.info("Chat stream cancelled by client disconnect")
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming response from Gemini: {str(e)}")
+        yield sse_event({"error": "Failed to generate response"}, event="error")
+    finally:
+        if stream is not None and hasattr(stream, "aclose"):
+            await stream.aclose()
+
+
+async def replay_cached_response(text):
+    yield sse_event({"text": text})
+    yield sse_event({}, event="done")
+
+
+@csrf_exempt
+async def chat_stream(request):
+    """Async variant of chat that streams the answer back as Server-Sent Events"""
+    if request.method != "POST":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    if await get_admin_user(request) is None:
+        return JsonResponse({"error": "Admin authentication required"}, status=403)
+
+    try:
+        message = json.loads(request.body or b"{}").get("message")
+    except (ValueError, AttributeError):
+        message = None
+    if not message:
+        return JsonResponse({"error": "Message is required"}, status=400)
+
+    stats = await sync_to_async(get_travel_stats)()
+    # The stream always answers in prompt mode
+    cached = chat_response_cache.get(message, stats, "prompt")
+    if cached is not None:
+        events = replay_cached_response(cached)
+    else:
+        context = build_chat_context(stats, message)
+        events = stream_chat_response(
+            context, on_complete=lambda text: chat_response_cache.set(message, stats, text, "prompt")
+        )
+
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def travel_request_events(request):
+    """Server-Sent Events feed of travel-request changes (the WebSocket alternative, see users.events)"""
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    # EventSource can't set headers, so the token may come as ?token=
+    user = await get_authenticated_user(request)
+    if user is None and request.GET.get("token"):
+        user = await sync_to_async(authenticate_token)(request.GET["token"])
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+
+    response = StreamingHttpResponse(stream_sse(user), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 class TravelRequestViewSet(viewsets.ModelViewSet):
     queryset = TravelRegistration.objects.all()
     serializer_class = TravelRegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TravelRequestCursorPagination
+    filter_backends = [TravelRequestFilter, TravelRequestOrdering]
+    ordering_fields = ['created_at', 'start_date']
+    ordering = TravelRequestCursorPagination.ordering
+    # Serializer fields that map to a column other than their own name
+    field_sources = {'username': 'user__username'}
+
+    def dispatch(self, request, *args, **kwargs):
+        # Reads can be served by the replica when DATABASE_REPLICA_URL is configured
+        if request.method in permissions.SAFE_METHODS:
+            with read_from_replica():
+                return super().dispatch(request, *args, **kwargs)
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_requested_fields(self):
+        """Return the fields asked for with ?fields=a,b on reads, or None for the full representation"""
+        fields = self.request.query_params.get('fields')
+        if self.request.method not in permissions.SAFE_METHODS or not fields:
+            return None
+        available = self.serializer_class().fields
+        requested = [name.strip() for name in fields.split(',') if name.strip() in available]
+        return requested or None
 
     def get_queryset(self):
         if self.request.user.is_staff:
-            return TravelRegistration.objects.all()
-        return TravelRegistration.objects.filter(user=self.request.user)
+            queryset = TravelRegistration.objects.all()
+        else:
+            queryset = TravelRegistration.objects.filter(user_id=self.request.user.id)
+
+        # Load exactly the columns the serializer renders, joining users in the same query
+        fields = self.get_requested_fields() or list(self.serializer_class().fields)
+        if 'username' in fields:
+            queryset = queryset.select_related('user')
+        # The cursor orders by created_at or start_date, then id, so those always have to be loaded
+        columns = {'id', 'created_at', 'start_date', 'user'}
+        columns.update(self.field_sources.get(name, name) for name in fields)
+        return queryset.only(*columns)
+
+    def list(self, request, *args, **kwargs):
+        """Answer polls with 304 while nothing changed, and repeat pages from the cache"""
+        queryset = self.get_queryset()
+        changed = last_changed(request.user, queryset)
+        digest = validator_digest(request, changed)
+        not_modified = not_modified_response(request, digest, changed)
+        if not_modified is not None:
+            return not_modified
+        data = get_cached_page(digest)
+        if data is None:
+            data = self.render_page(queryset)
+            cache_page(digest, data, changed, queryset.db)
+        return set_validators(Response(data), digest, changed, queryset.db)
+
+    def get_row_serializer(self):
+        # The cursor needs the ordering columns of the page's edge rows even when ?fields= omits them
+        return TravelRegistrationRowSerializer(
+            self.get_requested_fields(), extra_columns=('id', 'created_at', 'start_date')
+        )
+
+    def render_page(self, queryset):
+        """One list page as plain dicts, read with values() instead of building model instances"""
+        row_serializer = self.get_row_serializer()
+        page = self.paginate_queryset(row_serializer.values(self.filter_queryset(queryset)))
+        return self.get_paginated_response(row_serializer.many(page)).data
+
+    async def arender_page(self, queryset):
+        """render_page for the async list view (users.async_views)"""
+        row_serializer = self.get_row_serializer()
+        page = await self.paginator.apaginate_queryset(
+            row_serializer.values(self.filter_queryset(queryset)), self.request, view=self
+        )
+        return self.get_paginated_response(row_serializer.many(page)).data
+
+    def retrieve(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        changed = last_changed(request.user, queryset)
+        digest = validator_digest(request, changed)
+        not_modified = not_modified_response(request, digest, changed)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(super().retrieve(request, *args, **kwargs), digest, changed, queryset.db)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(user=as_user_instance(self.request.user))
 
     def update(self, request, *args, **kwargs):
-        instance = self.get_object()
         if not request.user.is_staff:
             return Response(
                 {"error": "Only admins can update travel requests"}, status=403
             )
-        serializer = self.get_serializer(instance, data=request.data, partial=True)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=400)
         return super().update(request, *args, **kwargs)
+
+    def perform_update(self, serializer):
+        # Hand the already loaded row to the stats signal instead of re-reading it
+        serializer.instance._stats_previous = stats_row(serializer.instance)
+        serializer.save()
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request):
+        """Validate a list of requests in one pass and insert them with a single bulk_create"""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({"error": "Expected a non-empty list of travel requests"}, status=400)
+        if len(items) > BULK_MAX_ITEMS:
+            return Response({"error": f"At most {BULK_MAX_ITEMS} travel requests per call"}, status=400)
+
+        item_serializers = [self.get_serializer(data=item) for item in items]
+        results = [
+            {"index": index, "status": "valid"} if serializer.is_valid()
+            else {"index": index, "status": "invalid", "errors": serializer.errors}
+            for index, serializer in enumerate(item_serializers)
+        ]
+        if any(result["status"] == "invalid" for result in results):
+            return Response({"created": 0, "results": results}, status=400)
+
+        owner = as_user_instance(request.user)
+        with transaction.atomic():
+            created = TravelRegistration.objects.bulk_create(
+                [TravelRegistration(user=owner, **serializer.validated_data) for serializer in item_serializers]
+            )
+            deltas = created_deltas(created)
+            transaction.on_commit(lambda: apply_rollup_deltas(deltas))
+        invalidate_travel_stats()
+        mark_changed(owner.id)
+        for travel_request in created:
+            if travel_request.status == 'Pending':
+                publish_new_request(travel_request, owner.username)
+        for result, travel_request in zip(results, created):
+            result.update(status="created", id=travel_request.id)
+        return Response({"created": len(created), "results": results}, status=201)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """Stream every matching request as CSV or NDJSON (?output=csv|ndjson) in constant memory"""
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Only admins can export travel requests"}, status=403
+            )
+        export_format = request.query_params.get("output", "csv")
+        if export_format not in EXPORT_FORMATS:
+            return Response({"error": "output must be csv or ndjson"}, status=400)
+        try:
+            queryset = filter_travel_requests(TravelRegistration.objects.all(), request.query_params)
+        except TravelFilterError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Rows are read after dispatch has left read_from_replica(), so pin the database now
+        queryset = queryset.using(queryset.db)
+        # Each server only streams its own kind of iterator, it buffers the other one whole
+        stream = astream_export if isinstance(request._request, ASGIRequest) else stream_export
+        response = StreamingHttpResponse(
+            stream(queryset, export_format), content_type=EXPORT_FORMATS[export_format]
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="travel-requests-{timezone.now():%Y%m%d}.{export_format}"'
+        )
+        return response
+
+    @action(detail=False, methods=['patch'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """Move many requests to one status with a single UPDATE ... WHERE id IN (...)"""
+        if not request.user.is_staff:
+            return Response(
+                {"error": "Only admins can update travel requests"}, status=403
+            )
+        new_status = request.data.get("status")
+        ids = request.data.get("ids")
+        if new_status not in dict(TravelRegistration.STATUS_CHOICES):
+            return Response({"error": "Invalid status"}, status=400)
+        if not isinstance(ids, list) or not 0 < len(ids) <= BULK_MAX_ITEMS \
+                or not all(type(request_id) is int for request_id in ids):  # true/false are ints too
+            return Response({"error": f"ids must be a list of 1 to {BULK_MAX_ITEMS} ids"}, status=400)
+
+        with transaction.atomic():
+            rows = list(
+                TravelRegistration.objects.select_for_update().filter(id__in=ids)
+                .values('id', 'user_id', 'created_at', *ROLLUP_DIMENSIONS)
+            )
+            existing = {row['id'] for row in rows}
+            updated_at = timezone.now()
+            updated = TravelRegistration.objects.filter(id__in=existing)\
+                .update(status=new_status, updated_at=updated_at)
+            deltas = status_change_deltas(rows, new_status)
+            transaction.on_commit(lambda: apply_rollup_deltas(deltas))
+        invalidate_travel_stats()
+        mark_changed(*{row['user_id'] for row in rows})
+        for row in rows:
+            if row['status'] != new_status:
+                publish_status_change(row['user_id'], row['id'], new_status, row['status'], updated_at)
+        results = [
+            {"id": request_id, "status": "updated" if request_id in existing else "not_found"}
+            for request_id in ids
+        ]
+        return Response({"updated": updated, "results": results})
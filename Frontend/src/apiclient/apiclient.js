@@ -54,4 +54,10 @@ const useApiClient = (navigate) => {
   return apiClient;
 };
 
+// The list endpoints are cursor paginated: fetch one page, and its `next` url (null on the last page)
+export const fetchPage = async (apiClient, url) => {
+  const response = await apiClient.get(url);
+  return { results: response.data.results, next: response.data.next };
+};
+
 export default useApiClient;
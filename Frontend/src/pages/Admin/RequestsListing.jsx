@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import useApiClient from '../../apiclient/apiclient'
+import useApiClient, { fetchPage } from '../../apiclient/apiclient'
 import { logout } from '../../redux/slices/userSlice';
 import { useDispatch } from 'react-redux';
 import ChatBot from '../../components/ChatBot';
@@ -10,6 +10,8 @@ const RequestsListing = () => {
   const apiclient = useApiClient()
   const dispatch = useDispatch();
   const [requests, setRequests] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
@@ -25,8 +27,9 @@ const RequestsListing = () => {
 
   const fetchRequests = async () => {
     try {
-      const response = await apiclient.get('users/travel-requests/');
-      setRequests(response.data);
+      const page = await fetchPage(apiclient, 'users/travel-requests/');
+      setRequests(page.results);
+      setNextPage(page.next);
       setLoading(false);
     } catch (error) {
       setError('Failed to fetch travel requests');
@@ -34,6 +37,18 @@ const RequestsListing = () => {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(apiclient, nextPage);
+      setRequests((current) => [...current, ...page.results]);
+      setNextPage(page.next);
+    } catch (error) {
+      setError('Failed to fetch travel requests');
+    }
+    setLoadingMore(false);
+  };
+
   const getStatusColor = (status) => {
     switch (status.toLowerCase()) {
       case 'pending':
@@ -148,6 +163,17 @@ const RequestsListing = () => {
                 </tbody>
               </table>
             </div>
+            {nextPage && (
+              <div className="px-6 py-4 text-center border-t border-gray-200">
+                <button
+                  onClick={loadMore}
+                  disabled={loadingMore}
+                  className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700 disabled:opacity-50 text-sm font-medium"
+                >
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              </div>
+            )}
           </div>
         </div>
       </div>
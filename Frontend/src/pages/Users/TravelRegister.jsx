@@ -3,7 +3,7 @@ import { useForm } from 'react-hook-form';
 import { logout } from '../../redux/slices/userSlice';
 import { useDispatch } from 'react-redux';
 import { useNavigate } from 'react-router-dom';
-import useApiClient from '../../apiclient/apiclient'
+import useApiClient, { fetchPage } from '../../apiclient/apiclient'
 import { toast } from 'react-toastify';
 
 const TravelRegister = () => {
@@ -12,6 +12,7 @@ const TravelRegister = () => {
   const navigate = useNavigate();
   const [showModal, setShowModal] = useState(false);
   const [requests, setRequests] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const {
     register,
     handleSubmit,
@@ -21,14 +22,25 @@ const TravelRegister = () => {
 
   const fetchRequests = async () => {
     try {
-      const response = await apiClient.get('users/travel-requests/',navigate);
-      setRequests(response.data);
+      const page = await fetchPage(apiClient, 'users/travel-requests/');
+      setRequests(page.results);
+      setNextPage(page.next);
       setShowModal(true);
     } catch (error) {
       toast.error('Failed to fetch travel requests.');
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const page = await fetchPage(apiClient, nextPage);
+      setRequests((current) => [...current, ...page.results]);
+      setNextPage(page.next);
+    } catch (error) {
+      toast.error('Failed to fetch travel requests.');
+    }
+  };
+
   const onSubmit = async (data) => {
     console.log(data);
     try {
@@ -252,7 +264,7 @@ const TravelRegister = () => {
               <tbody>
                 {requests.length > 0 ? (
                   requests.map((req, index) => (
-                    <tr key={index} className="border">
+                    <tr key={req.id ?? index} className="border">
                       <td className="border p-2">{req.project_name}</td>
                       <td className="border p-2">{req.travel_purpose}</td>
                       <td className="border p-2">{req.start_date}</td>
@@ -275,6 +287,9 @@ const TravelRegister = () => {
                 )}
               </tbody>
             </table>
+            {nextPage && (
+              <button onClick={loadMore} className="mt-4 mr-2 bg-blue-600 text-white px-4 py-2 rounded-md">Load more</button>
+            )}
             <button onClick={() => setShowModal(false)} className="mt-4 bg-gray-600 text-white px-4 py-2 rounded-md">Close</button>
           </div>
         </div>